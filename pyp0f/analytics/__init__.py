@@ -0,0 +1,17 @@
+from .aggregate import AggregateSnapshot, TrafficAggregator
+from .distinct import DistinctHostsTracker
+from .sink import ArrowWriter, ChunkWriter, CSVWriter, ResultKind, ResultsSink
+from .sketch import CountMinSketch, HyperLogLog
+
+__all__ = [
+    "ResultsSink",
+    "ResultKind",
+    "ChunkWriter",
+    "CSVWriter",
+    "ArrowWriter",
+    "TrafficAggregator",
+    "AggregateSnapshot",
+    "CountMinSketch",
+    "DistinctHostsTracker",
+    "HyperLogLog",
+]
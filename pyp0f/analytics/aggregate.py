@@ -0,0 +1,321 @@
+"""
+Streaming, fixed-memory traffic statistics.
+
+``TrafficAggregator`` is a results observer: once registered in
+``Options.observers``, every TCP, MTU and HTTP result is counted as it is produced,
+so statistics don't need the result objects to be kept around.
+
+Time is split into buckets of ``slide`` seconds, kept in a ring covering ``window``
+seconds. Each bucket is a single preallocated array of counters, counts by label
+name (at most one per database label) and an optional count-min sketch of source
+addresses, all reset when the ring wraps around.
+With ``slide == window`` the windows are tumbling, otherwise they are sliding.
+
+Labels are counted by name, taken from the matched record when the result is
+observed, so counts never depend on label ids of a database that was reloaded since.
+"""
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pyp0f.analytics.sink import pack_ip
+from pyp0f.analytics.sketch import CountMinSketch
+from pyp0f.fingerprint.observer import ObservedResult, ResultsObserver
+from pyp0f.fingerprint.results import HTTPResult, MTUResult, TCPMatchType, TCPResult
+
+DEFAULT_DISTANCE_BOUNDS = (1, 2, 4, 8, 16, 32)
+
+_MATCH_TYPES = list(TCPMatchType)
+
+_LABEL_COUNTS = ("tcp_labels", "mtu_labels", "http_labels")
+
+Counts = Dict[Optional[str], int]
+
+
+@dataclass
+class AggregateSnapshot:
+    """
+    Counts of a single time window. Results without a match are counted under None.
+    """
+
+    start: float
+    """Window start (unix time, seconds)."""
+
+    end: float
+    """Window end (unix time, seconds)."""
+
+    tcp_labels: Counts = field(default_factory=dict)
+    """TCP (SYN/SYN+ACK) results, by OS label."""
+
+    tcp_match_types: Counts = field(default_factory=dict)
+    """TCP results, by match type (lowercase ``TCPMatchType`` name, e.g. ``"fuzzy_ttl"``)."""
+
+    tcp_distances: Counts = field(default_factory=dict)
+    """TCP results, by distance bucket (e.g. ``"2-3"``, ``"32+"``)."""
+
+    mtu_labels: Counts = field(default_factory=dict)
+    """MTU results, by link label."""
+
+    http_labels: Counts = field(default_factory=dict)
+    """HTTP results, by application label."""
+
+
+class _Bucket:
+    __slots__ = ("index", "counts", "labels", "sketch")
+
+    def __init__(self, size: int, sketch: Optional[CountMinSketch]) -> None:
+        self.index = -1
+        self.counts = array("Q", bytes(8 * size))
+        self.labels: Dict[str, Counts] = {name: {} for name in _LABEL_COUNTS}
+        self.sketch = sketch
+
+    def reset(self, index: int) -> None:
+        self.index = index
+        self.counts = array("Q", bytes(8 * len(self.counts)))
+
+        for counts in self.labels.values():
+            counts.clear()
+
+        if self.sketch is not None:
+            self.sketch.clear()
+
+
+class TrafficAggregator(ResultsObserver):
+    """
+    Counts fingerprint results over tumbling or sliding time windows.
+
+    Example:
+        >>> aggregator = TrafficAggregator(window=60, slide=10)
+        >>> options = Options(observers=[aggregator])
+        >>> for packet in packets:
+        ...     fingerprint_tcp(packet, options=options)
+        >>> aggregator.snapshot().tcp_labels
+        {'s:unix:Linux:3.11 and newer': 1234, None: 56}
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float = 60.0,
+        slide: Optional[float] = None,
+        distance_bounds: Sequence[int] = DEFAULT_DISTANCE_BOUNDS,
+        sketch_width: int = 0,
+        sketch_depth: int = 4,
+        on_window: Optional[Callable[[AggregateSnapshot], None]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            window: Window length (seconds). Defaults to 60.
+            slide: Interval between windows (seconds), dividing ``window`` evenly.
+                Defaults to None (tumbling windows).
+            distance_bounds: Ascending lower bounds of the distance buckets.
+                Defaults to DEFAULT_DISTANCE_BOUNDS.
+            sketch_width: Width of the per-label count-min sketch of source addresses.
+                Defaults to 0 (disabled).
+            sketch_depth: Depth of the count-min sketch. Defaults to 4.
+            on_window: Called with every completed window, outside of the aggregator
+                lock (it may take snapshots). Defaults to None.
+            clock: Current time function. Defaults to time.time.
+
+        Raises:
+            ValueError: Invalid window or slide
+        """
+        slide = window if slide is None else slide
+
+        if window <= 0 or slide <= 0 or slide > window:
+            raise ValueError("Window and slide must be positive, and slide <= window")
+
+        buckets_count = round(window / slide)
+
+        if not math.isclose(buckets_count * slide, window):
+            raise ValueError("Slide must divide window evenly")
+
+        self.window = window
+        self.slide = slide
+        self.distance_bounds = tuple(distance_bounds)
+        self.sketch_width = sketch_width
+        self.on_window = on_window
+        self.clock = clock
+
+        # Counters layout of each bucket (labels are counted by name)
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        size = 0
+
+        for name, length in (
+            ("tcp_match_types", len(_MATCH_TYPES) + 1),
+            ("tcp_distances", len(self.distance_bounds) + 1),
+        ):
+            self._offsets[name] = (size, length)
+            size += length
+
+        self._buckets = [
+            _Bucket(
+                size,
+                CountMinSketch(sketch_width, sketch_depth) if sketch_width else None,
+            )
+            for _ in range(buckets_count)
+        ]
+        self._current = -1
+        self._lock = threading.Lock()
+
+    def observe(self, result: ObservedResult) -> None:
+        now = self.clock()
+        record = result.record
+        label = None if record is None else record.label.dump()
+
+        with self._lock:
+            completed = self._advance(int(now // self.slide))
+            bucket = self._buckets[self._current % len(self._buckets)]
+            counts = bucket.counts
+
+            if isinstance(result, TCPResult):
+                _count(bucket.labels["tcp_labels"], label)
+
+                offset, length = self._offsets["tcp_match_types"]
+                counts[
+                    offset
+                    + (
+                        length - 1
+                        if result.match is None
+                        else _MATCH_TYPES.index(result.match.type)
+                    )
+                ] += 1
+
+                offset, _ = self._offsets["tcp_distances"]
+                counts[
+                    offset + bisect_right(self.distance_bounds, result.distance)
+                ] += 1
+
+            elif isinstance(result, MTUResult):
+                _count(bucket.labels["mtu_labels"], label)
+
+            elif isinstance(result, HTTPResult):
+                _count(bucket.labels["http_labels"], label)
+
+            # HTTP results have no addresses
+            if bucket.sketch is not None and not isinstance(result, HTTPResult):
+                bucket.sketch.add(_sketch_key(label, result.packet.src_address[0]))
+
+        if completed is not None:
+            self.on_window(completed)  # type: ignore
+
+    def snapshot(self) -> AggregateSnapshot:
+        """
+        Get the counts of the current window (up to now).
+        """
+        with self._lock:
+            return self._snapshot(int(self.clock() // self.slide))
+
+    def estimate_src(self, label: Optional[str], ip: str) -> int:
+        """
+        Estimate how many TCP/MTU results of the given label came from the given
+        source address in the current window. Requires ``sketch_width``.
+
+        Args:
+            label: Label name (as in snapshots), None for results without a match
+            ip: Source IP address
+
+        Raises:
+            ValueError: Sketches are disabled
+
+        Returns:
+            Estimated count, never lower than the real count
+        """
+        if not self.sketch_width:
+            raise ValueError("Source address sketches are disabled")
+
+        key = _sketch_key(label, ip)
+
+        with self._lock:
+            buckets = self._window_buckets(int(self.clock() // self.slide))
+            return sum(bucket.sketch.estimate(key) for bucket in buckets)  # type: ignore
+
+    def _advance(self, index: int) -> Optional[AggregateSnapshot]:
+        """
+        Move to the bucket of the given index, resetting it if needed.
+
+        Returns:
+            Snapshot of the completed window, if one was completed and ``on_window`` is set
+        """
+        completed = None
+
+        # Late results are counted in the current bucket
+        if index > self._current:
+            if self._current >= 0 and self.on_window is not None:
+                completed = self._snapshot(self._current)
+            self._current = index
+
+        bucket = self._buckets[self._current % len(self._buckets)]
+
+        if bucket.index != self._current:
+            bucket.reset(self._current)
+
+        return completed
+
+    def _window_buckets(self, last_index: int) -> List[_Bucket]:
+        first_index = last_index - len(self._buckets)
+        return [
+            bucket
+            for bucket in self._buckets
+            if first_index < bucket.index <= last_index
+        ]
+
+    def _snapshot(self, last_index: int) -> AggregateSnapshot:
+        buckets = self._window_buckets(last_index)
+        totals = [sum(values) for values in zip(*(bucket.counts for bucket in buckets))]
+        snapshot = AggregateSnapshot(
+            start=(last_index + 1 - len(self._buckets)) * self.slide,
+            end=(last_index + 1) * self.slide,
+        )
+
+        if not totals:
+            return snapshot
+
+        keys: Dict[str, List[Optional[str]]] = {
+            "tcp_match_types": [
+                *(match_type.name.lower() for match_type in _MATCH_TYPES),
+                None,
+            ],
+            "tcp_distances": self._distance_keys(),
+        }
+
+        for name, (offset, length) in self._offsets.items():
+            counts: Counts = getattr(snapshot, name)
+
+            for i in range(length):
+                count = totals[offset + i]
+                if count:
+                    counts[keys[name][i]] = count
+
+        for name in _LABEL_COUNTS:
+            counts = getattr(snapshot, name)
+
+            for bucket in buckets:
+                for label, count in bucket.labels[name].items():
+                    counts[label] = counts.get(label, 0) + count
+
+        return snapshot
+
+    def _distance_keys(self) -> List[Optional[str]]:
+        bounds = (0, *self.distance_bounds)
+        keys: List[Optional[str]] = []
+
+        for lower, upper in zip(bounds, bounds[1:]):
+            keys.append(str(lower) if upper - lower == 1 else f"{lower}-{upper - 1}")
+
+        keys.append(f"{bounds[-1]}+")
+        return keys
+
+
+def _count(counts: Counts, label: Optional[str]) -> None:
+    counts[label] = counts.get(label, 0) + 1
+
+
+def _sketch_key(label: Optional[str], ip: str) -> bytes:
+    # Label names never contain NUL bytes
+    return (b"" if label is None else label.encode()) + b"\0" + pack_ip(ip)
@@ -0,0 +1,126 @@
+"""
+Approximate distinct hosts counting.
+
+``DistinctHostsTracker`` keeps one ``HyperLogLog`` sketch of source addresses
+per result kind and label, so memory is bounded by the number of labels
+regardless of the number of hosts. Sketches are keyed by label (not by label id),
+so trackers of different processes can be merged.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+from pyp0f.analytics.sink import pack_ip
+from pyp0f.analytics.sketch import HyperLogLog
+from pyp0f.fingerprint.observer import ObservedResult, ResultsObserver
+from pyp0f.fingerprint.results import HTTPResult, MTUResult, TCPResult
+
+# (result kind, label), label is None for results without a match
+SketchKey = Tuple[str, Optional[str]]
+
+
+class DistinctHostsTracker(ResultsObserver):
+    """
+    Counts distinct source addresses per label of TCP, MTU and HTTP results.
+
+    Example:
+        >>> tracker = DistinctHostsTracker()
+        >>> options = Options(observers=[tracker])
+        >>> for packet in packets:
+        ...     fingerprint_tcp(packet, options=options)
+        >>> tracker.counts("tcp")
+        {'s:unix:Linux:3.11 and newer': 1234, None: 56}
+    """
+
+    def __init__(self, *, precision: int = 14) -> None:
+        """
+        Args:
+            precision: Precision of the sketches, each sketch takes
+                ``2 ** precision`` bytes. Defaults to 14 (~0.8% standard error).
+        """
+        HyperLogLog(precision)  # Validate precision
+
+        self.precision = precision
+        self.sketches: Dict[SketchKey, HyperLogLog] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, result: ObservedResult) -> None:
+        # HTTP results have no addresses, they are added with ``add``
+        if not isinstance(result, HTTPResult):
+            self.add(result, result.packet.src_address[0])
+
+    def add(self, result: ObservedResult, src_ip: str) -> None:
+        """
+        Count the source address of a result.
+
+        Args:
+            result: Fingerprint result
+            src_ip: Source IP address of the result
+        """
+        record = result.record
+        key = (_kind(result), None if record is None else record.label.dump())
+        value = pack_ip(src_ip)
+
+        with self._lock:
+            sketch = self.sketches.get(key)
+
+            if sketch is None:
+                sketch = self.sketches[key] = HyperLogLog(self.precision)
+
+            sketch.add(value)
+
+    def counts(self, kind: str = "tcp") -> Dict[Optional[str], int]:
+        """
+        Get the estimated number of distinct hosts per label.
+
+        Args:
+            kind: Results kind (``tcp``, ``mtu`` or ``http``). Defaults to ``tcp``.
+
+        Returns:
+            Estimated distinct hosts, by label
+        """
+        with self._lock:
+            return {
+                label: sketch.count()
+                for (sketch_kind, label), sketch in self.sketches.items()
+                if sketch_kind == kind
+            }
+
+    def merge(self, other: "DistinctHostsTracker") -> None:
+        """
+        Merge the sketches of another tracker (e.g. of another process) into this one.
+
+        Raises:
+            ValueError: The trackers have different precisions
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can't merge trackers of different precisions")
+
+        with self._lock:
+            for key, other_sketch in other.sketches.items():
+                sketch = self.sketches.get(key)
+
+                if sketch is None:
+                    sketch = self.sketches[key] = HyperLogLog(self.precision)
+
+                sketch.merge(other_sketch)
+
+    def __getstate__(self) -> Tuple[int, Dict[SketchKey, bytes]]:
+        with self._lock:
+            return self.precision, {
+                key: sketch.to_bytes() for key, sketch in self.sketches.items()
+            }
+
+    def __setstate__(self, state: Tuple[int, Dict[SketchKey, bytes]]) -> None:
+        self.precision, sketches = state
+        self.sketches = {
+            key: HyperLogLog.from_bytes(data) for key, data in sketches.items()
+        }
+        self._lock = threading.Lock()
+
+
+def _kind(result: ObservedResult) -> str:
+    if isinstance(result, TCPResult):
+        return "tcp"
+    if isinstance(result, MTUResult):
+        return "mtu"
+    return "http"
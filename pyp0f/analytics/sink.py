@@ -0,0 +1,566 @@
+"""
+Columnar storage for bulk fingerprint results.
+
+Result objects hold the full parsed packet and matched record, which is too heavy
+to keep around for millions of packets. ``ResultsSink`` only keeps a few selected
+fields of each result, in preallocated typed arrays (~50 bytes per result).
+Labels are stored by their database id (see ``Record.label_id``), with the labels
+of the database they were recorded with, and both labels and addresses are formatted
+only on output.
+"""
+import csv
+import socket
+from abc import ABCMeta, abstractmethod
+from array import array
+from enum import IntEnum
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from pyp0f.database import Database
+from pyp0f.database.labels import DatabaseLabel
+from pyp0f.fingerprint.results import (
+    HTTPResult,
+    MTUResult,
+    TCPMatchType,
+    TCPResult,
+    UptimeResult,
+)
+from pyp0f.net.packet import Address
+from pyp0f.options import OPTIONS
+
+AnyResult = Union[TCPResult, MTUResult, HTTPResult, UptimeResult]
+Row = Dict[str, Any]
+
+# Missing value of numeric columns
+NONE = -1
+
+_IP_SIZE = 16
+_EMPTY_IP = bytes(_IP_SIZE)
+_IPV4_MAPPED_PREFIX = bytes(10) + b"\xff\xff"
+
+COLUMNS = (
+    "kind",
+    "src_ip",
+    "src_port",
+    "dst_ip",
+    "dst_port",
+    "label",
+    "match_type",
+    "distance",
+    "mtu",
+    "uptime_minutes",
+)
+
+# Missing values of columns, formatted as None
+_NULL_VALUES: Dict[str, Any] = {
+    "src_ip": _EMPTY_IP,
+    "src_port": 0,
+    "dst_ip": _EMPTY_IP,
+    "dst_port": 0,
+    "label": NONE,
+    "match_type": NONE,
+    "distance": NONE,
+    "mtu": NONE,
+    "uptime_minutes": NONE,
+}
+
+
+class ResultKind(IntEnum):
+    TCP = 0
+    MTU = 1
+    HTTP = 2
+    UPTIME = 3
+
+
+def pack_ip(ip: str) -> bytes:
+    """
+    Pack an IPv4/IPv6 address into 16 bytes (IPv4 addresses are IPv4-mapped).
+    """
+    if ":" in ip:
+        return socket.inet_pton(socket.AF_INET6, ip)
+    return _IPV4_MAPPED_PREFIX + socket.inet_pton(socket.AF_INET, ip)
+
+
+def unpack_ip(packed: bytes) -> str:
+    """
+    Unpack an address packed with ``pack_ip``.
+    """
+    if packed[:12] == _IPV4_MAPPED_PREFIX:
+        return socket.inet_ntop(socket.AF_INET, packed[12:])
+    return socket.inet_ntop(socket.AF_INET6, packed)
+
+
+class Chunk:
+    """
+    Fixed capacity block of results, stored column by column.
+    """
+
+    __slots__ = (
+        "capacity",
+        "length",
+        "labels",
+        "kind",
+        "src_ip",
+        "src_port",
+        "dst_ip",
+        "dst_port",
+        "label",
+        "match_type",
+        "distance",
+        "mtu",
+        "uptime_minutes",
+    )
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.length = 0
+        self.labels: Sequence[Optional[DatabaseLabel]] = ()
+        """Labels of the database the results were recorded with, by label id"""
+
+        self.kind = array("B", bytes(capacity))
+        self.src_ip = bytearray(capacity * _IP_SIZE)
+        self.src_port = array("H", bytes(2 * capacity))
+        self.dst_ip = bytearray(capacity * _IP_SIZE)
+        self.dst_port = array("H", bytes(2 * capacity))
+        self.label = array("h", bytes(2 * capacity))
+        self.match_type = array("b", bytes(capacity))
+        self.distance = array("h", bytes(2 * capacity))
+        self.mtu = array("i", bytes(4 * capacity))
+        self.uptime_minutes = array("q", bytes(8 * capacity))
+
+    @property
+    def is_full(self) -> bool:
+        return self.length == self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            len(column) * getattr(column, "itemsize", 1)
+            for column in (getattr(self, name) for name in COLUMNS)
+        )
+
+    def ip(self, column: bytearray, i: int) -> bytes:
+        start = i * _IP_SIZE
+        end = start + _IP_SIZE
+        return bytes(column[start:end])
+
+    def column(self, name: str) -> Union[array, bytearray]:
+        """
+        Get the filled part of a column.
+        """
+        values = getattr(self, name)
+        size = _IP_SIZE if isinstance(values, bytearray) else 1
+        return values[: self.length * size]
+
+    def view(self, name: str) -> memoryview:
+        """
+        Get the filled part of a column without copying it.
+        Valid until the chunk is refilled (columns are never resized).
+        """
+        values = getattr(self, name)
+        size = _IP_SIZE if isinstance(values, bytearray) else 1
+        return memoryview(values)[: self.length * size]
+
+    def valid(self, name: str) -> List[bool]:
+        """
+        Get whether each filled value of a column is present (not missing).
+        """
+        null = _NULL_VALUES.get(name)
+
+        if null is None:
+            return [True] * self.length
+
+        if name in ("src_ip", "dst_ip"):
+            column = getattr(self, name)
+            return [self.ip(column, i) != null for i in range(self.length)]
+
+        return [value != null for value in self.column(name)]
+
+    def label_names(self) -> List[str]:
+        """
+        Get the labels of the label column ids, formatted.
+        """
+        return ["" if label is None else label.dump() for label in self.labels]
+
+
+class ChunkWriter(metaclass=ABCMeta):
+    """
+    Streams full chunks of a ``ResultsSink`` to an output.
+    """
+
+    @abstractmethod
+    def write_chunk(self, chunk: Chunk) -> None:
+        """
+        Write the results of a chunk (see ``Chunk.labels`` for the label column).
+        """
+
+    def close(self) -> None:
+        """
+        Finish writing.
+        """
+
+
+class ResultsSink:
+    """
+    Collects selected fields of fingerprint results in compact columnar chunks.
+
+    Without a writer, chunks are kept in memory. With a writer, every full chunk is
+    written out and its memory is reused, so memory stays bounded by one chunk.
+
+    Example:
+        >>> with open("results.csv", "w", newline="") as file:
+        ...     with ResultsSink(writer=CSVWriter(file)) as sink:
+        ...         for packet in packets:
+        ...             sink.add(fingerprint_tcp(packet))
+    """
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 65536,
+        writer: Optional[ChunkWriter] = None,
+        database: Optional[Database] = None,
+    ) -> None:
+        """
+        Args:
+            chunk_size: Number of results in each chunk. Defaults to 65536.
+            writer: Chunks writer, for streaming output. Defaults to None.
+            database: Database the results are matched with, to resolve label ids.
+                Defaults to None (``OPTIONS.database`` when results are added).
+        """
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be positive")
+
+        self.chunk_size = chunk_size
+        self.writer = writer
+        self.database = database
+        self.chunks: List[Chunk] = []
+        """Full chunks kept in memory (without a writer)."""
+
+        self._chunk = Chunk(chunk_size)
+        self._written = 0
+
+    def __len__(self) -> int:
+        return (
+            self._written
+            + sum(chunk.length for chunk in self.chunks)
+            + self._chunk.length
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the results columns (bytes)."""
+        return sum(chunk.nbytes for chunk in self.chunks) + self._chunk.nbytes
+
+    def add(
+        self,
+        result: AnyResult,
+        *,
+        src: Optional[Address] = None,
+        dst: Optional[Address] = None,
+    ) -> None:
+        """
+        Add a fingerprint result.
+
+        Args:
+            result: Result to add
+            src: Source address, overrides the one of the result's packet.
+                Useful for HTTP results, which don't have one.
+            dst: Destination address, overrides the one of the result's packet.
+        """
+        label = match_type = distance = mtu = uptime_minutes = NONE
+
+        if isinstance(result, TCPResult):
+            kind = ResultKind.TCP
+            distance = result.distance
+
+            label = result.label_id
+
+            if result.match is not None:
+                match_type = result.match.type.value
+
+        elif isinstance(result, MTUResult):
+            kind = ResultKind.MTU
+            mtu = result.packet_signature.mtu
+            label = result.label_id
+
+        elif isinstance(result, HTTPResult):
+            kind = ResultKind.HTTP
+            label = result.label_id
+
+        elif isinstance(result, UptimeResult):
+            kind = ResultKind.UPTIME
+
+            if result.uptime is not None:
+                uptime_minutes = result.uptime.total_minutes
+
+        else:
+            raise TypeError(f"Unsupported result type {type(result).__name__}.")
+
+        if not isinstance(result, HTTPResult):
+            src = src or result.packet.src_address
+            dst = dst or result.packet.dst_address
+
+        # Label ids are resolved with the labels of the database when recorded,
+        # a reload starts a new chunk
+        database = OPTIONS.database if self.database is None else self.database
+        labels = database.labels
+
+        if labels is not self._chunk.labels:
+            if self._chunk.length:
+                self._seal()
+
+            self._chunk.labels = labels
+
+        self._append(kind, src, dst, label, match_type, distance, mtu, uptime_minutes)
+
+    def _append(
+        self,
+        kind: int,
+        src: Optional[Address],
+        dst: Optional[Address],
+        label: int,
+        match_type: int,
+        distance: int,
+        mtu: int,
+        uptime_minutes: int,
+    ) -> None:
+        chunk = self._chunk
+        i = chunk.length
+        ip_start = i * _IP_SIZE
+        ip_end = ip_start + _IP_SIZE
+
+        chunk.kind[i] = kind
+        chunk.src_ip[ip_start:ip_end] = _EMPTY_IP if src is None else pack_ip(src[0])
+        chunk.src_port[i] = 0 if src is None else src[1]
+        chunk.dst_ip[ip_start:ip_end] = _EMPTY_IP if dst is None else pack_ip(dst[0])
+        chunk.dst_port[i] = 0 if dst is None else dst[1]
+        chunk.label[i] = label
+        chunk.match_type[i] = match_type
+        chunk.distance[i] = distance
+        chunk.mtu[i] = mtu
+        chunk.uptime_minutes[i] = uptime_minutes
+        chunk.length += 1
+
+        if chunk.is_full:
+            self._seal()
+
+    def _seal(self) -> None:
+        if self.writer is None:
+            self.chunks.append(self._chunk)
+            self._chunk = Chunk(self.chunk_size)
+            return
+
+        self.writer.write_chunk(self._chunk)
+        self._written += self._chunk.length
+        self._chunk.length = 0  # Reuse chunk memory
+
+    def flush(self) -> None:
+        """
+        Write the current partial chunk, if there's a writer.
+        """
+        if self.writer is not None and self._chunk.length:
+            self._seal()
+
+    def close(self) -> None:
+        """
+        Flush and close the writer, if there's any.
+        """
+        self.flush()
+
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self) -> "ResultsSink":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """
+        Iterate the chunks kept in memory (without a writer).
+        """
+        yield from self.chunks
+
+        if self._chunk.length:
+            yield self._chunk
+
+    def iter_rows(self) -> Iterator[Row]:
+        """
+        Iterate the results kept in memory as formatted rows.
+        """
+        for chunk in self.iter_chunks():
+            yield from iter_chunk_rows(chunk)
+
+    def write(self, writer: ChunkWriter) -> None:
+        """
+        Write all the results kept in memory, and close the writer.
+        """
+        for chunk in self.iter_chunks():
+            writer.write_chunk(chunk)
+        writer.close()
+
+
+def iter_chunk_rows(chunk: Chunk) -> Iterator[Row]:
+    """
+    Iterate the results of a chunk as formatted rows.
+    """
+    labels = chunk.label_names()
+
+    def optional(value: int) -> Optional[int]:
+        return None if value == NONE else value
+
+    for i in range(chunk.length):
+        src_ip = chunk.ip(chunk.src_ip, i)
+        dst_ip = chunk.ip(chunk.dst_ip, i)
+        label = chunk.label[i]
+        match_type = chunk.match_type[i]
+
+        yield {
+            "kind": ResultKind(chunk.kind[i]).name.lower(),
+            "src_ip": unpack_ip(src_ip) if src_ip != _EMPTY_IP else None,
+            "src_port": chunk.src_port[i] or None,
+            "dst_ip": unpack_ip(dst_ip) if dst_ip != _EMPTY_IP else None,
+            "dst_port": chunk.dst_port[i] or None,
+            "label": labels[label] if label != NONE else None,
+            "match_type": (
+                TCPMatchType(match_type).name.lower() if match_type != NONE else None
+            ),
+            "distance": optional(chunk.distance[i]),
+            "mtu": optional(chunk.mtu[i]),
+            "uptime_minutes": optional(chunk.uptime_minutes[i]),
+        }
+
+
+class CSVWriter(ChunkWriter):
+    """
+    Writes results as CSV rows.
+    """
+
+    def __init__(self, file: IO[str]) -> None:
+        """
+        Args:
+            file: Text file to write to (opened with ``newline=""``)
+        """
+        self._writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+
+    def write_chunk(self, chunk: Chunk) -> None:
+        self._writer.writerows(iter_chunk_rows(chunk))
+
+
+class ArrowWriter(ChunkWriter):
+    """
+    Writes results as an Arrow IPC file, or a Parquet file.
+    Requires ``pyarrow``.
+
+    Addresses are stored as 16 bytes fixed size binaries (see ``pack_ip``),
+    labels as dictionary encoded strings, and missing values as nulls.
+    """
+
+    def __init__(self, path: str, *, format: str = "ipc") -> None:
+        """
+        Args:
+            path: Output file path
+            format: "ipc" or "parquet". Defaults to "ipc".
+        """
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("ArrowWriter requires pyarrow to be installed") from e
+
+        if format not in ("ipc", "parquet"):
+            raise ValueError(f"Unsupported format {format!r}")
+
+        self._pa = pyarrow
+
+        # Labels dictionary of the whole file, only appended to
+        self._labels: List[str] = []
+        self._label_indices: Dict[str, int] = {}
+        self._schema = pyarrow.schema(
+            [
+                ("kind", pyarrow.uint8()),
+                ("src_ip", pyarrow.binary(_IP_SIZE)),
+                ("src_port", pyarrow.uint16()),
+                ("dst_ip", pyarrow.binary(_IP_SIZE)),
+                ("dst_port", pyarrow.uint16()),
+                ("label", pyarrow.dictionary(pyarrow.int16(), pyarrow.string())),
+                ("match_type", pyarrow.int8()),
+                ("distance", pyarrow.int16()),
+                ("mtu", pyarrow.int32()),
+                ("uptime_minutes", pyarrow.int64()),
+            ]
+        )
+
+        if format == "parquet":
+            import pyarrow.parquet
+
+            self._writer: Any = pyarrow.parquet.ParquetWriter(path, self._schema)
+        else:
+            import pyarrow.ipc
+
+            # Labels are only appended to, so they can be written as dictionary deltas
+            self._writer = pyarrow.ipc.new_file(
+                path,
+                self._schema,
+                options=pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True),
+            )
+
+    def write_chunk(self, chunk: Chunk) -> None:
+        pa = self._pa
+        length = chunk.length
+
+        def column(name: str, type: Any) -> Any:
+            valid = chunk.valid(name)
+            null_count = valid.count(False)
+
+            # A boolean array's values are a bitmap, usable as a validity bitmap
+            validity = (
+                pa.array(valid, type=pa.bool_()).buffers()[1] if null_count else None
+            )
+
+            # The columns' memory layout matches Arrow's, so values are wrapped
+            # without copying. The batch is written before the chunk is reused.
+            return pa.Array.from_buffers(
+                type,
+                length,
+                [validity, pa.py_buffer(chunk.view(name))],
+                null_count=null_count,
+            )
+
+        # Map the chunk's label ids to the file's dictionary, which may only grow
+        indices = [self._label_index(label) for label in chunk.label_names()]
+        label = pa.DictionaryArray.from_arrays(
+            pa.array(
+                [
+                    indices[value] if value != NONE else None
+                    for value in chunk.column("label")
+                ],
+                type=pa.int16(),
+            ),
+            pa.array(self._labels, type=pa.string()),
+        )
+
+        arrays = [
+            label if field.name == "label" else column(field.name, field.type)
+            for field in self._schema
+        ]
+
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self._schema)
+
+        if hasattr(self._writer, "write_batch"):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch]))
+
+    def _label_index(self, label: str) -> int:
+        index = self._label_indices.get(label)
+
+        if index is None:
+            index = self._label_indices[label] = len(self._labels)
+            self._labels.append(label)
+
+        return index
+
+    def close(self) -> None:
+        self._writer.close()
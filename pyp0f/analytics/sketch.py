@@ -0,0 +1,123 @@
+"""
+Probabilistic, fixed-memory summaries of large streams.
+"""
+import math
+import struct
+from array import array
+from hashlib import blake2b
+from typing import List
+
+
+class CountMinSketch:
+    """
+    Estimates how many times each key was added, in fixed memory.
+
+    Estimates never undercount, and overcount by at most ``e / width`` of the total
+    count with probability ``1 - e ** -depth``.
+    """
+
+    __slots__ = ("width", "depth", "counts")
+
+    def __init__(self, width: int = 1024, depth: int = 4) -> None:
+        if width <= 0 or depth <= 0:
+            raise ValueError("Count-min sketch width and depth must be positive")
+
+        self.width = width
+        self.depth = depth
+        self.counts = array("Q", bytes(8 * width * depth))
+
+    def _indexes(self, key: bytes) -> List[int]:
+        digest = blake2b(key, digest_size=4 * self.depth).digest()
+        return [
+            row * self.width + value % self.width
+            for row, value in enumerate(struct.unpack(f"<{self.depth}I", digest))
+        ]
+
+    def add(self, key: bytes, count: int = 1) -> None:
+        counts = self.counts
+        for index in self._indexes(key):
+            counts[index] += count
+
+    def estimate(self, key: bytes) -> int:
+        counts = self.counts
+        return min(counts[index] for index in self._indexes(key))
+
+    def clear(self) -> None:
+        self.counts = array("Q", bytes(8 * self.width * self.depth))
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct keys added, in fixed memory
+    (``2 ** precision`` bytes), with a standard error of ``1.04 / sqrt(2 ** precision)``.
+
+    Sketches of the same precision can be merged, e.g. to combine the counts of
+    multiple processes, and serialized with ``to_bytes``.
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 14) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: bytes) -> None:
+        value = int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+        index = value & ((1 << self.precision) - 1)
+        rest = value >> self.precision
+        bits = 64 - self.precision
+        # Position of the lowest set bit of the remaining bits
+        rank = (rest & -rest).bit_length() if rest else bits + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+        estimate = alpha * size * size / sum(2.0**-rank for rank in self.registers)
+
+        if estimate <= 2.5 * size:
+            # Small range correction (linear counting)
+            zeros = self.registers.count(0)
+            if zeros:
+                return round(size * math.log(size / zeros))
+
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Merge another sketch into this one, as if all its keys were added.
+
+        Raises:
+            ValueError: The sketches have different precisions
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can't merge HyperLogLog sketches of different precisions")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """
+        Load a sketch serialized with ``to_bytes``.
+
+        Raises:
+            ValueError: Invalid data
+        """
+        if not data:
+            raise ValueError("Invalid HyperLogLog data")
+
+        sketch = cls(data[0])
+
+        if len(data) != len(sketch.registers) + 1:
+            raise ValueError("Invalid HyperLogLog data")
+
+        sketch.registers[:] = data[1:]
+        return sketch
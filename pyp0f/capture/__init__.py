@@ -0,0 +1,28 @@
+from .dedup import Repeat, SynDeduplicator
+from .ring import FrameRing, RingFrame
+from .sampling import FlowSampler, buffer_flow_key, flow_key, packet_flow_key
+from .shedding import (
+    DEFAULT_TIERS,
+    OverloadController,
+    SheddingSnapshot,
+    SheddingTier,
+    Stage,
+    packet_stages,
+)
+
+__all__ = [
+    "FrameRing",
+    "RingFrame",
+    "SynDeduplicator",
+    "Repeat",
+    "FlowSampler",
+    "flow_key",
+    "packet_flow_key",
+    "buffer_flow_key",
+    "OverloadController",
+    "SheddingSnapshot",
+    "SheddingTier",
+    "Stage",
+    "DEFAULT_TIERS",
+    "packet_stages",
+]
@@ -0,0 +1,140 @@
+"""
+SYN retransmissions and duplicate frames suppression.
+
+SYN retransmissions and duplicate frames (e.g. from SPAN ports) would have the same
+SYN fingerprinted several times, wasting CPU and skewing statistics.
+``SynDeduplicator`` remembers recently seen SYNs and SYN+ACKs in a fixed-size
+hashed timestamp table, so memory is bounded regardless of the number of flows:
+a slot is overwritten by newer SYNs once its entry is older than the window,
+or on a hash collision (the older SYN is then simply fingerprinted again).
+
+Retransmissions refresh their entry, so the window only has to cover the longest
+gap between two retransmissions. The default covers the usual exponential backoffs:
+Linux waits 1, 2, 4, 8, 16 then 32 seconds (6 SYN retries), Windows 3 then 6 seconds.
+Longer gaps (e.g. raised ``tcp_syn_retries``) need a longer window.
+"""
+import math
+import threading
+import time
+from array import array
+from enum import Enum, auto
+from typing import Callable, Dict, Optional
+
+from pyp0f.net.layers.tcp import TCPFlag
+from pyp0f.net.packet import Packet
+
+DEFAULT_WINDOW = 40.0
+DEFAULT_SLOTS = 1 << 16
+
+
+class Repeat(Enum):
+    NEW = auto()
+    """First time seen in the window: fingerprint"""
+
+    RETRANSMISSION = auto()
+    """Same SYN with a new TCP timestamp: skip ``fingerprint_tcp``,
+    still usable for ``fingerprint_uptime``"""
+
+    DUPLICATE = auto()
+    """Same SYN and TCP timestamp (duplicate frame): skip"""
+
+
+class SynDeduplicator:
+    """
+    Time-decaying filter of repeated SYNs and SYN+ACKs,
+    keyed on (source, destination, source port, destination port, sequence number).
+
+    Example:
+        >>> dedup = SynDeduplicator()
+        >>> repeat = dedup.check(packet, frame.timestamp)
+        >>> if repeat is Repeat.NEW:
+        ...     fingerprint_tcp(packet)
+        >>> if repeat is not Repeat.DUPLICATE:
+        ...     fingerprint_uptime(packet, last_signature)
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WINDOW,
+        slots: int = DEFAULT_SLOTS,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            window: Seconds a SYN is remembered. Defaults to DEFAULT_WINDOW.
+            slots: Table size (20 bytes each), the number of SYNs remembered at most.
+                Defaults to DEFAULT_SLOTS.
+            clock: Time source, when packets timestamps aren't given.
+                Defaults to time.monotonic.
+
+        Raises:
+            ValueError: Invalid window or number of slots
+        """
+        if window <= 0 or slots <= 0:
+            raise ValueError("Window and slots must be positive")
+
+        self.window = window
+        self.slots = slots
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys = array("q", bytes(8 * slots))
+        self._seen = array("d", [-math.inf]) * slots
+        self._timestamps = array("I", bytes(4 * slots))
+        self._counts = dict.fromkeys(Repeat, 0)
+
+    def check(self, packet: Packet, timestamp: Optional[float] = None) -> Repeat:
+        """
+        Check whether a packet repeats a SYN or SYN+ACK seen within the window,
+        and remember it. Packets of any other type are always new.
+
+        Args:
+            packet: Packet to check
+            timestamp: Capture timestamp, consistent with previous calls.
+                Defaults to None (the clock).
+
+        Returns:
+            Whether the packet is new, a retransmission or a duplicate frame
+        """
+        tcp = packet.tcp
+
+        if tcp.type not in (TCPFlag.SYN, TCPFlag.SYN | TCPFlag.ACK):
+            return Repeat.NEW
+
+        key = hash(
+            (
+                packet.ip.src,
+                packet.ip.dst,
+                tcp.src_port,
+                tcp.dst_port,
+                tcp.seq,
+                tcp.type,
+            )
+        )
+        slot = key % self.slots
+
+        with self._lock:
+            now = self._clock() if timestamp is None else timestamp
+
+            if self._keys[slot] != key or now - self._seen[slot] > self.window:
+                repeat = Repeat.NEW
+            elif self._timestamps[slot] != tcp.options.timestamp:
+                repeat = Repeat.RETRANSMISSION
+            else:
+                repeat = Repeat.DUPLICATE
+
+            # Retransmissions refresh the entry, so slow backoffs are still caught
+            self._keys[slot] = key
+            self._seen[slot] = now
+            self._timestamps[slot] = tcp.options.timestamp
+            self._counts[repeat] += 1
+            return repeat
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Get the number of checked SYNs and SYN+ACKs, by repeat kind.
+        """
+        with self._lock:
+            return {
+                repeat.name.lower(): count for repeat, count in self._counts.items()
+            }
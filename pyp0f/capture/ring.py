@@ -0,0 +1,252 @@
+"""
+Shared-memory ring of raw frames, from one capture process to many fingerprint workers.
+
+Frames are copied once, by the producer, into fixed-size slots of a shared memory
+block. Consumers claim slots in order and decode them in place (see
+``Packet.from_frame``), so nothing is pickled between the processes.
+
+Every slot has a state byte: the producer only writes ``FREE`` slots, and a slot
+becomes ``FREE`` again only when its consumer released it. When the oldest slot
+is still in use, the ring is full and the producer drops the frame (a capture
+process should never block), counting it in ``dropped``.
+"""
+import multiprocessing
+import os
+import struct
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any, Dict, Optional, Type
+
+from pyp0f.utils.shm import attach_shared_memory, create_shared_memory
+from pyp0f.utils.slots import add_slots
+
+# Ring header fields offsets: frames written (head), frames claimed (tail),
+# frames dropped
+_HEAD = 0
+_TAIL = 8
+_DROPPED = 16
+_HEADER_SIZE = 64
+
+_U64 = struct.Struct("<Q")
+
+# state, capture timestamp, frame length
+_SLOT_HEADER = struct.Struct("<BdI")
+
+_FREE = 0
+_READY = 1
+_BUSY = 2
+
+DEFAULT_SLOTS = 4096
+DEFAULT_SNAPLEN = 2048
+
+
+@add_slots
+@dataclass
+class RingFrame:
+    """
+    Frame claimed by a consumer. ``data`` is a view of the shared memory,
+    valid until the frame is released.
+    """
+
+    ring: "FrameRing"
+    slot: int
+    timestamp: float
+    """Capture timestamp (seconds since the epoch)"""
+
+    data: memoryview
+    """Raw frame, in place"""
+
+    def release(self) -> None:
+        """
+        Release the slot to the producer.
+        """
+        if self.slot >= 0:
+            self.data.release()
+            self.ring._release(self.slot)
+            self.slot = -1
+
+    def __enter__(self) -> "RingFrame":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.release()
+
+
+class FrameRing:
+    """
+    Single-producer, multi-consumer ring of raw frames in shared memory.
+
+    Pass the ring to worker processes (``multiprocessing.Process`` arguments),
+    they attach to the same shared memory and synchronization primitives.
+
+    Example:
+        >>> ring = FrameRing()
+        >>> workers = [Process(target=work, args=(ring,)) for _ in range(4)]
+        >>> ...  # Start workers
+        >>> for timestamp, frame in capture():
+        ...     ring.put(frame, timestamp)
+        >>> ring.finish(len(workers))
+
+        >>> def work(ring: FrameRing):
+        ...     while (frame := ring.get()) is not None:
+        ...         with frame:
+        ...             fingerprint_tcp(Packet.from_frame(frame.data))
+    """
+
+    def __init__(
+        self, slots: int = DEFAULT_SLOTS, snaplen: int = DEFAULT_SNAPLEN
+    ) -> None:
+        """
+        Args:
+            slots: Number of slots. Defaults to DEFAULT_SLOTS.
+            snaplen: Maximum frame length, longer frames are truncated.
+                Defaults to DEFAULT_SNAPLEN.
+
+        Raises:
+            ValueError: Invalid number of slots or snaplen
+            ImportError: Shared memory is not supported (Python 3.7)
+        """
+        if slots <= 0 or snaplen <= 0:
+            raise ValueError("Ring slots and snaplen must be positive")
+
+        self.slots = slots
+        self.snaplen = snaplen
+        self._slot_size = _SLOT_HEADER.size + snaplen
+        self._shm = create_shared_memory(_HEADER_SIZE + slots * self._slot_size)
+        self._owner_pid: Optional[int] = os.getpid()
+        self._lock = multiprocessing.Lock()
+        self._items = multiprocessing.Semaphore(0)
+
+        self._shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+
+        for slot in range(slots):
+            self._shm.buf[self._slot_offset(slot)] = _FREE
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "snaplen": self.snaplen,
+            "name": self._shm.name,
+            "lock": self._lock,
+            "items": self._items,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.slots = state["slots"]
+        self.snaplen = state["snaplen"]
+        self._slot_size = _SLOT_HEADER.size + self.snaplen
+        self._shm = attach_shared_memory(state["name"])
+        self._owner_pid = None
+        self._lock = state["lock"]
+        self._items = state["items"]
+
+    def _slot_offset(self, slot: int) -> int:
+        return _HEADER_SIZE + slot * self._slot_size
+
+    @property
+    def dropped(self) -> int:
+        """Frames dropped by the producer because the ring was full."""
+        return _U64.unpack_from(self._shm.buf, _DROPPED)[0]
+
+    @property
+    def pending(self) -> int:
+        """Frames queued and not yet claimed by a consumer (queue depth)."""
+        buffer = self._shm.buf
+        (head,) = _U64.unpack_from(buffer, _HEAD)
+        (tail,) = _U64.unpack_from(buffer, _TAIL)
+        return max(head - tail, 0)
+
+    def put(self, frame: bytes, timestamp: float = 0.0) -> bool:
+        """
+        Copy a frame into the ring (producer only).
+
+        Args:
+            frame: Raw frame, truncated to the snaplen
+            timestamp: Capture timestamp. Defaults to 0.0.
+
+        Returns:
+            Whether the frame was queued, or dropped because the ring is full
+        """
+        buffer = self._shm.buf
+        (head,) = _U64.unpack_from(buffer, _HEAD)
+        offset = self._slot_offset(head % self.slots)
+
+        if buffer[offset] != _FREE:
+            _U64.pack_into(buffer, _DROPPED, self.dropped + 1)
+            return False
+
+        length = min(len(frame), self.snaplen)
+        start = offset + _SLOT_HEADER.size
+        end = start + length
+        buffer[start:end] = frame[:length]
+        _SLOT_HEADER.pack_into(buffer, offset, _READY, timestamp, length)
+
+        # Only the producer writes the head, consumers read it under the lock
+        with self._lock:
+            _U64.pack_into(buffer, _HEAD, head + 1)
+
+        self._items.release()
+        return True
+
+    def finish(self, consumers: int) -> None:
+        """
+        Signal the end of the frames (producer only): once the ring is drained,
+        ``get`` returns None in each of the given number of consumers.
+        """
+        for _ in range(consumers):
+            self._items.release()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[RingFrame]:
+        """
+        Claim the oldest frame (consumers). Release it when done, with
+        ``RingFrame.release`` or as a context manager.
+
+        Args:
+            timeout: Maximum seconds to wait for a frame. Defaults to None (forever).
+
+        Returns:
+            Frame, or None on timeout or after ``finish`` once the ring is drained
+        """
+        if not self._items.acquire(timeout=timeout):
+            return None
+
+        buffer = self._shm.buf
+
+        with self._lock:
+            (head,) = _U64.unpack_from(buffer, _HEAD)
+            (tail,) = _U64.unpack_from(buffer, _TAIL)
+
+            if tail == head:  # Woken up by ``finish``
+                return None
+
+            _U64.pack_into(buffer, _TAIL, tail + 1)
+            slot = tail % self.slots
+            offset = self._slot_offset(slot)
+            buffer[offset] = _BUSY
+
+        _, timestamp, length = _SLOT_HEADER.unpack_from(buffer, offset)
+        start = offset + _SLOT_HEADER.size
+        end = start + length
+        return RingFrame(self, slot, timestamp, buffer[start:end])
+
+    def _release(self, slot: int) -> None:
+        # The lock orders the frame reads before the slot is reused
+        with self._lock:
+            self._shm.buf[self._slot_offset(slot)] = _FREE
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory, and free it if this is the creating process.
+        All claimed frames must be released first.
+        """
+        self._shm.close()
+
+        # Forked workers inherit the ring as is, only unlink in the creating process
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+            self._owner_pid = None
@@ -0,0 +1,183 @@
+"""
+Consistent flow sampling.
+
+On very high-rate links, fingerprinting only a fraction of the flows, but every
+packet of a sampled flow, keeps SYN/SYN+ACK correlation (``syn_mss``) and uptime
+pairs intact. Decisions are a keyed hash of the direction-normalized 5-tuple,
+so any process on any host with the same seed samples the same flows, and raw
+packets are sampled from their addresses and ports, before they are decoded.
+"""
+import hashlib
+import socket
+import struct
+import threading
+from typing import Tuple
+
+from pyp0f.exceptions import PacketError
+from pyp0f.net.layers.ip import IP_PROTOCOL_TCP, IPV4, IPV6
+from pyp0f.net.packet import Packet, RawPacket, frame_ip_offset
+
+_PORTS = struct.Struct("!HH")
+
+# Hashes are compared to the rate scaled to this range
+_HASH_RANGE = 1 << 64
+
+Endpoint = Tuple[bytes, int]
+
+
+def flow_key(src: Endpoint, dst: Endpoint) -> bytes:
+    """
+    Direction-normalized key of a TCP flow: both directions have the same key.
+
+    Args:
+        src: Source (packed address, port)
+        dst: Destination (packed address, port)
+
+    Returns:
+        Flow key
+    """
+    low, high = sorted((src, dst))
+    return b"".join(
+        (bytes((IP_PROTOCOL_TCP,)), low[0], _PORTS.pack(low[1], high[1]), high[0])
+    )
+
+
+def packet_flow_key(packet: Packet) -> bytes:
+    """
+    Get the flow key of a parsed packet.
+    """
+    family = socket.AF_INET if packet.ip.version == IPV4 else socket.AF_INET6
+    return flow_key(
+        (socket.inet_pton(family, packet.ip.src), packet.tcp.src_port),
+        (socket.inet_pton(family, packet.ip.dst), packet.tcp.dst_port),
+    )
+
+
+def buffer_flow_key(buffer: RawPacket, offset: int = 0) -> bytes:
+    """
+    Get the flow key of a raw IP packet, reading only its addresses and ports.
+
+    Args:
+        buffer: Buffer containing the packet
+        offset: Offset of the IP header in the buffer. Defaults to 0.
+
+    Raises:
+        PacketError: The packet is truncated, or is not a TCP/IP packet
+
+    Returns:
+        Flow key
+    """
+    view = memoryview(buffer)[offset:]
+
+    try:
+        version = view[0] >> 4 if view else None
+
+        if version == IPV4:
+            header_length = (view[0] & 0x0F) * 4
+            protocol = view[9] if len(view) > 9 else None
+            src_start, dst_start, address_length = 12, 16, 4
+        elif version == IPV6:
+            header_length = 40
+            protocol = view[6] if len(view) > 6 else None
+            src_start, dst_start, address_length = 8, 24, 16
+        else:
+            raise PacketError(f"Unsupported IP version {version}")
+
+        if len(view) < header_length + _PORTS.size or header_length < 20:
+            raise PacketError("Truncated TCP/IP header")
+
+        if protocol != IP_PROTOCOL_TCP:
+            raise PacketError("Packet doesn't have an TCP layer!")
+
+        src_port, dst_port = _PORTS.unpack_from(view, header_length)
+        src_end = src_start + address_length
+        dst_end = dst_start + address_length
+        return flow_key(
+            (bytes(view[src_start:src_end]), src_port),
+            (bytes(view[dst_start:dst_end]), dst_port),
+        )
+    finally:
+        view.release()
+
+
+class FlowSampler:
+    """
+    Deterministic flow sampler: keeps every packet of a fraction of the flows.
+
+    Lowering the rate only drops flows, and raising it only adds flows:
+    flows sampled at a rate are also sampled at any higher rate.
+
+    Example:
+        >>> sampler = FlowSampler(1 / 16, seed=b"cluster-1")
+        >>> if sampler.sample_frame(frame):
+        ...     packet = Packet.from_frame(frame)
+        >>> sampler.rate = 1 / 32  # From any thread
+    """
+
+    def __init__(self, rate: float = 1.0, *, seed: bytes = b"") -> None:
+        """
+        Args:
+            rate: Fraction of the flows sampled, 1/N to keep one of every N flows.
+                Defaults to 1.0.
+            seed: Hash key shared by the processes that should sample the same flows
+                (up to 64 bytes). Defaults to b"".
+
+        Raises:
+            ValueError: Invalid rate or seed
+        """
+        if len(seed) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise ValueError("Flow sampler seed is too long")
+
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._threshold = 0
+        self.rate = rate
+
+    @property
+    def rate(self) -> float:
+        """Fraction of the flows sampled, adjustable at runtime."""
+        return self._threshold / _HASH_RANGE
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        if not 0 <= rate <= 1:
+            raise ValueError("Sampling rate must be in [0, 1]")
+
+        with self._lock:
+            self._threshold = round(rate * _HASH_RANGE)
+
+    def sample_key(self, key: bytes) -> bool:
+        """
+        Decide whether a flow is sampled, by its key (see ``flow_key``).
+        """
+        threshold = self._threshold
+
+        if threshold >= _HASH_RANGE:
+            return True
+
+        digest = hashlib.blake2b(key, digest_size=8, key=self._seed).digest()
+        return int.from_bytes(digest, "big") < threshold
+
+    def sample(self, packet: Packet) -> bool:
+        """
+        Decide whether the flow of a parsed packet is sampled.
+        """
+        return self.sample_key(packet_flow_key(packet))
+
+    def sample_buffer(self, buffer: RawPacket, offset: int = 0) -> bool:
+        """
+        Decide whether the flow of a raw IP packet is sampled, before decoding it.
+
+        Raises:
+            PacketError: The packet is truncated, or is not a TCP/IP packet
+        """
+        return self.sample_key(buffer_flow_key(buffer, offset))
+
+    def sample_frame(self, frame: RawPacket) -> bool:
+        """
+        Decide whether the flow of a raw Ethernet frame is sampled, before decoding it.
+
+        Raises:
+            PacketError: The frame is truncated, or is not a TCP/IP frame
+        """
+        return self.sample_buffer(frame, frame_ip_offset(frame))
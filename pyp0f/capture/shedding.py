@@ -0,0 +1,309 @@
+"""
+Adaptive load shedding.
+
+When packets arrive faster than they can be fingerprinted, shedding the least useful
+work keeps the most useful results flowing, instead of letting the kernel drop
+packets indiscriminately. ``OverloadController`` watches the queue depth and the
+latency of each fingerprinting stage, and moves between degradation tiers:
+one tier up when overloaded, one tier down after load has been low for a while.
+
+The default tiers shed, in order: uptime of ACKs, then HTTP, then most SYN+ACKs.
+SYN fingerprinting (TCP and MTU) is never shed.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from pyp0f.net.layers.tcp import TCPFlag
+from pyp0f.net.packet import Packet
+from pyp0f.utils.slots import add_slots
+
+
+class Stage(IntEnum):
+    """
+    Fingerprinting stages, from the first to the last shed.
+    """
+
+    UPTIME = 0
+    """``fingerprint_uptime`` of ACKs"""
+
+    HTTP = 1
+    """``fingerprint_http`` of payloads"""
+
+    SYN_ACK = 2
+    """``fingerprint_tcp`` and ``fingerprint_mtu`` of SYN+ACKs"""
+
+    SYN = 3
+    """``fingerprint_tcp`` and ``fingerprint_mtu`` of SYNs, never shed"""
+
+
+@add_slots
+@dataclass
+class SheddingTier:
+    """
+    Work shed at one degradation tier.
+    """
+
+    shed_uptime: bool = False
+    shed_http: bool = False
+
+    syn_ack_sample_rate: float = 1.0
+    """Fraction of SYN+ACKs fingerprinted"""
+
+
+DEFAULT_TIERS = (
+    SheddingTier(shed_uptime=True),
+    SheddingTier(shed_uptime=True, shed_http=True),
+    SheddingTier(shed_uptime=True, shed_http=True, syn_ack_sample_rate=0.1),
+)
+
+_NO_SHEDDING = SheddingTier()
+
+
+@add_slots
+@dataclass
+class SheddingSnapshot:
+    level: int
+    """Current tier (0 when nothing is shed)"""
+
+    queue_depth: int
+    """Last reported queue depth"""
+
+    latencies: Dict[str, float] = field(default_factory=dict)
+    """Average latency (seconds) of each stage"""
+
+    admitted: Dict[str, int] = field(default_factory=dict)
+    """Packets admitted to each stage"""
+
+    shed: Dict[str, int] = field(default_factory=dict)
+    """Packets shed from each stage"""
+
+
+def packet_stages(packet: Packet) -> List[Stage]:
+    """
+    Get the fingerprinting stages a packet is useful for.
+    """
+    stages: List[Stage] = []
+
+    if not packet.should_fingerprint:
+        return stages
+
+    tcp_type = packet.tcp.type
+
+    if tcp_type == TCPFlag.SYN:
+        stages.append(Stage.SYN)
+    elif tcp_type == TCPFlag.SYN | TCPFlag.ACK:
+        stages.append(Stage.SYN_ACK)
+    elif tcp_type == TCPFlag.ACK and packet.tcp.options.timestamp:
+        stages.append(Stage.UPTIME)
+
+    if packet.tcp.payload:
+        stages.append(Stage.HTTP)
+
+    return stages
+
+
+class OverloadController:
+    """
+    Chooses the degradation tier from the queue depth and stages latencies,
+    and decides which packets are admitted to each stage.
+
+    Example:
+        >>> controller = OverloadController(max_queue_depth=ring.slots // 2)
+        >>> controller.update(ring.pending)  # Periodically, or for every packet
+        >>> for stage in packet_stages(packet):
+        ...     if controller.admit(stage):
+        ...         with controller.timed(stage):
+        ...             ...  # Fingerprint
+    """
+
+    def __init__(
+        self,
+        *,
+        max_queue_depth: int = 1000,
+        latency_budgets: Optional[Mapping[Stage, float]] = None,
+        tiers: Sequence[SheddingTier] = DEFAULT_TIERS,
+        low_watermark: float = 0.5,
+        escalate_interval: float = 1.0,
+        recover_interval: float = 5.0,
+        latency_smoothing: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            max_queue_depth: Queue depth above which the load is too high.
+                Defaults to 1000.
+            latency_budgets: Maximum average latency (seconds) of stages, stages without
+                a budget are not limited. Defaults to None (queue depth only).
+            tiers: Degradation tiers, from the lightest. Defaults to DEFAULT_TIERS.
+            low_watermark: Fraction of the queue depth and latency budgets under which
+                the load is low. Defaults to 0.5.
+            escalate_interval: Minimum seconds between two tier changes (the first
+                escalation is immediate). Defaults to 1.0.
+            recover_interval: Seconds of low load before going one tier down.
+                Defaults to 5.0.
+            latency_smoothing: Weight of a new latency in the stage averages.
+                Defaults to 0.1.
+            clock: Monotonic time source. Defaults to time.monotonic.
+
+        Raises:
+            ValueError: Invalid configuration
+        """
+        if max_queue_depth <= 0 or not 0 < low_watermark < 1:
+            raise ValueError("Invalid queue depth or low watermark")
+
+        if not 0 < latency_smoothing <= 1:
+            raise ValueError("Latency smoothing must be in (0, 1]")
+
+        if not all(0 <= tier.syn_ack_sample_rate <= 1 for tier in tiers):
+            raise ValueError("SYN+ACK sample rates must be in [0, 1]")
+
+        self.max_queue_depth = max_queue_depth
+        self.latency_budgets = dict(latency_budgets or {})
+        self.tiers = tuple(tiers)
+        self.low_watermark = low_watermark
+        self.escalate_interval = escalate_interval
+        self.recover_interval = recover_interval
+        self.latency_smoothing = latency_smoothing
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._level = 0
+        self._queue_depth = 0
+        # No tier change yet, the first overload escalates right away
+        self._changed_at = -math.inf
+        self._calm_since: Optional[float] = None
+        self._latencies: Dict[Stage, float] = {}
+        self._admitted = dict.fromkeys(Stage, 0)
+        self._shed = dict.fromkeys(Stage, 0)
+        self._syn_acks = 0
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @property
+    def tier(self) -> SheddingTier:
+        """Current tier."""
+        return self.tiers[self._level - 1] if self._level else _NO_SHEDDING
+
+    def _is_shed(self, stage: Stage, tier: SheddingTier) -> bool:
+        return (stage == Stage.UPTIME and tier.shed_uptime) or (
+            stage == Stage.HTTP and tier.shed_http
+        )
+
+    def _latency_ratio(self, tier: SheddingTier) -> float:
+        # Averages of shed stages are stale, only running stages count
+        return max(
+            (
+                latency / self.latency_budgets[stage]
+                for stage, latency in self._latencies.items()
+                if stage in self.latency_budgets and not self._is_shed(stage, tier)
+            ),
+            default=0.0,
+        )
+
+    def update(self, queue_depth: int) -> int:
+        """
+        Report the current queue depth, and move between tiers if needed.
+
+        Returns:
+            Current tier level
+        """
+        with self._lock:
+            now = self._clock()
+            self._queue_depth = queue_depth
+            load = max(
+                queue_depth / self.max_queue_depth, self._latency_ratio(self.tier)
+            )
+
+            if load > 1:
+                self._calm_since = None
+
+                if (
+                    self._level < len(self.tiers)
+                    and now - self._changed_at >= self.escalate_interval
+                ):
+                    self._level += 1
+                    self._changed_at = now
+
+            elif load <= self.low_watermark:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif self._level and now - self._calm_since >= self.recover_interval:
+                    self._level -= 1
+                    self._changed_at = self._calm_since = now
+
+            else:
+                self._calm_since = None
+
+            return self._level
+
+    def admit(self, stage: Stage) -> bool:
+        """
+        Decide whether a packet should go through a stage, and count the decision.
+        SYN+ACKs are sampled deterministically (e.g. one of every ten at 0.1).
+        """
+        with self._lock:
+            tier = self.tier
+
+            if stage == Stage.SYN_ACK and tier.syn_ack_sample_rate < 1:
+                # Admitted whenever the sampled count reaches a new integer
+                self._syn_acks += 1
+                rate = tier.syn_ack_sample_rate
+                admitted = int(self._syn_acks * rate) > int((self._syn_acks - 1) * rate)
+            else:
+                admitted = not self._is_shed(stage, tier)
+
+            if admitted:
+                self._admitted[stage] += 1
+            else:
+                self._shed[stage] += 1
+
+            return admitted
+
+    def record_latency(self, stage: Stage, seconds: float) -> None:
+        """
+        Report the time a packet spent in a stage.
+        """
+        with self._lock:
+            average = self._latencies.get(stage)
+            self._latencies[stage] = (
+                seconds
+                if average is None
+                else average + self.latency_smoothing * (seconds - average)
+            )
+
+    @contextmanager
+    def timed(self, stage: Stage) -> Iterator[None]:
+        """
+        Measure the latency of the wrapped stage work (see ``record_latency``).
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record_latency(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> SheddingSnapshot:
+        """
+        Get the current tier and the counts of admitted and shed packets, per stage.
+        """
+        with self._lock:
+            return SheddingSnapshot(
+                level=self._level,
+                queue_depth=self._queue_depth,
+                latencies={
+                    stage.name.lower(): latency
+                    for stage, latency in self._latencies.items()
+                },
+                admitted={
+                    stage.name.lower(): count for stage, count in self._admitted.items()
+                },
+                shed={stage.name.lower(): count for stage, count in self._shed.items()},
+            )
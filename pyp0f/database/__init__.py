@@ -1,3 +1,10 @@
-from .database import DATABASE, Database
+from .database import DATABASE, Database, FrozenDatabase, register_derived
+from .watcher import DatabaseWatcher
 
-__all__ = ["Database", "DATABASE"]
+__all__ = [
+    "Database",
+    "DATABASE",
+    "DatabaseWatcher",
+    "FrozenDatabase",
+    "register_derived",
+]
@@ -1,10 +1,37 @@
+import gc
+from types import MappingProxyType
+from typing import Any, Callable, Hashable, List, NoReturn, TypeVar
+
 from pyp0f.database.parse.parser import parse_file
-from pyp0f.database.records_database import RecordsDatabase
+from pyp0f.database.records_database import (
+    RecordsDatabase,
+    RecordsMapping,
+    RecordsState,
+    TDerived,
+)
+from pyp0f.exceptions import DatabaseError
+from pyp0f.net.packet import Direction
 from pyp0f.utils.path import ROOT_DIR, PathLike, always_path
 
 # Default location of p0f.fp.
 DEFAULT_DATABASE_PATH = ROOT_DIR / "data" / "p0f.fp"
 
+# Gets a structure derived from the records of a direction (see ``register_derived``)
+DerivedBuilder = Callable[[Direction, "Database"], Any]
+TBuilder = TypeVar("TBuilder", bound=DerivedBuilder)
+
+_DERIVED_BUILDERS: List[DerivedBuilder] = []
+
+
+def register_derived(builder: TBuilder) -> TBuilder:
+    """
+    Register a function getting a structure derived from the records of a direction
+    (e.g. matching tables, see ``Database.cached``), so the structure is built ahead
+    of use by ``Database.build_derived``.
+    """
+    _DERIVED_BUILDERS.append(builder)
+    return builder
+
 
 class Database(RecordsDatabase):
     """
@@ -12,18 +39,138 @@ class Database(RecordsDatabase):
     Loads records from a database file (p0f.fp)
     """
 
-    def load(self, filepath: PathLike = DEFAULT_DATABASE_PATH):
+    def load(
+        self, filepath: PathLike = DEFAULT_DATABASE_PATH, *, prefork: bool = False
+    ):
         """
         Loads a database file (p0f.fp).
         Note: This will override the underlying datastructure of any existing records (if loaded already).
 
+        Args:
+            filepath: Database file path. Defaults to DEFAULT_DATABASE_PATH.
+            prefork: Prepare the database to be shared by forked worker processes:
+                build the matching structures now and ``gc.freeze()`` all objects,
+                so workers don't copy the database pages. Defaults to False.
+
+        Raises:
+            DatabaseError: Error while parsing the database
+        """
+        self.reload(filepath)
+
+        if prefork:
+            self.prepare_for_fork()
+
+    def reload(self, filepath: PathLike = DEFAULT_DATABASE_PATH):
+        """
+        Loads a database file (p0f.fp) without interrupting concurrent fingerprinting.
+
+        The file is parsed and every derived structure currently in use (indexes, lookup tables)
+        is rebuilt aside, then all of them are published with a single reference swap.
+        Until then, readers keep using the previous records.
+        If parsing fails, the previous records are kept.
+
         Args:
             filepath: Database file path. Defaults to DEFAULT_DATABASE_PATH.
 
         Raises:
             DatabaseError: Error while parsing the database
         """
-        self._replace(parse_file(always_path(filepath)))
+        database = parse_file(always_path(filepath))
+        database.warm(self)
+        self._replace(database)
+
+    def build_derived(self) -> None:
+        """
+        Build the registered derived structures (see ``register_derived``)
+        of all directions, and the ids lookup tables.
+        Structures of record types missing from the database are skipped.
+        """
+        for builder in _DERIVED_BUILDERS:
+            for direction in Direction:
+                try:
+                    builder(direction, self)
+                except DatabaseError:
+                    pass  # The database has no records of this type
+
+        self.labels  # Builds the ids lookup tables
+
+    def prepare_for_fork(self) -> None:
+        """
+        Build the derived structures and freeze all objects tracked by the garbage
+        collector (``gc.freeze``), so forked processes don't copy their pages
+        when collecting garbage. Call it in the parent, right before forking.
+        See ``pyp0f.fingerprint.prefork``.
+        """
+        self.build_derived()
+        gc.collect()
+        gc.freeze()
+
+    def freeze(self) -> "FrozenDatabase":
+        """
+        Create a read-only snapshot of the current records, safe to share between threads.
+        See ``FrozenDatabase``.
+        """
+        return FrozenDatabase(self)
+
+
+class FrozenDatabase(Database):
+    """
+    Read-only snapshot of a database.
+
+    Records lists are stored as tuples, and every registered derived structure (see
+    ``register_derived``), and any other derived structure in use by the origin database,
+    is built on creation. The snapshot is never written to afterwards, so it can be
+    shared between threads without any locking:
+
+        >>> options = Options(database=DATABASE.freeze())
+        >>> fingerprint_tcp(packet, options=options)  # From any thread
+
+    Reloading the origin database does not affect the snapshot.
+    """
+
+    def __init__(self, database: RecordsDatabase) -> None:
+        records = Database(_freeze_map(database._map))
+        records.warm(database)
+        records.build_derived()
+
+        super().__init__()
+        self._state = RecordsState(
+            records._map, MappingProxyType(records._state.derived)  # type: ignore
+        )
+
+    def cached(
+        self, key: Hashable, factory: Callable[[RecordsDatabase], TDerived]
+    ) -> TDerived:
+        """
+        Get a structure derived from the records, built on creation.
+
+        Raises:
+            DatabaseError: The structure wasn't built on creation
+                (e.g. its module was imported after the database was frozen)
+        """
+        entry = self._state.derived.get(key)
+
+        if entry is None:
+            raise DatabaseError(f"{key} was not built when the database was frozen")
+
+        return entry[0]
+
+    def _read_only(self, *args, **kwargs) -> NoReturn:
+        raise DatabaseError("Can't modify a frozen database")
+
+    load = reload = create = add = _replace = _read_only  # type: ignore
+
+
+def _freeze_map(records_map: RecordsMapping) -> RecordsMapping:
+    frozen = {
+        key: tuple(value)
+        if isinstance(value, (list, tuple))
+        else MappingProxyType(
+            {direction: tuple(values) for direction, values in value.items()}
+        )
+        for key, value in records_map.items()
+    }
+    return MappingProxyType(frozen)  # type: ignore
 
 
 DATABASE = Database()
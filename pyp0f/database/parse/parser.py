@@ -1,5 +1,5 @@
 from enum import Flag, auto
-from typing import Optional, TextIO, Tuple, Type
+from typing import Dict, Optional, TextIO, Tuple, Type
 
 from pyp0f.database.labels import DatabaseLabel, Label
 from pyp0f.database.parse.utils import (
@@ -59,6 +59,10 @@ def _parse_file(file: TextIO) -> RecordsDatabase:
     label: Optional[DatabaseLabel] = None
     direction: Optional[Direction] = None
     record_cls: Optional[Type[Record]] = None
+    record_id = 0
+    label_id = -1
+    # Full label (including ``sys``) to label id, assigned on the label's first sig
+    label_ids: Dict[Tuple[Type[DatabaseLabel], str, Tuple[str, ...]], int] = {}
 
     for line_number, line in enumerate(file, start=1):
         if line[0] in SKIPPED_LINES:
@@ -79,18 +83,27 @@ def _parse_file(file: TextIO) -> RecordsDatabase:
         value = value.strip()
 
         if parameter == "sig":
-            if state != ParserState.NEED_SIG or record_cls is None:
+            if state != ParserState.NEED_SIG or record_cls is None or label is None:
                 raise ParsingError("Misplaced 'sig'", line_number)
 
+            if label_id < 0:
+                label_id = label_ids.setdefault(
+                    (type(label), label.dump(), getattr(label, "sys", ())),
+                    len(label_ids),
+                )
+
             with parsing_error_wrapper(line_number):
                 record = record_cls(
                     label=label,
                     signature=record_cls._signature_cls.parse(value),
                     raw_signature=value,
                     line_number=line_number,
+                    id=record_id,
+                    label_id=label_id,
                 )
 
             database.add(record, direction)
+            record_id += 1
 
         elif parameter == "label":
             if (
@@ -104,6 +117,8 @@ def _parse_file(file: TextIO) -> RecordsDatabase:
             with parsing_error_wrapper(line_number):
                 label = record_cls._label_cls.parse(value)
 
+            label_id = -1
+
             if isinstance(label, Label) and label.is_user_app:
                 state = ParserState.NEED_SYS
 
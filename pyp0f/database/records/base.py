@@ -1,5 +1,5 @@
 from abc import ABCMeta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import ClassVar, Generic, Type, TypeVar
 
 from pyp0f.database.labels import DatabaseLabel, Label
@@ -27,6 +27,15 @@ class Record(Generic[TLabel, TSignature], metaclass=ABCMeta):
     line_number: int
     """Line number of record in database file"""
 
+    id: int = field(default=-1, compare=False)
+    """Record id, index of the record in the database file (-1 if not loaded from a file)"""
+
+    label_id: int = field(default=-1, compare=False)
+    """
+    Id of the record's label, shared by all records with an equal label
+    (-1 if not loaded from a file)
+    """
+
     _label_cls: ClassVar[Type[DatabaseLabel]]
     _signature_cls: ClassVar[Type[DatabaseSignature]]
 
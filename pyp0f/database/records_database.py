@@ -1,14 +1,50 @@
 import random
-from typing import Iterator, List, MutableMapping, Optional, Sized, Type, TypeVar, Union
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Sized,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
+from pyp0f.database.labels import DatabaseLabel
 from pyp0f.database.records import Record
 from pyp0f.exceptions import DatabaseError
 from pyp0f.net.packet import Direction
+from pyp0f.utils.slots import add_slots
 
 T = TypeVar("T", bound=Record)
+TDerived = TypeVar("TDerived")
+TValue = TypeVar("TValue")
 
 RecordsByDirection = MutableMapping[Direction, List[Record]]
 RecordsMapping = MutableMapping[Type[Record], Union[List[Record], RecordsByDirection]]
+DerivedFactory = Callable[["RecordsDatabase"], Any]
+
+
+@add_slots
+@dataclass(frozen=True)
+class RecordsState:
+    """
+    Records of a database, and the structures derived from them.
+    Replaced as a whole, so readers never pair records with structures derived
+    from other records.
+    """
+
+    records: RecordsMapping = field(default_factory=dict)
+
+    derived: Dict[Hashable, Tuple[Any, DerivedFactory]] = field(default_factory=dict)
+    """Structures derived from the records (indexes, lookup tables), by a unique key"""
 
 
 class RecordsDatabase(Sized):
@@ -18,10 +54,50 @@ class RecordsDatabase(Sized):
     """
 
     def __init__(self, items: Optional[RecordsMapping] = None) -> None:
-        self._map: RecordsMapping = items or {}
+        self._state = RecordsState(items or {})
+
+    @property
+    def _map(self) -> RecordsMapping:
+        return self._state.records
 
     def _replace(self, other: "RecordsDatabase"):
-        self._map = other._map
+        """
+        Publish the records (and derived structures) of another database,
+        with a single assignment. Readers see either the old or the new records,
+        never a mix of both.
+        """
+        self._state = other._state
+
+    def cached(
+        self, key: Hashable, factory: Callable[["RecordsDatabase"], TDerived]
+    ) -> TDerived:
+        """
+        Get a structure derived from the records, building it on first use.
+
+        Args:
+            key: Unique key of the derived structure
+            factory: Builds the structure from a database of the current records
+
+        Returns:
+            Derived structure, matching the current records
+        """
+        # Read once: records replaced meanwhile get a new state, never this one
+        state = self._state
+        entry = state.derived.get(key)
+
+        if entry is not None:
+            return entry[0]
+
+        value = factory(RecordsDatabase(state.records))
+        state.derived[key] = (value, factory)
+        return value
+
+    def warm(self, other: "RecordsDatabase") -> None:
+        """
+        Build all derived structures currently in use by `other` for these records.
+        """
+        for key, (_, factory) in list(other._state.derived.items()):
+            self.cached(key, factory)
 
     def _get(self, key: Type[T], direction: Optional[Direction] = None) -> List[T]:
         """
@@ -32,7 +108,7 @@ class RecordsDatabase(Sized):
 
         value = self._map[key]
 
-        if isinstance(value, list):
+        if isinstance(value, (list, tuple)):
             return value  # type: ignore
 
         if direction is None:
@@ -75,12 +151,15 @@ class RecordsDatabase(Sized):
         else:
             self._map[key] = []
 
+        self._state = RecordsState(self._map)
+
     def add(self, value: Record, direction: Optional[Direction] = None) -> None:
         """
         Add a value to an existing list of values.
         """
         values_list = self._get(type(value), direction)
         values_list.append(value)
+        self._state = RecordsState(self._map)
 
     def iter_values(
         self, key: Type[T], direction: Optional[Direction] = None
@@ -98,10 +177,88 @@ class RecordsDatabase(Sized):
 
         return iter(values)
 
+    def iter_all_values(self) -> Iterator[Record]:
+        """
+        Iterate all values, of all types and directions.
+        """
+        for value in self._map.values():
+            if isinstance(value, (list, tuple)):
+                yield from value
+            else:
+                for values_list in value.values():
+                    yield from values_list
+
+    def _ids(
+        self,
+    ) -> Tuple[Sequence[Optional[Record]], Sequence[Optional[DatabaseLabel]]]:
+        """
+        Get the reverse lookup tables of record ids and label ids.
+        """
+
+        def build(records: RecordsDatabase):
+            records_by_id: Dict[int, Record] = {}
+            labels_by_id: Dict[int, DatabaseLabel] = {}
+
+            for record in records.iter_all_values():
+                if record.id >= 0:
+                    records_by_id[record.id] = record
+
+                if record.label_id >= 0:
+                    labels_by_id.setdefault(record.label_id, record.label)
+
+            # Indexed by the actual ids, a missing id is never shifted onto another
+            return _by_id(records_by_id), _by_id(labels_by_id)
+
+        return self.cached("ids", build)
+
+    @property
+    def labels(self) -> Sequence[Optional[DatabaseLabel]]:
+        """
+        Distinct labels, by their id (see ``Record.label_id``).
+        Ids without records (never the case for parsed databases) are None.
+        """
+        return self._ids()[1]
+
+    def get_record(self, record_id: int) -> Record:
+        """
+        Get a record by its id (see ``Record.id``).
+        """
+        records = self._ids()[0]
+        record = records[record_id] if 0 <= record_id < len(records) else None
+
+        if record is None:
+            raise DatabaseError(f"No record with id {record_id}")
+
+        return record
+
+    def get_label(self, label_id: int) -> DatabaseLabel:
+        """
+        Get a label by its id (see ``Record.label_id``).
+        """
+        labels = self._ids()[1]
+        label = labels[label_id] if 0 <= label_id < len(labels) else None
+
+        if label is None:
+            raise DatabaseError(f"No label with id {label_id}")
+
+        return label
+
     def __len__(self) -> int:
         return sum(
             len(value)
-            if isinstance(value, list)
+            if isinstance(value, (list, tuple))
             else sum(len(values_list) for values_list in value.values())
             for value in self._map.values()
         )
+
+
+def _by_id(values: Dict[int, TValue]) -> Tuple[Optional[TValue], ...]:
+    """
+    Lookup table of values by their id, None for missing ids.
+    """
+    table: List[Optional[TValue]] = [None] * (max(values, default=-1) + 1)
+
+    for value_id, value in values.items():
+        table[value_id] = value
+
+    return tuple(table)
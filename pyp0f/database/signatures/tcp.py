@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List, Tuple
+from itertools import combinations
+from typing import FrozenSet, List, Tuple
 
 from pyp0f.database.parse.utils import (
     fixed_numerical_options_parser,
@@ -43,6 +44,36 @@ class OptionsSignature:
     eol_padding_length: int
 
 
+@add_slots
+@dataclass(frozen=True)
+class QuirksTolerance:
+    """
+    Quirks values (plain ints) a signature matches, for packets of one IP version.
+    """
+
+    exact: int
+    """Quirks value of an exact match"""
+
+    fuzzy: FrozenSet[int]
+    """
+    Quirks values of a fuzzy match, where 'df' or 'id+' disappeared,
+    or 'id-' or 'ecn' appeared.
+    """
+
+    @classmethod
+    def from_quirks(cls, quirks: Quirk) -> "QuirksTolerance":
+        exact = quirks.value
+        deletable = _bits(exact & FUZZY_DELETED_QUIRKS.value)
+        addable = _bits(~exact & FUZZY_ADDED_QUIRKS.value)
+
+        fuzzy = frozenset(
+            exact & ~sum(deleted) | sum(added)
+            for deleted in _subsets(deletable)
+            for added in _subsets(addable)
+        )
+        return cls(exact, fuzzy - {exact})
+
+
 @add_slots
 @dataclass
 class TCPSignature(DatabaseSignature):
@@ -57,6 +88,24 @@ class TCPSignature(DatabaseSignature):
     payload_class: int
     quirks: Quirk
 
+    ipv4_quirks: QuirksTolerance = field(init=False, repr=False, compare=False)
+    """Quirks matched by IPv4 packets"""
+
+    ipv6_quirks: QuirksTolerance = field(init=False, repr=False, compare=False)
+    """Quirks matched by IPv6 packets"""
+
+    def __post_init__(self):
+        # If the signature has no IP version specified, IPv6-specific quirks
+        # are ignored when matching IPv4 packets and vice versa.
+        ipv4_quirks = ipv6_quirks = self.quirks
+
+        if self.ip_version == WILDCARD:
+            ipv4_quirks &= ~_INVALID_QUIRKS[IPV4]
+            ipv6_quirks &= ~_INVALID_QUIRKS[IPV6]
+
+        self.ipv4_quirks = QuirksTolerance.from_quirks(ipv4_quirks)
+        self.ipv6_quirks = QuirksTolerance.from_quirks(ipv6_quirks)
+
     @classmethod
     def parse(cls, raw_signature: str):
         (
@@ -89,6 +138,10 @@ class TCPSignature(DatabaseSignature):
         )
 
 
+# Quirks that may disappear or appear in a fuzzy match
+FUZZY_DELETED_QUIRKS = Quirk.DF | Quirk.NZ_ID
+FUZZY_ADDED_QUIRKS = Quirk.ZERO_ID | Quirk.ECN
+
 _STRING_QUIRKS = {v: k for k, v in QUIRK_STRINGS.items()}
 _STRING_OPTIONS = {v: k for k, v in OPTION_STRINGS.items()}
 _INVALID_QUIRKS = {
@@ -177,6 +230,18 @@ def _parse_options(field: str) -> Tuple[List[int], int]:
     return options, eol_padding_length
 
 
+def _bits(value: int) -> List[int]:
+    return [1 << i for i in range(value.bit_length()) if value >> i & 1]
+
+
+def _subsets(values: List[int]) -> List[Tuple[int, ...]]:
+    return [
+        subset
+        for size in range(len(values) + 1)
+        for subset in combinations(values, size)
+    ]
+
+
 def _parse_quirks(field: str, ip_version: int) -> Quirk:
     quirks = Quirk(0)
     raw_quirks = field.split(",") if field else []
@@ -0,0 +1,113 @@
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+from pyp0f.database.database import DEFAULT_DATABASE_PATH, Database
+from pyp0f.exceptions import DatabaseError
+from pyp0f.utils.path import PathLike, always_path
+
+FileState = Tuple[int, int]  # (mtime_ns, size)
+
+
+class DatabaseWatcher:
+    """
+    Reloads a database whenever its file changes, by polling the file's mtime.
+
+    Reloading is done on a background thread using ``Database.reload``,
+    so fingerprinting can continue while the new records are prepared.
+
+    Example:
+        >>> with DatabaseWatcher(DATABASE, "p0f.fp", interval=10):
+        ...     sniff(prn=handle_packet)
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        filepath: PathLike = DEFAULT_DATABASE_PATH,
+        *,
+        interval: float = 5.0,
+        on_error: Optional[Callable[[DatabaseError], None]] = None,
+    ) -> None:
+        """
+        Args:
+            database: Database to reload
+            filepath: Database file path to watch. Defaults to DEFAULT_DATABASE_PATH.
+            interval: Polling interval (seconds). Defaults to 5.
+            on_error: Called with the error when a modified file fails to load.
+                The previous records are kept in that case.
+        """
+        self.database = database
+        self.filepath = always_path(filepath)
+        self.interval = interval
+        self.on_error = on_error
+
+        self._state: Optional[FileState] = self._file_state()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_state(self) -> Optional[FileState]:
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """
+        Reload the database if the file changed since the last check.
+
+        Returns:
+            Whether the database was reloaded
+        """
+        state = self._file_state()
+
+        if state is None or state == self._state:
+            return False
+
+        # Remember the state even on failure, to not retry until the file changes again
+        self._state = state
+
+        try:
+            self.database.reload(self.filepath)
+        except DatabaseError as e:
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+            return False
+
+        return True
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except DatabaseError:
+                continue
+
+    def start(self) -> "DatabaseWatcher":
+        """
+        Start watching the file on a background (daemon) thread.
+        """
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="pyp0f-database-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop watching the file.
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "DatabaseWatcher":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -1,4 +1,4 @@
-from .http import fingerprint_http
+from .http import fingerprint_http, fingerprint_http_many
 from .mtu import fingerprint_mtu
 from .tcp import fingerprint_tcp
 from .uptime import fingerprint_uptime
@@ -7,5 +7,6 @@ __all__ = [
     "fingerprint_mtu",
     "fingerprint_tcp",
     "fingerprint_http",
+    "fingerprint_http_many",
     "fingerprint_uptime",
 ]
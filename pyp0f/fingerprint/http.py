@@ -1,14 +1,39 @@
-from typing import Optional, Sequence
+from typing import Any, FrozenSet, Iterable, List, Optional, Sequence, Tuple
 
-from pyp0f.database import Database
+from typing_extensions import Protocol
+
+from pyp0f.database import Database, FrozenDatabase, register_derived
 from pyp0f.database.parse.utils import WILDCARD
 from pyp0f.database.records import HTTPRecord
+from pyp0f.database.records_database import RecordsDatabase
 from pyp0f.database.signatures import HTTPSignature, SignatureHeader
+from pyp0f.fingerprint.observer import notify_observers
+from pyp0f.fingerprint.profile import MatchProfiler
 from pyp0f.fingerprint.results import HTTPResult
 from pyp0f.net.layers.http import BufferLike, PacketHeader, read_payload
 from pyp0f.net.packet import Direction
 from pyp0f.net.signatures import HTTPPacketSignature
 from pyp0f.options import OPTIONS, Options
+from pyp0f.utils.cache import LRUCache
+
+# Everything HTTP matching depends on: direction, version, ordered header names,
+# and values of the headers that signatures constrain.
+HTTPShapeKey = Tuple[Direction, int, Tuple[bytes, ...], Tuple[bytes, ...]]
+
+
+class HTTPMatchCache(Protocol):
+    """
+    Storage of HTTP matches by shape, such as ``LRUCache`` or a plain ``dict``.
+    """
+
+    def get(self, key: HTTPShapeKey, default: Any) -> Any:
+        ...
+
+    def __setitem__(self, key: HTTPShapeKey, value: Optional[HTTPRecord]) -> None:
+        ...
+
+
+_MISSING = object()
 
 
 def headers_match(
@@ -72,6 +97,7 @@ def find_http_match(
     packet_signature: HTTPPacketSignature,
     direction: Direction,
     database: Database,
+    profiler: Optional[MatchProfiler] = None,
 ) -> Optional[HTTPRecord]:
     """
     Search through the database for a match for the given HTTP signature.
@@ -79,7 +105,16 @@ def find_http_match(
     generic_match: Optional[HTTPRecord] = None
 
     for http_record in database.iter_values(HTTPRecord, direction):
-        if not http_signatures_match(http_record.signature, packet_signature):
+        if not (
+            http_signatures_match(http_record.signature, packet_signature)
+            if profiler is None
+            else profiler.compare(
+                http_record,
+                http_signatures_match,
+                http_record.signature,
+                packet_signature,
+            )
+        ):
             continue
 
         if not http_record.is_generic:
@@ -91,6 +126,90 @@ def find_http_match(
     return generic_match
 
 
+@register_derived
+def value_constrained_headers(
+    direction: Direction, database: Database
+) -> FrozenSet[bytes]:
+    """
+    Get the (lowercase) names of headers whose values are checked by the signatures.
+    """
+
+    def build(records: RecordsDatabase) -> FrozenSet[bytes]:
+        return frozenset(
+            header.lower_name
+            for http_record in records.iter_values(HTTPRecord, direction)
+            for header in http_record.signature.headers
+            if header.value is not None
+        )
+
+    return database.cached((HTTPRecord, "value_constrained_headers", direction), build)
+
+
+def http_shape_key(
+    packet_signature: HTTPPacketSignature,
+    direction: Direction,
+    constrained_headers: FrozenSet[bytes],
+) -> HTTPShapeKey:
+    """
+    Get a key of everything the match of the given HTTP signature depends on.
+    Signatures with equal keys are guaranteed to have the same match.
+    """
+    return (
+        direction,
+        packet_signature.version,
+        tuple(header.lower_name for header in packet_signature.headers),
+        tuple(
+            header.value
+            for header in packet_signature.headers
+            if header.lower_name in constrained_headers
+        ),
+    )
+
+
+def http_match_cache(
+    options: Options,
+) -> Optional[LRUCache[HTTPShapeKey, Optional[HTTPRecord]]]:
+    """
+    Get the HTTP matches cache of the database, if enabled.
+    The cache is bound to the database records, and is dropped when they are reloaded.
+    It's disabled while profiling, so that every comparison is profiled, and for frozen
+    databases, which are never written to (the cache takes a lock on every lookup).
+    """
+    size = options.http_cache_size
+
+    if (
+        size <= 0
+        or options.profiler is not None
+        or isinstance(options.database, FrozenDatabase)
+    ):
+        return None
+
+    return options.database.cached(
+        (HTTPRecord, "match_cache", size), lambda _: LRUCache(size)
+    )
+
+
+def find_cached_http_match(
+    packet_signature: HTTPPacketSignature,
+    direction: Direction,
+    database: Database,
+    cache: HTTPMatchCache,
+) -> Optional[HTTPRecord]:
+    """
+    Search for a match for the given HTTP signature, using cached matches of
+    previous signatures with the same shape (see ``http_shape_key``).
+    """
+    key = http_shape_key(
+        packet_signature, direction, value_constrained_headers(direction, database)
+    )
+    match = cache.get(key, _MISSING)
+
+    if match is _MISSING:
+        match = cache[key] = find_http_match(packet_signature, direction, database)
+
+    return match  # type: ignore
+
+
 def fingerprint_http(buffer: BufferLike, *, options: Options = OPTIONS) -> HTTPResult:
     """
     Fingerprint the given HTTP 1.x payload.
@@ -107,9 +226,63 @@ def fingerprint_http(buffer: BufferLike, *, options: Options = OPTIONS) -> HTTPR
     """
     direction, version, headers = read_payload(buffer)
     packet_signature = HTTPPacketSignature(version, headers)
+    cache = http_match_cache(options)
 
-    return HTTPResult(
+    result = HTTPResult(
         buffer,
         packet_signature,
-        find_http_match(packet_signature, direction, options.database),
+        find_http_match(packet_signature, direction, options.database, options.profiler)
+        if cache is None
+        else find_cached_http_match(
+            packet_signature, direction, options.database, cache
+        ),
     )
+    notify_observers(result, options)
+    return result
+
+
+def fingerprint_http_many(
+    buffers: Iterable[BufferLike], *, options: Options = OPTIONS
+) -> List[HTTPResult]:
+    """
+    Fingerprint many HTTP 1.x payloads.
+
+    Payloads sharing the same shape (direction, version, ordered header names and values of
+    headers checked by signatures) are matched against the database only once,
+    which is very common for payloads sent by the same client library.
+    Matches are shared with ``fingerprint_http`` through the HTTP matches cache, if enabled.
+
+    Args:
+        buffers: HTTP payloads to fingerprint
+        options: Fingerprint options. Defaults to OPTIONS.
+
+    Raises:
+        PacketError: One of the payloads is invalid for HTTP fingerprint
+
+    Returns:
+        HTTP fingerprint results, in the order of the given payloads
+    """
+    cache: Optional[HTTPMatchCache] = http_match_cache(options)
+    results: List[HTTPResult] = []
+
+    if cache is None and options.profiler is None:
+        # Still match each shape only once in this batch
+        cache = {}
+
+    for buffer in buffers:
+        direction, version, headers = read_payload(buffer)
+        packet_signature = HTTPPacketSignature(version, headers)
+        match = (
+            find_http_match(
+                packet_signature, direction, options.database, options.profiler
+            )
+            if cache is None
+            else find_cached_http_match(
+                packet_signature, direction, options.database, cache
+            )
+        )
+        result = HTTPResult(buffer, packet_signature, match)
+        notify_observers(result, options)
+        results.append(result)
+
+    return results
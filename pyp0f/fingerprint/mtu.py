@@ -4,6 +4,8 @@ from pyp0f.database import Database
 from pyp0f.database.records import MTURecord
 from pyp0f.database.signatures import MTUSignature
 from pyp0f.exceptions import PacketError
+from pyp0f.fingerprint.observer import notify_observers
+from pyp0f.fingerprint.profile import MatchProfiler
 from pyp0f.fingerprint.results import MTUResult
 from pyp0f.net.layers.tcp import TCPFlag
 from pyp0f.net.packet import Packet, PacketLike, parse_packet
@@ -37,13 +39,21 @@ def mtu_signatures_match(
 
 
 def find_mtu_match(
-    packet_signature: MTUPacketSignature, database: Database
+    packet_signature: MTUPacketSignature,
+    database: Database,
+    profiler: Optional[MatchProfiler] = None,
 ) -> Optional[MTURecord]:
     """
     Search through the database for a match for the given MTU signature.
     """
     for mtu_record in database.iter_values(MTURecord):
-        if mtu_signatures_match(mtu_record.signature, packet_signature):
+        if (
+            mtu_signatures_match(mtu_record.signature, packet_signature)
+            if profiler is None
+            else profiler.compare(
+                mtu_record, mtu_signatures_match, mtu_record.signature, packet_signature
+            )
+        ):
             return mtu_record
     return None
 
@@ -72,6 +82,10 @@ def fingerprint_mtu(packet: PacketLike, *, options: Options = OPTIONS) -> MTURes
 
     packet_signature = MTUPacketSignature.from_packet(packet)
 
-    return MTUResult(
-        packet, packet_signature, find_mtu_match(packet_signature, options.database)
+    result = MTUResult(
+        packet,
+        packet_signature,
+        find_mtu_match(packet_signature, options.database, options.profiler),
     )
+    notify_observers(result, options)
+    return result
@@ -0,0 +1,26 @@
+from abc import ABCMeta, abstractmethod
+from typing import Union
+
+from pyp0f.fingerprint.results import HTTPResult, MTUResult, TCPResult
+from pyp0f.options import Options
+
+ObservedResult = Union[TCPResult, MTUResult, HTTPResult]
+
+
+class ResultsObserver(metaclass=ABCMeta):
+    """
+    Receives every TCP, MTU and HTTP fingerprint result.
+    Observers are registered through ``Options.observers``.
+    """
+
+    @abstractmethod
+    def observe(self, result: ObservedResult) -> None:
+        """
+        Observe a fingerprint result.
+        Called synchronously by the fingerprint functions, so this should be cheap.
+        """
+
+
+def notify_observers(result: ObservedResult, options: Options) -> None:
+    for observer in options.observers:
+        observer.observe(result)
@@ -0,0 +1,30 @@
+"""
+Preparation of a database for pre-forked worker processes.
+
+Forked children share the parent's memory pages until they write to them, and CPython
+writes to objects it merely reads (reference counts) or scans (garbage collection).
+Everything the matchers build lazily is therefore built in the parent, so children
+only read it, and all the objects are moved out of the garbage collector's reach.
+The matchers register what they build (see ``register_derived``) when
+``pyp0f.fingerprint`` is imported.
+"""
+from pyp0f.database import Database
+
+
+def build_matching_structures(database: Database) -> None:
+    """
+    Build the structures the matchers derive from the database records
+    (TCP bitsets and prefilter, HTTP constrained headers, ids lookup tables).
+    See ``Database.build_derived``.
+    """
+    database.build_derived()
+
+
+def prepare_for_fork(database: Database) -> None:
+    """
+    Build the matching structures of the database and freeze all objects tracked by
+    the garbage collector (``gc.freeze``), so forked processes don't copy their pages
+    when collecting garbage. Call it in the parent, right before forking.
+    See ``Database.prepare_for_fork``.
+    """
+    database.prepare_for_fork()
@@ -0,0 +1,145 @@
+"""
+Database coverage and hot records profiling.
+
+When ``Options.profiler`` is set, the ``find_*_match`` loops report every signature
+comparison to it: how many times each record was compared, matched exactly or fuzzily,
+and the time spent comparing it. Without a profiler, the only overhead is one
+``None`` check per comparison.
+"""
+import threading
+from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+from pyp0f.database import Database
+from pyp0f.database.records import HTTPRecord, MTURecord, Record, TCPRecord
+from pyp0f.fingerprint.results import TCPMatchType
+from pyp0f.utils.slots import add_slots
+
+T = TypeVar("T")
+
+
+@add_slots
+@dataclass
+class RecordStats:
+    record: Record
+    """Profiled record"""
+
+    compared: int = 0
+    """Number of comparisons with packet signatures"""
+
+    exact: int = 0
+    """Number of exact matches"""
+
+    fuzzy: int = 0
+    """Number of fuzzy matches (TCP only)"""
+
+    time_ns: int = 0
+    """Total time spent comparing (nanoseconds)"""
+
+    @property
+    def matched(self) -> int:
+        return self.exact + self.fuzzy
+
+
+class MatchProfiler:
+    """
+    Collects per-record matching statistics, keyed by the record's line number.
+
+    The shared HTTP matches cache is bypassed while profiling, so comparisons
+    are not hidden by cache hits.
+
+    Example:
+        >>> profiler = MatchProfiler()
+        >>> options = Options(profiler=profiler)
+        >>> for packet in packets:
+        ...     fingerprint_tcp(packet, options=options)
+        >>> print(profiler.format_report(limit=10))
+    """
+
+    def __init__(self) -> None:
+        self.stats: Dict[int, RecordStats] = {}
+        self._lock = threading.Lock()
+
+    def compare(self, record: Record, match: Callable[..., T], *args) -> T:
+        """
+        Compare a record using the given match function, and record the result.
+        A match function result is exact if it's True or ``TCPMatchType.EXACT``,
+        and fuzzy if it's any other ``TCPMatchType``.
+
+        Args:
+            record: Compared record
+            match: Signatures match function
+            args: Match function arguments
+
+        Returns:
+            Match function result
+        """
+        start = perf_counter_ns()
+        result = match(*args)
+        elapsed = perf_counter_ns() - start
+
+        with self._lock:
+            stats = self.stats.get(record.line_number)
+
+            if stats is None:
+                stats = self.stats[record.line_number] = RecordStats(record)
+
+            stats.compared += 1
+            stats.time_ns += elapsed
+
+            if result is True or result == TCPMatchType.EXACT:
+                stats.exact += 1
+            elif isinstance(result, TCPMatchType):
+                stats.fuzzy += 1
+
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def report(self) -> List[RecordStats]:
+        """
+        Get the stats of all compared records, hottest (most time spent) first.
+        """
+        with self._lock:
+            return sorted(
+                self.stats.values(), key=lambda stats: stats.time_ns, reverse=True
+            )
+
+    def never_matched(self, database: Database) -> Iterator[Record]:
+        """
+        Iterate over database records that were never matched, candidates for pruning.
+        """
+        for record in database.iter_all_values():
+            if not isinstance(record, (TCPRecord, MTURecord, HTTPRecord)):
+                continue
+
+            stats = self.stats.get(record.line_number)
+
+            if stats is None or not stats.matched:
+                yield record
+
+    def format_report(self, limit: Optional[int] = None) -> str:
+        """
+        Format the report as a text table.
+
+        Args:
+            limit: Maximum number of records. Defaults to None (all records).
+
+        Returns:
+            Report table
+        """
+        lines = [
+            f"{'line':>6} {'compared':>10} {'exact':>8} {'fuzzy':>8} {'time_ms':>10}  signature"
+        ]
+
+        for stats in self.report()[:limit]:
+            lines.append(
+                f"{stats.record.line_number:>6} {stats.compared:>10} {stats.exact:>8} "
+                f"{stats.fuzzy:>8} {stats.time_ns / 1e6:>10.3f}  "
+                f"{stats.record.raw_signature}"
+            )
+
+        return "\n".join(lines)
@@ -2,6 +2,7 @@ from abc import ABCMeta
 from dataclasses import dataclass
 from typing import Generic, Optional, TypeVar
 
+from pyp0f.database.records import Record
 from pyp0f.net.packet import Packet
 from pyp0f.net.signatures import PacketSignature
 from pyp0f.utils.slots import add_slots
@@ -25,3 +26,20 @@ class Result(Generic[TMatch, TSignature], metaclass=ABCMeta):
 
     match: Optional[TMatch] = None
     """Fingerprint match, if any."""
+
+    @property
+    def record(self) -> Optional[Record]:
+        """Matched record, if any."""
+        return self.match  # type: ignore
+
+    @property
+    def record_id(self) -> int:
+        """Id of the matched record (-1 if no match)."""
+        record = self.record
+        return -1 if record is None else record.id
+
+    @property
+    def label_id(self) -> int:
+        """Id of the matched record's label (-1 if no match)."""
+        record = self.record
+        return -1 if record is None else record.label_id
@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum, auto
+from typing import Optional
 
 from pyp0f.database.records import TCPRecord
 from pyp0f.net.signatures import TCPPacketSignature
@@ -50,6 +51,11 @@ class TCPResult(Result[TCPMatch, TCPPacketSignature]):
             else self.match.record.signature.ttl - self.packet_signature.ttl
         )
 
+    @property
+    def record(self) -> Optional[TCPRecord]:
+        """Matched record, if any."""
+        return None if self.match is None else self.match.record
+
 
 def guess_distance(ttl: int) -> int:
     """
@@ -1,16 +1,28 @@
-from typing import Optional
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from pyp0f.database import Database, register_derived
 from pyp0f.database.parse.utils import WILDCARD
 from pyp0f.database.records import TCPRecord
+from pyp0f.database.records_database import RecordsDatabase
 from pyp0f.database.signatures import TCPSignature, WindowType
 from pyp0f.exceptions import PacketError
+from pyp0f.fingerprint.observer import notify_observers
 from pyp0f.fingerprint.results import TCPMatch, TCPMatchType, TCPResult
+from pyp0f.fingerprint.tcp_bitsets import iter_tcp_bitset_candidates
 from pyp0f.net.layers.ip import IPV4
 from pyp0f.net.layers.tcp import TCPFlag
 from pyp0f.net.packet import Direction, Packet, PacketLike, parse_packet
-from pyp0f.net.quirks import Quirk
 from pyp0f.net.signatures import TCPPacketSignature
-from pyp0f.options import OPTIONS, Options
+from pyp0f.options import OPTIONS, Options, TCPEngine
+
+# (layout, EOL padding length, IP options length) -> payload class ->
+# (MSS, window scale) -> records with their position in the database.
+# WILDCARD keys accept any packet value.
+TCPPrefilter = Dict[
+    Tuple[Tuple[int, ...], int, int],
+    Dict[int, Dict[Tuple[int, int], List[Tuple[int, TCPRecord]]]],
+]
 
 
 def valid_for_tcp_fingerprint(packet: Packet) -> bool:
@@ -32,39 +44,38 @@ def tcp_signatures_match(
     """
     match_type: TCPMatchType = TCPMatchType.EXACT
 
-    if signature.options.layout != packet_signature.options.layout:
+    # Fixed parameters and simple wildcards, cheapest to reject on.
+    if (
+        signature.options.layout != packet_signature.options.layout
+        or signature.options.eol_padding_length
+        != packet_signature.options.eol_padding_length
+        or signature.ip_options_length != packet_signature.ip_options_length
+        or signature.options.mss != WILDCARD
+        and signature.options.mss != packet_signature.options.mss
+        or signature.window.scale != WILDCARD
+        and signature.window.scale != packet_signature.options.window_scale
+        or signature.payload_class != WILDCARD
+        and signature.payload_class != packet_signature.has_payload
+    ):
         return None
 
-    signature_quirks = signature.quirks
-
-    # If the database signature has no IP version specified, remove
-    # IPv6-specific quirks when matching IPv4 packets and vice versa.
-    if signature.ip_version == WILDCARD:
-        signature_quirks &= (
-            ~(Quirk.FLOW)
-            if packet_signature.ip_version == IPV4
-            else ~(Quirk.DF | Quirk.NZ_ID | Quirk.ZERO_ID | Quirk.NZ_MBZ)
-        )
-
-    if signature_quirks != packet_signature.quirks:
-        deleted = (signature_quirks ^ packet_signature.quirks) & signature_quirks
-        added = (signature_quirks ^ packet_signature.quirks) & packet_signature.quirks
+    # Quirks the signature matches were computed at load, with IPv6-specific
+    # quirks removed for IPv4 packets and vice versa (see ``QuirksTolerance``).
+    quirks_tolerance = (
+        signature.ipv4_quirks
+        if packet_signature.ip_version == IPV4
+        else signature.ipv6_quirks
+    )
+    quirks = packet_signature.quirks_value
 
+    if quirks != quirks_tolerance.exact:
         # If there is a difference in quirks, but it's 'df' or 'id+' disappearing,
         # or 'id-' or 'ecn' appearing, allow a fuzzy match.
-        if deleted & ~(Quirk.DF | Quirk.NZ_ID) or added & ~(Quirk.ZERO_ID | Quirk.ECN):
+        if quirks not in quirks_tolerance.fuzzy:
             return None
 
         match_type = TCPMatchType.FUZZY_QUIRKS
 
-    # Fixed parameters.
-    if (
-        signature.options.eol_padding_length
-        != packet_signature.options.eol_padding_length
-        or signature.ip_options_length != packet_signature.ip_options_length
-    ):
-        return None
-
     # TTL matching, with a provision to allow fuzzy match.
     if signature.is_bad_ttl:
         if signature.ttl < packet_signature.ttl:
@@ -75,17 +86,6 @@ def tcp_signatures_match(
     ):
         match_type = TCPMatchType.FUZZY_TTL
 
-    # Simple wildcards
-    if (
-        signature.options.mss != WILDCARD
-        and signature.options.mss != packet_signature.options.mss
-        or signature.window.scale != WILDCARD
-        and signature.window.scale != packet_signature.options.window_scale
-        or signature.payload_class != WILDCARD
-        and signature.payload_class != packet_signature.has_payload
-    ):
-        return None
-
     # Window size
     if (
         (
@@ -116,6 +116,77 @@ def tcp_signatures_match(
     return match_type
 
 
+@register_derived
+def tcp_prefilter(direction: Direction, database: Database) -> TCPPrefilter:
+    """
+    Get the TCP prefilter tree of the database records of the given direction.
+    """
+
+    def build(records: RecordsDatabase) -> TCPPrefilter:
+        tree: TCPPrefilter = {}
+
+        for position, record in enumerate(records.iter_values(TCPRecord, direction)):
+            signature = record.signature
+            fixed_key = (
+                tuple(signature.options.layout),
+                signature.options.eol_padding_length,
+                signature.ip_options_length,
+            )
+            tree.setdefault(fixed_key, {}).setdefault(
+                signature.payload_class, {}
+            ).setdefault((signature.options.mss, signature.window.scale), []).append(
+                (position, record)
+            )
+
+        return tree
+
+    return database.cached((TCPRecord, "prefilter", direction), build)
+
+
+def iter_tcp_candidates(
+    packet_signature: TCPPacketSignature, direction: Direction, database: Database
+) -> Iterable[TCPRecord]:
+    """
+    Iterate over the TCP records that may match the given TCP signature,
+    in database order: records whose layout, EOL padding, IP options length,
+    payload class, MSS and window scale accept the signature.
+    """
+    branches = tcp_prefilter(direction, database).get(
+        (
+            tuple(packet_signature.options.layout),
+            packet_signature.options.eol_padding_length,
+            packet_signature.ip_options_length,
+        )
+    )
+
+    if branches is None:
+        return ()
+
+    mss = packet_signature.options.mss
+    window_scale = packet_signature.options.window_scale
+    leaves: List[List[Tuple[int, TCPRecord]]] = []
+
+    for payload_class in (int(packet_signature.has_payload), WILDCARD):
+        values = branches.get(payload_class)
+
+        if values is None:
+            continue
+
+        for key in (
+            (mss, window_scale),
+            (mss, WILDCARD),
+            (WILDCARD, window_scale),
+            (WILDCARD, WILDCARD),
+        ):
+            leaf = values.get(key)
+
+            if leaf is not None:
+                leaves.append(leaf)
+
+    # Positions are unique, so records themselves are never compared
+    return (record for _, record in heapq.merge(*leaves))
+
+
 def find_tcp_match(
     packet_signature: TCPPacketSignature, direction: Direction, options: Options
 ) -> Optional[TCPMatch]:
@@ -124,10 +195,30 @@ def find_tcp_match(
     """
     fuzzy_match: Optional[TCPMatch] = None
     generic_match: Optional[TCPMatch] = None
+    profiler = options.profiler
 
-    for tcp_record in options.database.iter_values(TCPRecord, direction):
-        match_type = tcp_signatures_match(
-            tcp_record.signature, packet_signature, options
+    tcp_records: Iterable[TCPRecord]
+
+    if options.tcp_engine == TCPEngine.BITSET:
+        tcp_records = iter_tcp_bitset_candidates(
+            packet_signature, direction, options.database
+        )
+    elif options.tcp_engine == TCPEngine.PREFILTER:
+        tcp_records = iter_tcp_candidates(packet_signature, direction, options.database)
+    else:
+        tcp_records = options.database.iter_values(TCPRecord, direction)
+
+    for tcp_record in tcp_records:
+        match_type = (
+            tcp_signatures_match(tcp_record.signature, packet_signature, options)
+            if profiler is None
+            else profiler.compare(
+                tcp_record,
+                tcp_signatures_match,
+                tcp_record.signature,
+                packet_signature,
+                options,
+            )
         )
 
         if match_type is None:
@@ -188,8 +279,10 @@ def fingerprint_tcp(
 
     packet_signature = TCPPacketSignature.from_packet(packet, syn_mss)
 
-    return TCPResult(
+    result = TCPResult(
         packet,
         packet_signature,
         find_tcp_match(packet_signature, direction, options),
     )
+    notify_observers(result, options)
+    return result
@@ -0,0 +1,186 @@
+"""
+Bitset-intersection candidate engine for TCP records.
+
+Records of each direction get a position (their database order), and each matchable
+attribute value maps to a big-int bitset of the positions of records that accept it.
+A packet's candidates are the AND of a handful of bitsets, and walking the set bits
+from the lowest keeps database order, so ``find_tcp_match`` semantics are preserved.
+
+The bitsets are built once per records and never written afterwards, so they are
+safe to share between threads and between forked processes.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterator, Sequence, Tuple
+
+from pyp0f.database import Database, register_derived
+from pyp0f.database.parse.utils import WILDCARD
+from pyp0f.database.records import TCPRecord
+from pyp0f.database.records_database import RecordsDatabase
+from pyp0f.database.signatures import WindowType
+from pyp0f.net.layers.ip import IPV4
+from pyp0f.net.packet import Direction
+from pyp0f.net.signatures import TCPPacketSignature
+from pyp0f.utils.slots import add_slots
+
+MAX_TTL = 255
+
+
+@add_slots
+@dataclass
+class TCPBitsets:
+    records: Tuple[TCPRecord, ...]
+    """Records, by position"""
+
+    layouts: Dict[Tuple[int, ...], int]
+    eol_padding_lengths: Dict[int, int]
+    ip_options_lengths: Dict[int, int]
+
+    payload_classes: Tuple[int, int]
+    """Records accepting packets without and with payload"""
+
+    any_mss: int
+    mss: Dict[int, int]
+
+    any_window_scale: int
+    window_scales: Dict[int, int]
+
+    any_window_size: int
+    """Records without a fixed window size (checked by the full comparison)"""
+
+    window_sizes: Dict[int, int]
+
+    ttls: Tuple[int, ...]
+    """Records accepting each packet TTL (only ``ttl-`` signatures reject TTLs)"""
+
+    quirks: Dict[Tuple[bool, int], int]
+    """
+    Records accepting (is IPv4, quirks value), exactly or fuzzily.
+    Only the values accepted by some record are keys.
+    """
+
+    @classmethod
+    def from_records(cls, records: Sequence[TCPRecord]) -> "TCPBitsets":
+        layouts: Dict[Tuple[int, ...], int] = {}
+        eol_padding_lengths: Dict[int, int] = {}
+        ip_options_lengths: Dict[int, int] = {}
+        payload_classes = [0, 0]
+        any_mss = any_window_scale = any_window_size = 0
+        mss: Dict[int, int] = {}
+        window_scales: Dict[int, int] = {}
+        window_sizes: Dict[int, int] = {}
+        ttls = [0] * (MAX_TTL + 1)
+        quirks: Dict[Tuple[bool, int], int] = {}
+
+        for position, record in enumerate(records):
+            bit = 1 << position
+            signature = record.signature
+
+            _add(layouts, tuple(signature.options.layout), bit)
+            _add(eol_padding_lengths, signature.options.eol_padding_length, bit)
+            _add(ip_options_lengths, signature.ip_options_length, bit)
+
+            for has_payload in (0, 1):
+                if signature.payload_class in (WILDCARD, has_payload):
+                    payload_classes[has_payload] |= bit
+
+            if signature.options.mss == WILDCARD:
+                any_mss |= bit
+            else:
+                _add(mss, signature.options.mss, bit)
+
+            if signature.window.scale == WILDCARD:
+                any_window_scale |= bit
+            else:
+                _add(window_scales, signature.window.scale, bit)
+
+            if signature.window.type == WindowType.NORMAL:
+                _add(window_sizes, signature.window.size, bit)
+            else:
+                any_window_size |= bit
+
+            max_ttl = signature.ttl if signature.is_bad_ttl else MAX_TTL
+            for ttl in range(max_ttl + 1):
+                ttls[ttl] |= bit
+
+            for is_ipv4, tolerance in (
+                (True, signature.ipv4_quirks),
+                (False, signature.ipv6_quirks),
+            ):
+                for value in (tolerance.exact, *tolerance.fuzzy):
+                    _add(quirks, (is_ipv4, value), bit)
+
+        return cls(
+            records=tuple(records),
+            layouts=layouts,
+            eol_padding_lengths=eol_padding_lengths,
+            ip_options_lengths=ip_options_lengths,
+            payload_classes=(payload_classes[0], payload_classes[1]),
+            any_mss=any_mss,
+            mss=mss,
+            any_window_scale=any_window_scale,
+            window_scales=window_scales,
+            any_window_size=any_window_size,
+            window_sizes=window_sizes,
+            ttls=tuple(ttls),
+            quirks=quirks,
+        )
+
+
+def _add(bitsets: Dict, key, bit: int) -> None:
+    bitsets[key] = bitsets.get(key, 0) | bit
+
+
+@register_derived
+def tcp_bitsets(direction: Direction, database: Database) -> TCPBitsets:
+    """
+    Get the TCP bitsets of the database records of the given direction.
+    """
+
+    def build(records: RecordsDatabase) -> TCPBitsets:
+        return TCPBitsets.from_records(tuple(records.iter_values(TCPRecord, direction)))
+
+    return database.cached((TCPRecord, "bitsets", direction), build)
+
+
+def iter_tcp_bitset_candidates(
+    packet_signature: TCPPacketSignature, direction: Direction, database: Database
+) -> Iterator[TCPRecord]:
+    """
+    Iterate over the TCP records that may match the given TCP signature,
+    in database order.
+    """
+    bitsets = tcp_bitsets(direction, database)
+    options = packet_signature.options
+
+    candidates = (
+        bitsets.layouts.get(tuple(options.layout), 0)
+        & bitsets.eol_padding_lengths.get(options.eol_padding_length, 0)
+        & bitsets.ip_options_lengths.get(packet_signature.ip_options_length, 0)
+    )
+
+    if candidates:
+        candidates &= (
+            bitsets.payload_classes[packet_signature.has_payload]
+            & (bitsets.any_mss | bitsets.mss.get(options.mss, 0))
+            & (
+                bitsets.any_window_scale
+                | bitsets.window_scales.get(options.window_scale, 0)
+            )
+            & (
+                bitsets.any_window_size
+                | bitsets.window_sizes.get(packet_signature.window_size, 0)
+            )
+            & bitsets.ttls[min(packet_signature.ttl, MAX_TTL)]
+        )
+
+    if candidates:
+        candidates &= bitsets.quirks.get(
+            (packet_signature.ip_version == IPV4, packet_signature.quirks_value), 0
+        )
+
+    records = bitsets.records
+
+    while candidates:
+        lowest = candidates & -candidates
+        yield records[lowest.bit_length() - 1]
+        candidates ^= lowest
@@ -0,0 +1,17 @@
+from .build import build_image
+from .image import (
+    DatabaseImage,
+    ImageMatch,
+    ImageResult,
+    create_shared_image,
+    write_image,
+)
+
+__all__ = [
+    "DatabaseImage",
+    "ImageMatch",
+    "ImageResult",
+    "build_image",
+    "create_shared_image",
+    "write_image",
+]
@@ -0,0 +1,221 @@
+from typing import Dict, List, Tuple
+
+from pyp0f.database import Database
+from pyp0f.database.labels import Label
+from pyp0f.database.records import HTTPRecord, MTURecord, Record, TCPRecord
+from pyp0f.exceptions import DatabaseError
+from pyp0f.net.packet import Direction
+
+from .layout import (
+    COUNT,
+    COUNTS,
+    FLAG_BAD_TTL,
+    FLAG_GENERIC,
+    FLAG_USER_APP,
+    HEADER,
+    HTTP_ABSENT_HEADER,
+    HTTP_HEADER,
+    HTTP_RECORD,
+    HTTP_SECTIONS,
+    LABEL,
+    LABEL_KIND,
+    MAGIC,
+    MISSING_LABEL_KIND,
+    MTU_LABEL_KIND,
+    MTU_RECORD,
+    TCP_GROUP,
+    TCP_RECORD,
+    TCP_SECTIONS,
+    VERSION,
+    WINDOW_TYPES,
+    Section,
+    names_mask,
+)
+
+
+class _Blob:
+    """
+    Variable-length data of an image, equal values are stored once.
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._offsets: Dict[bytes, int] = {}
+
+    def add(self, value: bytes, alignment: int = 1) -> Tuple[int, int]:
+        offset = self._offsets.get(value)
+
+        if offset is None or offset % alignment:
+            self.data.extend(b"\0" * (-len(self.data) % alignment))
+            offset = self._offsets[value] = len(self.data)
+            self.data.extend(value)
+
+        return offset, len(value)
+
+
+def _record_ids(record: Record) -> Tuple[int, int]:
+    if record.id < 0 or record.label_id < 0:
+        raise DatabaseError(
+            f"Record in line {record.line_number} has no id, "
+            "only records loaded from a database file can be imaged"
+        )
+    return record.id, record.label_id
+
+
+def _tcp_section(records: List[TCPRecord], blob: _Blob) -> bytes:
+    groups: Dict[bytes, List[int]] = {}
+    packed_records = bytearray()
+
+    for position, record in enumerate(records):
+        signature = record.signature
+        groups.setdefault(bytes(signature.options.layout), []).append(position)
+        flags = (
+            (FLAG_GENERIC if record.is_generic else 0)
+            | (FLAG_BAD_TTL if signature.is_bad_ttl else 0)
+            | (FLAG_USER_APP if record.label.is_user_app else 0)
+        )
+        ipv4_fuzzy = blob.add(_u32_array(signature.ipv4_quirks.fuzzy), alignment=4)
+        ipv6_fuzzy = blob.add(_u32_array(signature.ipv6_quirks.fuzzy), alignment=4)
+
+        packed_records += TCP_RECORD.pack(
+            *_record_ids(record),
+            flags,
+            signature.ttl,
+            signature.ip_options_length,
+            signature.options.eol_padding_length,
+            signature.payload_class,
+            WINDOW_TYPES.index(signature.window.type),
+            signature.window.scale,
+            signature.window.size,
+            signature.options.mss,
+            signature.ipv4_quirks.exact,
+            signature.ipv6_quirks.exact,
+            ipv4_fuzzy[0],
+            len(signature.ipv4_quirks.fuzzy),
+            ipv6_fuzzy[0],
+            len(signature.ipv6_quirks.fuzzy),
+        )
+
+    packed_groups = bytearray()
+
+    for layout, positions in groups.items():
+        members_offset, _ = blob.add(
+            b"".join(position.to_bytes(2, "little") for position in positions),
+            alignment=2,
+        )
+        packed_groups += TCP_GROUP.pack(
+            *blob.add(layout), members_offset, len(positions)
+        )
+
+    return COUNTS.pack(len(records), len(groups)) + packed_groups + packed_records
+
+
+def _http_section(records: List[HTTPRecord], blob: _Blob) -> bytes:
+    packed = bytearray(COUNT.pack(len(records)))
+
+    for record in records:
+        signature = record.signature
+        headers = b"".join(
+            HTTP_HEADER.pack(
+                *blob.add(header.lower_name),
+                *(
+                    (0, -1)
+                    if header.value is None
+                    else blob.add(header.value)  # type: ignore
+                ),
+                header.is_optional,
+            )
+            for header in signature.headers
+        )
+        absent_headers = b"".join(
+            HTTP_ABSENT_HEADER.pack(*blob.add(name))
+            for name in sorted(signature.absent_headers)
+        )
+
+        packed += HTTP_RECORD.pack(
+            *_record_ids(record),
+            FLAG_GENERIC if record.is_generic else 0,
+            signature.version,
+            names_mask(signature.header_names),
+            names_mask(signature.absent_headers),
+            blob.add(headers, alignment=4)[0],
+            len(signature.headers),
+            blob.add(absent_headers, alignment=4)[0],
+            len(signature.absent_headers),
+        )
+
+    return bytes(packed)
+
+
+def _mtu_section(records: List[MTURecord]) -> bytes:
+    return COUNT.pack(len(records)) + b"".join(
+        MTU_RECORD.pack(record.signature.mtu, *_record_ids(record))
+        for record in records
+    )
+
+
+def _labels_section(database: Database, blob: _Blob) -> bytes:
+    labels = database.labels
+    packed = bytearray(COUNT.pack(len(labels)))
+
+    for label in labels:
+        if label is None:
+            packed += LABEL.pack(MISSING_LABEL_KIND, *blob.add(b""), *blob.add(b""))
+            continue
+
+        is_label = isinstance(label, Label)
+        packed += LABEL.pack(
+            LABEL_KIND if is_label else MTU_LABEL_KIND,
+            *blob.add(label.dump().encode()),
+            *blob.add(",".join(label.sys).encode() if is_label else b""),
+        )
+
+    return bytes(packed)
+
+
+def _u32_array(values) -> bytes:
+    return b"".join(value.to_bytes(4, "little") for value in sorted(values))
+
+
+def build_image(database: Database) -> bytes:
+    """
+    Compile the matching tables of a database into a flat binary image
+    (see ``pyp0f.image.layout``).
+
+    Args:
+        database: Loaded database
+
+    Raises:
+        DatabaseError: The database has records not loaded from a database file
+
+    Returns:
+        Database image
+    """
+    blob = _Blob()
+    sections: Dict[Section, bytes] = {
+        Section.MTU: _mtu_section(list(database.iter_values(MTURecord)))
+    }
+
+    for direction in (Direction.CLIENT_TO_SERVER, Direction.SERVER_TO_CLIENT):
+        sections[TCP_SECTIONS[direction]] = _tcp_section(
+            list(database.iter_values(TCPRecord, direction)), blob
+        )
+        sections[HTTP_SECTIONS[direction]] = _http_section(
+            list(database.iter_values(HTTPRecord, direction)), blob
+        )
+
+    sections[Section.LABELS] = _labels_section(database, blob)
+
+    image = bytearray(HEADER.size)
+    offsets = []
+
+    for section in Section:
+        image.extend(b"\0" * (-len(image) % 4))
+        offsets.append(len(image))
+        image += sections[section]
+
+    image.extend(b"\0" * (-len(image) % 4))
+    HEADER.pack_into(image, 0, MAGIC, VERSION, *offsets, len(image))
+    image += blob.data
+
+    return bytes(image)
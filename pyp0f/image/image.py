@@ -0,0 +1,657 @@
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pyp0f.database import Database
+from pyp0f.database.labels import DatabaseLabel, Label, MTULabel
+from pyp0f.database.parse.utils import WILDCARD
+from pyp0f.database.signatures import SignatureHeader, WindowType
+from pyp0f.exceptions import DatabaseError, PacketError
+from pyp0f.fingerprint.http import headers_match
+from pyp0f.fingerprint.mtu import valid_for_mtu_fingerprint
+from pyp0f.fingerprint.results import TCPMatchType
+from pyp0f.fingerprint.results.tcp import guess_distance
+from pyp0f.fingerprint.tcp import valid_for_tcp_fingerprint
+from pyp0f.net.layers.http import BufferLike, read_payload
+from pyp0f.net.layers.ip import IPV4
+from pyp0f.net.layers.tcp import TCPFlag
+from pyp0f.net.packet import Direction, Packet, PacketLike, parse_packet
+from pyp0f.net.signatures import (
+    HTTPPacketSignature,
+    MTUPacketSignature,
+    PacketSignature,
+    TCPPacketSignature,
+)
+from pyp0f.options import Options
+from pyp0f.utils.path import PathLike, always_path
+from pyp0f.utils.shm import attach_shared_memory, create_shared_memory
+from pyp0f.utils.slots import add_slots
+
+from .build import build_image
+from .layout import (
+    COUNT,
+    COUNTS,
+    FLAG_BAD_TTL,
+    FLAG_GENERIC,
+    FLAG_USER_APP,
+    HEADER,
+    HTTP_ABSENT_HEADER,
+    HTTP_HEADER,
+    HTTP_RECORD,
+    HTTP_SECTIONS,
+    LABEL,
+    LABEL_KIND,
+    MAGIC,
+    MISSING_LABEL_KIND,
+    MTU_RECORD,
+    TCP_GROUP,
+    TCP_RECORD,
+    TCP_SECTIONS,
+    VERSION,
+    WINDOW_TYPES,
+    Section,
+    names_mask,
+)
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+
+_NORMAL = WINDOW_TYPES.index(WindowType.NORMAL)
+_MOD = WINDOW_TYPES.index(WindowType.MOD)
+_MSS = WINDOW_TYPES.index(WindowType.MSS)
+_MTU = WINDOW_TYPES.index(WindowType.MTU)
+
+# Layout -> members (offset, count)
+TCPDirectory = Dict[bytes, Tuple[int, int]]
+
+TSignature = TypeVar("TSignature", bound=PacketSignature)
+
+
+@add_slots
+@dataclass
+class ImageMatch:
+    record_id: int
+    """Id of the matching record (see ``Record.id``)"""
+
+    label_id: int
+    """Id of the matching record's label (see ``DatabaseImage.get_label``)"""
+
+    type: TCPMatchType = TCPMatchType.EXACT
+    """Match type, MTU and HTTP matches are always exact"""
+
+    ttl: int = 0
+    """Signature TTL of the matching record (TCP matches only)"""
+
+
+@add_slots
+@dataclass
+class ImageResult(Generic[TSignature]):
+    """
+    Fingerprint result of a database image. Holds the label of the match
+    instead of its record, which is not in the image.
+    """
+
+    packet: Union[Packet, BufferLike]
+    """Origin packet (or HTTP payload)."""
+
+    packet_signature: TSignature
+    """Origin packet signature."""
+
+    match: Optional[ImageMatch] = None
+    """Fingerprint match, if any."""
+
+    label: Optional[DatabaseLabel] = None
+    """Label of the match, if any."""
+
+    distance: int = -1
+    """Estimated distance (TTL), for TCP results."""
+
+
+class DatabaseImage:
+    """
+    Matching tables of a database, read directly from a flat binary buffer
+    (see ``pyp0f.image.layout``), e.g. shared memory or a memory-mapped file.
+
+    Opening an image only validates its header, and matching reads records straight
+    from the buffer, so any number of processes can map the same image without
+    parsing the database or holding their own copy of it. Labels and HTTP headers
+    (compared by substring) are decoded on first use.
+
+    Example:
+        >>> shm = create_shared_image(DATABASE)  # Once, in the parent
+        >>> image = DatabaseImage.attach(shm.name)  # In each worker
+        >>> match = image.find_tcp_match(packet_signature, Direction.CLIENT_TO_SERVER)
+        >>> image.get_label(match.label_id).dump()
+        's:unix:Linux:3.11 and newer'
+        >>> image.fingerprint_tcp(packet).label.dump()  # Or straight from a packet
+        's:unix:Linux:3.11 and newer'
+    """
+
+    def __init__(
+        self,
+        buffer: Union[bytes, bytearray, memoryview, mmap.mmap],
+        close: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Args:
+            buffer: Image buffer
+            close: Releases the underlying buffer, called by ``close``. Defaults to None.
+
+        Raises:
+            DatabaseError: The buffer is not a valid database image
+        """
+        self._buffer = memoryview(buffer)
+        self._close = close
+
+        if len(self._buffer) < HEADER.size:
+            self.close()
+            raise DatabaseError("Invalid database image: too short")
+
+        magic, version, *offsets, blob = HEADER.unpack_from(self._buffer)
+
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise DatabaseError(
+                f"Invalid database image: expected {MAGIC!r} version {VERSION}, "
+                f"got {magic!r} version {version}"
+            )
+
+        self._sections = offsets
+        self._blob = blob
+        self._labels: Dict[int, DatabaseLabel] = {}
+        self._tcp_directories: Dict[Direction, TCPDirectory] = {}
+        self._http_headers_lists: Dict[Tuple[int, int], List[SignatureHeader]] = {}
+
+    @classmethod
+    def from_database(cls, database: Database) -> "DatabaseImage":
+        """
+        Build an in-memory image of a database.
+        """
+        return cls(build_image(database))
+
+    @classmethod
+    def open(cls, filepath: PathLike) -> "DatabaseImage":
+        """
+        Memory-map an image file (see ``write_image``).
+
+        Raises:
+            DatabaseError: The file is not a valid database image
+        """
+        with always_path(filepath).open("rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls(mapped, mapped.close)
+
+    @classmethod
+    def attach(cls, name: str) -> "DatabaseImage":
+        """
+        Attach to an image in shared memory (see ``create_shared_image``).
+        Before Python 3.13, shared memory is tracked (and unlinked on exit) by the
+        resource tracker of the attaching process, so attach from forked processes.
+
+        Raises:
+            DatabaseError: The shared memory is not a valid database image
+            ImportError: Shared memory is not supported (Python 3.7)
+        """
+        shm = attach_shared_memory(name)
+        return cls(shm.buf, shm.close)
+
+    def close(self) -> None:
+        """
+        Release the image buffer.
+        """
+        self._buffer.release()
+
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self) -> "DatabaseImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self._blob + offset
+        end = start + length
+        return self._buffer[start:end].tobytes()
+
+    def _u32_array(self, offset: int, count: int) -> Tuple[int, ...]:
+        return struct.unpack_from(f"<{count}I", self._buffer, self._blob + offset)
+
+    def _tcp_directory(self, direction: Direction) -> TCPDirectory:
+        directory = self._tcp_directories.get(direction)
+
+        if directory is None:
+            section = self._sections[TCP_SECTIONS[direction]]
+            _, group_count = COUNTS.unpack_from(self._buffer, section)
+            directory = {}
+
+            for i in range(group_count):
+                (
+                    layout_offset,
+                    layout_length,
+                    members_offset,
+                    count,
+                ) = TCP_GROUP.unpack_from(
+                    self._buffer, section + COUNTS.size + i * TCP_GROUP.size
+                )
+                directory[self._bytes(layout_offset, layout_length)] = (
+                    members_offset,
+                    count,
+                )
+
+            self._tcp_directories[direction] = directory
+
+        return directory
+
+    def find_tcp_match(
+        self,
+        packet_signature: TCPPacketSignature,
+        direction: Direction,
+        max_dist: int = Options.max_dist,
+    ) -> Optional[ImageMatch]:
+        """
+        Search the image for a match for the given TCP signature
+        (same selection as ``find_tcp_match``).
+        """
+        members = self._tcp_directory(direction).get(
+            bytes(packet_signature.options.layout)
+        )
+
+        if members is None:
+            return None
+
+        buffer = self._buffer
+        section = self._sections[TCP_SECTIONS[direction]]
+        _, group_count = COUNTS.unpack_from(buffer, section)
+        records_offset = section + COUNTS.size + group_count * TCP_GROUP.size
+        positions = struct.unpack_from(
+            f"<{members[1]}H", buffer, self._blob + members[0]
+        )
+
+        options = packet_signature.options
+        is_ipv4 = packet_signature.ip_version == IPV4
+        quirks = packet_signature.quirks_value
+        fuzzy_match: Optional[ImageMatch] = None
+        generic_match: Optional[ImageMatch] = None
+        fuzzy_is_user_app = False
+
+        for position in positions:
+            (
+                record_id,
+                label_id,
+                flags,
+                ttl,
+                ip_options_length,
+                eol_padding_length,
+                payload_class,
+                window_type,
+                window_scale,
+                window_size,
+                mss,
+                ipv4_exact,
+                ipv6_exact,
+                ipv4_fuzzy_offset,
+                ipv4_fuzzy_count,
+                ipv6_fuzzy_offset,
+                ipv6_fuzzy_count,
+            ) = TCP_RECORD.unpack_from(
+                buffer, records_offset + position * TCP_RECORD.size
+            )
+
+            if (
+                eol_padding_length != options.eol_padding_length
+                or ip_options_length != packet_signature.ip_options_length
+                or mss != WILDCARD
+                and mss != options.mss
+                or window_scale != WILDCARD
+                and window_scale != options.window_scale
+                or payload_class != WILDCARD
+                and payload_class != packet_signature.has_payload
+            ):
+                continue
+
+            match_type = TCPMatchType.EXACT
+
+            if quirks != (ipv4_exact if is_ipv4 else ipv6_exact):
+                if quirks not in (
+                    self._u32_array(ipv4_fuzzy_offset, ipv4_fuzzy_count)
+                    if is_ipv4
+                    else self._u32_array(ipv6_fuzzy_offset, ipv6_fuzzy_count)
+                ):
+                    continue
+
+                match_type = TCPMatchType.FUZZY_QUIRKS
+
+            if flags & FLAG_BAD_TTL:
+                if ttl < packet_signature.ttl:
+                    continue
+            elif ttl < packet_signature.ttl or ttl - packet_signature.ttl > max_dist:
+                match_type = TCPMatchType.FUZZY_TTL
+
+            if window_type == _NORMAL:
+                if window_size != packet_signature.window_size:
+                    continue
+            elif window_type == _MOD:
+                if packet_signature.window_size % window_size:
+                    continue
+            elif window_type in (_MSS, _MTU):
+                multiplier = packet_signature.window_multiplier
+
+                if multiplier.is_mtu != (window_type == _MTU) or (
+                    window_size != multiplier.value
+                ):
+                    continue
+
+            match = ImageMatch(record_id, label_id, match_type, ttl)
+
+            if match_type == TCPMatchType.EXACT:
+                if not flags & FLAG_GENERIC:
+                    return match
+
+                if generic_match is None:
+                    generic_match = match
+
+            elif fuzzy_match is None:
+                fuzzy_match = match
+                fuzzy_is_user_app = bool(flags & FLAG_USER_APP)
+
+        if generic_match is not None:
+            return generic_match
+
+        # No fuzzy matching for userland tools.
+        if fuzzy_is_user_app:
+            return None
+
+        return fuzzy_match
+
+    def find_mtu_match(
+        self, packet_signature: MTUPacketSignature
+    ) -> Optional[ImageMatch]:
+        """
+        Search the image for a match for the given MTU signature.
+        """
+        section = self._sections[Section.MTU]
+        (count,) = COUNT.unpack_from(self._buffer, section)
+        start = section + COUNT.size
+        end = start + count * MTU_RECORD.size
+
+        for mtu, record_id, label_id in MTU_RECORD.iter_unpack(self._buffer[start:end]):
+            if mtu == packet_signature.mtu:
+                return ImageMatch(record_id, label_id)
+
+        return None
+
+    def _http_headers(self, offset: int, count: int) -> List[SignatureHeader]:
+        headers = self._http_headers_lists.get((offset, count))
+
+        if headers is not None:
+            return headers
+
+        headers = []
+
+        for i in range(count):
+            (
+                name_offset,
+                name_length,
+                value_offset,
+                value_length,
+                is_optional,
+            ) = HTTP_HEADER.unpack_from(
+                self._buffer, self._blob + offset + i * HTTP_HEADER.size
+            )
+            headers.append(
+                SignatureHeader(
+                    name=self._bytes(name_offset, name_length),
+                    is_optional=bool(is_optional),
+                    value=None
+                    if value_length < 0
+                    else self._bytes(value_offset, value_length),
+                )
+            )
+
+        # Decoded on first comparison, like labels, bounded by the image records
+        self._http_headers_lists[offset, count] = headers
+        return headers
+
+    def _http_absent_headers(self, offset: int, count: int) -> List[bytes]:
+        return [
+            self._bytes(name_offset, name_length)
+            for name_offset, name_length in (
+                HTTP_ABSENT_HEADER.unpack_from(
+                    self._buffer, self._blob + offset + i * HTTP_ABSENT_HEADER.size
+                )
+                for i in range(count)
+            )
+        ]
+
+    def find_http_match(
+        self, packet_signature: HTTPPacketSignature, direction: Direction
+    ) -> Optional[ImageMatch]:
+        """
+        Search the image for a match for the given HTTP signature
+        (same selection as ``find_http_match``).
+        """
+        section = self._sections[HTTP_SECTIONS[direction]]
+        (count,) = COUNT.unpack_from(self._buffer, section)
+        packet_headers = packet_signature.header_names
+        packet_mask = names_mask(packet_headers)
+        generic_match: Optional[ImageMatch] = None
+
+        for i in range(count):
+            (
+                record_id,
+                label_id,
+                flags,
+                version,
+                required_mask,
+                absent_mask,
+                headers_offset,
+                headers_count,
+                absent_offset,
+                absent_count,
+            ) = HTTP_RECORD.unpack_from(
+                self._buffer, section + COUNT.size + i * HTTP_RECORD.size
+            )
+
+            if (
+                version != WILDCARD
+                and version != packet_signature.version
+                or required_mask & ~packet_mask
+            ):
+                continue
+
+            if absent_mask & packet_mask and any(
+                name in packet_headers
+                for name in self._http_absent_headers(absent_offset, absent_count)
+            ):
+                continue
+
+            headers = self._http_headers(headers_offset, headers_count)
+
+            if not all(
+                header.lower_name in packet_headers
+                for header in headers
+                if not header.is_optional
+            ) or not headers_match(headers, packet_signature.headers):
+                continue
+
+            if not flags & FLAG_GENERIC:
+                return ImageMatch(record_id, label_id)
+
+            if generic_match is None:
+                generic_match = ImageMatch(record_id, label_id)
+
+        return generic_match
+
+    def get_label(self, label_id: int) -> DatabaseLabel:
+        """
+        Get a label by its id, decoding it on first use.
+
+        Raises:
+            DatabaseError: No label with the given id
+        """
+        label = self._labels.get(label_id)
+
+        if label is not None:
+            return label
+
+        section = self._sections[Section.LABELS]
+        (count,) = COUNT.unpack_from(self._buffer, section)
+
+        if not 0 <= label_id < count:
+            raise DatabaseError(f"No label with id {label_id}")
+
+        kind, label_offset, label_length, sys_offset, sys_length = LABEL.unpack_from(
+            self._buffer, section + COUNT.size + label_id * LABEL.size
+        )
+
+        if kind == MISSING_LABEL_KIND:
+            raise DatabaseError(f"No label with id {label_id}")
+
+        raw_label = self._bytes(label_offset, label_length).decode()
+
+        if kind == LABEL_KIND:
+            label = Label.parse(raw_label)
+            raw_sys = self._bytes(sys_offset, sys_length).decode()
+            label.sys = tuple(raw_sys.split(",")) if raw_sys else ()
+        else:
+            label = MTULabel.parse(raw_label)
+
+        self._labels[label_id] = label
+        return label
+
+    def _match_label(self, match: Optional[ImageMatch]) -> Optional[DatabaseLabel]:
+        return None if match is None else self.get_label(match.label_id)
+
+    def fingerprint_tcp(
+        self,
+        packet: PacketLike,
+        *,
+        syn_mss: int = 0,
+        max_dist: int = Options.max_dist,
+    ) -> ImageResult[TCPPacketSignature]:
+        """
+        Fingerprint the given TCP packet against the image (see ``fingerprint_tcp``).
+
+        Args:
+            packet: Packet to fingerprint
+            syn_mss: Value of MSS option in SYN packet, if known. Defaults to 0.
+            max_dist: Maximum TTL distance for non-fuzzy signature matching.
+
+        Raises:
+            PacketError: The packet is invalid for TCP fingerprint
+
+        Returns:
+            TCP fingerprint result
+        """
+        packet = parse_packet(packet)
+
+        if not valid_for_tcp_fingerprint(packet):
+            raise PacketError(
+                "Packet is invalid for TCP fingerprint. Packet must be SYN/SYN+ACK."
+            )
+
+        direction = (
+            Direction.CLIENT_TO_SERVER
+            if packet.tcp.type == TCPFlag.SYN
+            else Direction.SERVER_TO_CLIENT
+        )
+        packet_signature = TCPPacketSignature.from_packet(packet, syn_mss)
+        match = self.find_tcp_match(packet_signature, direction, max_dist)
+
+        return ImageResult(
+            packet,
+            packet_signature,
+            match,
+            self._match_label(match),
+            guess_distance(packet_signature.ttl)
+            if match is None or match.type == TCPMatchType.FUZZY_TTL
+            else match.ttl - packet_signature.ttl,
+        )
+
+    def fingerprint_mtu(self, packet: PacketLike) -> ImageResult[MTUPacketSignature]:
+        """
+        Fingerprint the given packet for MTU against the image (see ``fingerprint_mtu``).
+
+        Raises:
+            PacketError: The packet is invalid for MTU fingerprint
+
+        Returns:
+            MTU fingerprint result
+        """
+        packet = parse_packet(packet)
+
+        if not valid_for_mtu_fingerprint(packet):
+            raise PacketError(
+                "Packet is invalid for MTU fingerprint. "
+                "Packet must be SYN/SYN+ACK with MSS value."
+            )
+
+        packet_signature = MTUPacketSignature.from_packet(packet)
+        match = self.find_mtu_match(packet_signature)
+        return ImageResult(packet, packet_signature, match, self._match_label(match))
+
+    def fingerprint_http(self, buffer: BufferLike) -> ImageResult[HTTPPacketSignature]:
+        """
+        Fingerprint the given HTTP 1.x payload against the image
+        (see ``fingerprint_http``).
+
+        Raises:
+            PacketError: The payload is invalid for HTTP fingerprint
+
+        Returns:
+            HTTP fingerprint result
+        """
+        direction, version, headers = read_payload(buffer)
+        packet_signature = HTTPPacketSignature(version, headers)
+        match = self.find_http_match(packet_signature, direction)
+        return ImageResult(buffer, packet_signature, match, self._match_label(match))
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+
+def write_image(database: Database, filepath: PathLike) -> None:
+    """
+    Write the image of a database to a file, to be mapped with ``DatabaseImage.open``.
+    """
+    always_path(filepath).write_bytes(build_image(database))
+
+
+def create_shared_image(
+    database: Database, name: Optional[str] = None
+) -> "SharedMemory":
+    """
+    Write the image of a database to a new shared memory block, to be attached with
+    ``DatabaseImage.attach``. The caller owns the block, and should ``close`` and
+    ``unlink`` it when the workers are done.
+
+    Args:
+        database: Loaded database
+        name: Shared memory name. Defaults to None (a random name).
+
+    Raises:
+        ImportError: Shared memory is not supported (Python 3.7)
+
+    Returns:
+        Shared memory of the image
+    """
+    image = build_image(database)
+    shm = create_shared_memory(len(image), name)
+    shm.buf[: len(image)] = image
+    return shm
@@ -0,0 +1,102 @@
+"""
+Binary layout of database images.
+
+All integers are little-endian. An image is a header, fixed-size sections,
+then a blob of variable-length data (layouts, header names and values, labels),
+referenced by (offset, length) pairs relative to the blob start.
+
+    header:     magic, version, offset of each section, blob offset
+    TCP (x2):   records count, layout groups count, layout groups, records
+    HTTP (x2):  records count, records
+    MTU:        records count, records
+    labels:     labels count, labels (by label id)
+
+Layout groups map a TCP options layout to the positions of the records with that
+layout (an array of u16 in the blob), in database order.
+"""
+import struct
+import zlib
+from enum import IntEnum
+from typing import Iterable
+
+from pyp0f.database.signatures import WindowType
+from pyp0f.net.packet import Direction
+
+MAGIC = b"P0FI"
+VERSION = 1
+
+
+class Section(IntEnum):
+    TCP_REQUEST = 0
+    TCP_RESPONSE = 1
+    HTTP_REQUEST = 2
+    HTTP_RESPONSE = 3
+    MTU = 4
+    LABELS = 5
+
+
+TCP_SECTIONS = {
+    Direction.CLIENT_TO_SERVER: Section.TCP_REQUEST,
+    Direction.SERVER_TO_CLIENT: Section.TCP_RESPONSE,
+}
+HTTP_SECTIONS = {
+    Direction.CLIENT_TO_SERVER: Section.HTTP_REQUEST,
+    Direction.SERVER_TO_CLIENT: Section.HTTP_RESPONSE,
+}
+
+# magic, version, sections offsets, blob offset
+HEADER = struct.Struct(f"<4sI{len(Section)}II")
+
+COUNT = struct.Struct("<I")
+COUNTS = struct.Struct("<II")
+
+# layout (offset, length), members (offset, count)
+TCP_GROUP = struct.Struct("<IHIH")
+
+# record id, label id, flags, ttl, IP options length, EOL padding length,
+# payload class, window type, window scale, window size, MSS,
+# IPv4 exact quirks, IPv6 exact quirks, IPv4 fuzzy quirks (offset, count),
+# IPv6 fuzzy quirks (offset, count)
+TCP_RECORD = struct.Struct("<IIBBBBbBhiiIIIBIB")
+
+# record id, label id, flags, version, required names mask, absent names mask,
+# headers (offset, count), absent headers (offset, count)
+HTTP_RECORD = struct.Struct("<IIBbQQIHIH")
+
+# lowercase name (offset, length), value (offset, length, -1 if any value), is optional
+HTTP_HEADER = struct.Struct("<IHIiB")
+
+# lowercase name (offset, length)
+HTTP_ABSENT_HEADER = struct.Struct("<IH")
+
+# MTU, record id, label id
+MTU_RECORD = struct.Struct("<III")
+
+# kind, label (offset, length), sys (offset, length)
+LABEL = struct.Struct("<BIHIH")
+
+# Record flags
+FLAG_GENERIC = 1
+FLAG_BAD_TTL = 2
+FLAG_USER_APP = 4
+
+# Label kinds
+LABEL_KIND = 0
+MTU_LABEL_KIND = 1
+MISSING_LABEL_KIND = 2  # Unused label id
+
+WINDOW_TYPES = tuple(WindowType)
+
+
+def names_mask(names: Iterable[bytes]) -> int:
+    """
+    64-bit mask of header names (one bit per name, by CRC32), stable across processes.
+    A record whose required names mask has bits missing from a packet's mask
+    can't match it, without comparing the names themselves.
+    """
+    mask = 0
+
+    for name in names:
+        mask |= 1 << (zlib.crc32(name) & 63)
+
+    return mask
@@ -1,8 +1,8 @@
 from contextlib import suppress
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from email.utils import parsedate_to_datetime
-from typing import Optional, Sequence
+from typing import AbstractSet, Dict, Optional, Sequence
 
 from pyp0f.exceptions import PacketError
 from pyp0f.net.layers.base import Layer
@@ -15,20 +15,26 @@ from pyp0f.net.scapy import ScapyPacket, ScapyTCP
 class HTTP(Layer):
     version: int
 
-    # TODO: Use ordered dict for better lookup performance
     headers: Sequence[PacketHeader]
+    """Headers, in order of appearance (used for matching)."""
+
+    header_values: Dict[bytes, bytes] = field(init=False, repr=False)
+    """Maps lowercase header names to the value of their first appearance."""
+
+    header_names: AbstractSet[bytes] = field(init=False, repr=False)
+    """Lowercase header names."""
+
+    def __post_init__(self):
+        header_values: Dict[bytes, bytes] = {}
+
+        for header in self.headers:
+            header_values.setdefault(header.lower_name, header.value)
+
+        self.header_values = header_values
+        self.header_names = frozenset(header_values)
 
     def _get_header_value(self, name: bytes) -> Optional[bytes]:
-        lower_name = name.lower()
-
-        return next(
-            (
-                header.value
-                for header in self.headers
-                if header.lower_name == lower_name
-            ),
-            None,
-        )
+        return self.header_values.get(name.lower())
 
     @property
     def software(self) -> Optional[bytes]:
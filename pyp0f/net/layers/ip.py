@@ -1,7 +1,10 @@
+import socket
 from dataclasses import dataclass
+from struct import Struct
+from typing import Tuple
 
 from pyp0f.exceptions import PacketError
-from pyp0f.net.quirks import Quirk
+from pyp0f.net.quirks import Quirk, QuirkValue
 from pyp0f.net.scapy import ScapyIPv4, ScapyIPv6, ScapyPacket
 
 from .base import Layer
@@ -12,9 +15,20 @@ IPV6 = 0x06
 IP_TOS_CE = 0x01  # Congestion encountered
 IP_TOS_ECT = 0x02  # ECN supported
 
+IP_FLAG_MF = 0x01  # More fragments
+IP_FLAG_DF = 0x02  # Don't fragment
+IP_FLAG_EVIL = 0x04  # Reserved ("must be zero")
+
 IPV4_HEADER_LENGTH = 20
 IPV6_HEADER_LENGTH = 40
 
+IP_PROTOCOL_TCP = 6
+
+# version+IHL, TOS, total length, id, flags+fragment offset, TTL, protocol
+IPV4_HEADER = Struct("!BBHHHBB")
+# version+traffic class+flow label, payload length, next header, hop limit
+IPV6_HEADER = Struct("!IHBB")
+
 
 @dataclass
 class IP(Layer):
@@ -38,56 +52,173 @@ class IP(Layer):
             raise PacketError("Packet doesn't have an IP layer!")
 
     @classmethod
-    def _from_ipv4(cls, ip: ScapyIPv4):
-        quirks = Quirk(0)
+    def from_buffer(cls, buffer: bytes) -> Tuple["IP", int]:
+        """
+        Parse the IP header of a raw IPv4/IPv6 packet, without Scapy.
 
-        if ip.tos & (IP_TOS_CE | IP_TOS_ECT):
-            quirks |= Quirk.ECN
+        Args:
+            buffer: Raw packet, starting at the IP header (any bytes-like object)
 
-        if ip.flags.evil:
-            quirks |= Quirk.NZ_MBZ
+        Raises:
+            PacketError: The packet is truncated, or is not a TCP packet
 
-        if ip.flags.DF:
-            quirks |= Quirk.DF
+        Returns:
+            IP layer, and end offset of the IP payload (without link-layer padding)
+        """
+        if not buffer:
+            raise PacketError("Empty packet")
 
-            if ip.id:
-                quirks |= Quirk.NZ_ID
+        version = buffer[0] >> 4
 
-        elif not ip.id:
-            quirks |= Quirk.ZERO_ID
-
-        header_length: int = ip.ihl * 4
+        if version == IPV4:
+            return cls._from_ipv4_buffer(buffer)
+        elif version == IPV6:
+            return cls._from_ipv6_buffer(buffer)
+        else:
+            raise PacketError(f"Unsupported IP version {version}")
 
-        return cls(
-            version=ip.version,
+    @classmethod
+    def _from_ipv4(cls, ip: ScapyIPv4):
+        return cls._ipv4(
             src=ip.src,
             dst=ip.dst,
             ttl=ip.ttl,
-            tos=ip.tos >> 2,
+            tos=ip.tos,
+            flags=int(ip.flags),
+            fragment_offset=ip.frag,
+            ip_id=ip.id,
+            header_length=ip.ihl * 4,
+        )
+
+    @classmethod
+    def _from_ipv4_buffer(cls, buffer: bytes) -> Tuple["IP", int]:
+        if len(buffer) < IPV4_HEADER_LENGTH:
+            raise PacketError("Truncated IPv4 header")
+
+        (
+            version_ihl,
+            tos,
+            total_length,
+            ip_id,
+            flags_fragment,
+            ttl,
+            protocol,
+        ) = IPV4_HEADER.unpack_from(buffer)
+        header_length = (version_ihl & 0x0F) * 4
+
+        if not IPV4_HEADER_LENGTH <= header_length <= len(buffer):
+            raise PacketError("Truncated IPv4 header")
+
+        if protocol != IP_PROTOCOL_TCP:
+            raise PacketError("Packet doesn't have an TCP layer!")
+
+        ip = cls._ipv4(
+            src=socket.inet_ntoa(buffer[12:16]),
+            dst=socket.inet_ntoa(buffer[16:20]),
+            ttl=ttl,
+            tos=tos,
+            flags=flags_fragment >> 13,
+            fragment_offset=flags_fragment & 0x1FFF,
+            ip_id=ip_id,
+            header_length=header_length,
+        )
+        # Trim link-layer padding, unless the length is bogus (e.g. offloaded segments)
+        end = (
+            total_length
+            if header_length <= total_length <= len(buffer)
+            else len(buffer)
+        )
+        return ip, end
+
+    @classmethod
+    def _ipv4(
+        cls,
+        *,
+        src: str,
+        dst: str,
+        ttl: int,
+        tos: int,
+        flags: int,
+        fragment_offset: int,
+        ip_id: int,
+        header_length: int,
+    ):
+        quirks = 0
+
+        if tos & (IP_TOS_CE | IP_TOS_ECT):
+            quirks |= QuirkValue.ECN
+
+        if flags & IP_FLAG_EVIL:
+            quirks |= QuirkValue.NZ_MBZ
+
+        if flags & IP_FLAG_DF:
+            quirks |= QuirkValue.DF
+
+            if ip_id:
+                quirks |= QuirkValue.NZ_ID
+
+        elif not ip_id:
+            quirks |= QuirkValue.ZERO_ID
+
+        return cls(
+            version=IPV4,
+            src=src,
+            dst=dst,
+            ttl=ttl,
+            tos=tos >> 2,
             options_length=header_length - IPV4_HEADER_LENGTH,
             header_length=header_length,
-            is_fragment=ip.flags.MF or ip.frag,
-            quirks=quirks,
+            is_fragment=bool(flags & IP_FLAG_MF or fragment_offset),
+            quirks=Quirk(quirks),
         )
 
     @classmethod
     def _from_ipv6(cls, ip: ScapyIPv6):
-        quirks = Quirk(0)
+        return cls._ipv6(
+            src=ip.src, dst=ip.dst, hop_limit=ip.hlim, tc=ip.tc, flow_label=ip.fl
+        )
 
-        if ip.fl:
-            quirks |= Quirk.FLOW
+    @classmethod
+    def _from_ipv6_buffer(cls, buffer: bytes) -> Tuple["IP", int]:
+        if len(buffer) < IPV6_HEADER_LENGTH:
+            raise PacketError("Truncated IPv6 header")
+
+        first_word, payload_length, next_header, hop_limit = IPV6_HEADER.unpack_from(
+            buffer
+        )
 
-        if ip.tc & (IP_TOS_CE | IP_TOS_ECT):
-            quirks |= Quirk.ECN
+        # Extension headers are not supported, like p0f
+        if next_header != IP_PROTOCOL_TCP:
+            raise PacketError("Packet doesn't have an TCP layer!")
+
+        ip = cls._ipv6(
+            src=socket.inet_ntop(socket.AF_INET6, buffer[8:24]),
+            dst=socket.inet_ntop(socket.AF_INET6, buffer[24:40]),
+            hop_limit=hop_limit,
+            tc=(first_word >> 20) & 0xFF,
+            flow_label=first_word & 0xFFFFF,
+        )
+        end = IPV6_HEADER_LENGTH + payload_length
+        return ip, end if end <= len(buffer) else len(buffer)
+
+    @classmethod
+    def _ipv6(cls, *, src: str, dst: str, hop_limit: int, tc: int, flow_label: int):
+        quirks = 0
+
+        if flow_label:
+            quirks |= QuirkValue.FLOW
+
+        if tc & (IP_TOS_CE | IP_TOS_ECT):
+            quirks |= QuirkValue.ECN
 
         return cls(
-            version=ip.version,
-            src=ip.src,
-            dst=ip.dst,
-            ttl=ip.hlim,
-            tos=ip.tc >> 2,
+            version=IPV6,
+            src=src,
+            dst=dst,
+            ttl=hop_limit,
+            tos=tc >> 2,
             options_length=0,
             header_length=IPV6_HEADER_LENGTH,
             is_fragment=False,
-            quirks=quirks,
+            quirks=Quirk(quirks),
         )
@@ -0,0 +1,186 @@
+/*
+ * Optional accelerator of TCP options parsing.
+ *
+ * Mirrors ``parse_options_fields`` in options.py, and is kept in lockstep with it
+ * by a differential fuzz test (tests/net/layers/tcp/test_options.py).
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+/* TCP option numbers (``TCPOption``) */
+#define OPT_EOL 0
+#define OPT_NOP 1
+#define OPT_MSS 2
+#define OPT_WS 3
+#define OPT_SACKOK 4
+#define OPT_SACK 5
+#define OPT_TS 8
+
+/* Quirk values (``Quirk``), checked against the Python values on import */
+#define QUIRK_OPT_ZERO_TS1 (1L << 12)
+#define QUIRK_OPT_NZ_TS2 (1L << 13)
+#define QUIRK_OPT_EOL_NZ (1L << 14)
+#define QUIRK_OPT_EXWS (1L << 15)
+#define QUIRK_OPT_BAD (1L << 16)
+
+static PyObject *
+parse_options(PyObject *self, PyObject *args)
+{
+    Py_buffer view;
+    int is_syn = 0;
+
+    if (!PyArg_ParseTuple(args, "y*|p:parse_options", &view, &is_syn)) {
+        return NULL;
+    }
+
+    const unsigned char *buffer = (const unsigned char *)view.buf;
+    Py_ssize_t options_end = view.len;
+    Py_ssize_t i = 0;
+    long quirks = 0;
+    unsigned long mss = 0, timestamp = 0, window_scale = 0;
+    Py_ssize_t eol_padding_length = 0;
+
+    PyObject *layout = PyList_New(0);
+    if (layout == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    while (i < options_end) {
+        unsigned char option_number = buffer[i];
+        PyObject *number = PyLong_FromLong(option_number);
+
+        if (number == NULL || PyList_Append(layout, number) < 0) {
+            Py_XDECREF(number);
+            Py_DECREF(layout);
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+        Py_DECREF(number);
+        i++;
+
+        if (option_number == OPT_EOL) {
+            /* Count how many bytes of option data are left, and if any are non-zero */
+            eol_padding_length = options_end - i;
+
+            while (i < options_end && !buffer[i]) {
+                i++;
+            }
+
+            if (i != options_end) {
+                quirks |= QUIRK_OPT_EOL_NZ;
+            }
+            break;
+        }
+        else if (option_number == OPT_NOP) {
+            continue;
+        }
+
+        if (i == options_end) { /* Option without room for length field */
+            quirks |= QUIRK_OPT_BAD;
+            break;
+        }
+
+        unsigned char option_length = buffer[i];
+        Py_ssize_t current_option_end = i - 1 + option_length;
+        i++;
+
+        if (current_option_end > options_end) { /* Option would end past end of headers */
+            quirks |= QUIRK_OPT_BAD;
+            break;
+        }
+
+        if (option_number == OPT_SACK) {
+            /* SACK is a variable-length option of 10 to 34 bytes. */
+            if (option_length < 10 || option_length > 34) {
+                quirks |= QUIRK_OPT_BAD;
+                break;
+            }
+        }
+        else if (option_number == OPT_MSS || option_number == OPT_WS ||
+                 option_number == OPT_TS || option_number == OPT_SACKOK) {
+            Py_ssize_t size = option_number == OPT_MSS  ? 2
+                              : option_number == OPT_WS ? 1
+                              : option_number == OPT_TS ? 8
+                                                        : 0;
+
+            /* Length doesn't match supposed option size */
+            if (option_length != 2 + size) {
+                quirks |= QUIRK_OPT_BAD;
+
+                /* A zero length points back at the option itself, which would be
+                   parsed forever. A length of 1 resumes at the length byte. */
+                if (!option_length) {
+                    break;
+                }
+            }
+            else if (option_number == OPT_MSS) {
+                mss = (buffer[i] << 8) | buffer[i + 1];
+            }
+            else if (option_number == OPT_WS) {
+                window_scale = buffer[i];
+                if (window_scale > 14) {
+                    quirks |= QUIRK_OPT_EXWS;
+                }
+            }
+            else if (option_number == OPT_TS) {
+                unsigned long timestamp2;
+
+                timestamp = ((unsigned long)buffer[i] << 24) | (buffer[i + 1] << 16) |
+                            (buffer[i + 2] << 8) | buffer[i + 3];
+                timestamp2 = ((unsigned long)buffer[i + 4] << 24) |
+                             (buffer[i + 5] << 16) | (buffer[i + 6] << 8) | buffer[i + 7];
+
+                if (!timestamp) {
+                    quirks |= QUIRK_OPT_ZERO_TS1;
+                }
+                if (timestamp2 && is_syn) {
+                    quirks |= QUIRK_OPT_NZ_TS2;
+                }
+            }
+        }
+        /* Unknown option, presumably with specified size. */
+        else if (option_length < 2 || option_length > 40) {
+            quirks |= QUIRK_OPT_BAD;
+            break;
+        }
+
+        i = current_option_end;
+    }
+
+    PyBuffer_Release(&view);
+    return Py_BuildValue("(Nlkkkn)", layout, quirks, mss, timestamp, window_scale,
+                         eol_padding_length);
+}
+
+static PyMethodDef methods[] = {
+    {"parse_options", parse_options, METH_VARARGS,
+     "parse_options(buffer, is_syn=False) -> "
+     "(layout, quirks, mss, timestamp, window_scale, eol_padding_length)"},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_options", "TCP options parsing accelerator.", -1, methods,
+};
+
+PyMODINIT_FUNC
+PyInit__options(void)
+{
+    PyObject *m = PyModule_Create(&module);
+
+    if (m == NULL) {
+        return NULL;
+    }
+
+    if (PyModule_AddIntConstant(m, "QUIRK_OPT_ZERO_TS1", QUIRK_OPT_ZERO_TS1) < 0 ||
+        PyModule_AddIntConstant(m, "QUIRK_OPT_NZ_TS2", QUIRK_OPT_NZ_TS2) < 0 ||
+        PyModule_AddIntConstant(m, "QUIRK_OPT_EOL_NZ", QUIRK_OPT_EOL_NZ) < 0 ||
+        PyModule_AddIntConstant(m, "QUIRK_OPT_EXWS", QUIRK_OPT_EXWS) < 0 ||
+        PyModule_AddIntConstant(m, "QUIRK_OPT_BAD", QUIRK_OPT_BAD) < 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    return m;
+}
@@ -10,3 +10,10 @@ class TCPFlag(IntFlag):
     URG = 0x20
     ECE = 0x40
     CWR = 0x80
+
+
+# Nonce sum flag, not part of ``TCPFlag`` (ECN nonce, RFC 3540)
+TCP_FLAG_NS = 0x100
+
+# Flags that determine the packet type
+TCP_TYPE_FLAGS = int(TCPFlag.SYN | TCPFlag.ACK | TCPFlag.FIN | TCPFlag.RST)
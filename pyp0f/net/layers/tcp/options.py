@@ -1,9 +1,9 @@
 from dataclasses import dataclass
 from enum import IntEnum
 from struct import Struct
-from typing import List
+from typing import Callable, List, Optional, Tuple
 
-from pyp0f.net.quirks import Quirk
+from pyp0f.net.quirks import Quirk, QuirkValue
 
 
 class TCPOption(IntEnum):
@@ -46,85 +46,18 @@ class TCPOptions:
 
     @classmethod
     def parse(cls, buffer: bytes, *, is_syn: bool = False):
-        layout: List[int] = []
-        quirks = Quirk(0)
-        mss = timestamp = window_scale = eol_padding_length = 0
-
-        i = 0
-        options_end = len(buffer)
-
-        while i < options_end:
-            option_number = buffer[i]
-            layout.append(option_number)
-            i += 1
-
-            if option_number == TCPOption.EOL:
-                # Count how many bytes of option data are left, and if any are non-zero
-                eol_padding_length = options_end - i
-
-                while i < options_end and not buffer[i]:
-                    i += 1
-
-                if i != options_end:
-                    quirks |= Quirk.OPT_EOL_NZ
-                break
-
-            elif option_number == TCPOption.NOP:
-                continue
-
-            if i == options_end:  # Option without room for length field
-                quirks |= Quirk.OPT_BAD
-                break
-
-            option_length = buffer[i]  # Specified option length
-            current_option_end = i - 1 + option_length
-            i += 1
-
-            if current_option_end > options_end:  # Option would end past end of headers
-                quirks |= Quirk.OPT_BAD
-                break
-
-            if option_number == TCPOption.SACK:
-                # SACK is a variable-length option of 10 to 34 bytes.
-                if not 10 <= option_length <= 34:
-                    quirks |= Quirk.OPT_BAD
-                    break
-
-            elif option_number in OPTION_FORMATS:
-                option_format = OPTION_FORMATS[option_number]
-
-                # Length doesn't match supposed option size
-                if option_length != 2 + option_format.size:
-                    quirks |= Quirk.OPT_BAD
-
-                else:
-                    option_value = option_format.unpack(buffer[i:current_option_end])
-
-                    if option_number == TCPOption.MSS:
-                        mss = option_value[0]
-
-                    elif option_number == TCPOption.WS:
-                        window_scale = option_value[0]
-                        if window_scale > 14:
-                            quirks |= Quirk.OPT_EXWS
-
-                    elif option_number == TCPOption.TS:
-                        timestamp, timestamp2 = option_value
-                        if not timestamp:
-                            quirks |= Quirk.OPT_ZERO_TS1
-                        if timestamp2 and is_syn:
-                            quirks |= Quirk.OPT_NZ_TS2
-
-            # Unknown option, presumably with specified size.
-            elif not 2 <= option_length <= 40:
-                quirks |= Quirk.OPT_BAD
-                break
-
-            i = current_option_end
+        (
+            layout,
+            quirks,
+            mss,
+            timestamp,
+            window_scale,
+            eol_padding_length,
+        ) = parse_options_fields(buffer, is_syn)
 
         return cls(
             layout=layout,
-            quirks=quirks,
+            quirks=Quirk(quirks),
             mss=mss,
             timestamp=timestamp,
             window_scale=window_scale,
@@ -147,3 +80,130 @@ class TCPOptions:
             else eol_string
             for option in self.layout
         )
+
+
+# (layout, quirks, mss, timestamp, window scale, EOL padding length)
+OptionsFields = Tuple[List[int], int, int, int, int, int]
+
+
+def parse_options_python(buffer: bytes, is_syn: bool = False) -> OptionsFields:
+    """
+    Parse TCP options to their fields, with quirks as a plain int.
+    Pure Python implementation of ``parse_options_fields``.
+    """
+    layout: List[int] = []
+    quirks = 0
+    mss = timestamp = window_scale = eol_padding_length = 0
+
+    i = 0
+    options_end = len(buffer)
+
+    while i < options_end:
+        option_number = buffer[i]
+        layout.append(option_number)
+        i += 1
+
+        if option_number == TCPOption.EOL:
+            # Count how many bytes of option data are left, and if any are non-zero
+            eol_padding_length = options_end - i
+
+            while i < options_end and not buffer[i]:
+                i += 1
+
+            if i != options_end:
+                quirks |= QuirkValue.OPT_EOL_NZ
+            break
+
+        elif option_number == TCPOption.NOP:
+            continue
+
+        if i == options_end:  # Option without room for length field
+            quirks |= QuirkValue.OPT_BAD
+            break
+
+        option_length = buffer[i]  # Specified option length
+        current_option_end = i - 1 + option_length
+        i += 1
+
+        if current_option_end > options_end:  # Option would end past end of headers
+            quirks |= QuirkValue.OPT_BAD
+            break
+
+        if option_number == TCPOption.SACK:
+            # SACK is a variable-length option of 10 to 34 bytes.
+            if not 10 <= option_length <= 34:
+                quirks |= QuirkValue.OPT_BAD
+                break
+
+        elif option_number in OPTION_FORMATS:
+            option_format = OPTION_FORMATS[option_number]
+
+            # Length doesn't match supposed option size
+            if option_length != 2 + option_format.size:
+                quirks |= QuirkValue.OPT_BAD
+
+                # A zero length points back at the option itself, which would be
+                # parsed forever. A length of 1 resumes at the length byte.
+                if not option_length:
+                    break
+
+            else:
+                option_value = option_format.unpack(buffer[i:current_option_end])
+
+                if option_number == TCPOption.MSS:
+                    mss = option_value[0]
+
+                elif option_number == TCPOption.WS:
+                    window_scale = option_value[0]
+                    if window_scale > 14:
+                        quirks |= QuirkValue.OPT_EXWS
+
+                elif option_number == TCPOption.TS:
+                    timestamp, timestamp2 = option_value
+                    if not timestamp:
+                        quirks |= QuirkValue.OPT_ZERO_TS1
+                    if timestamp2 and is_syn:
+                        quirks |= QuirkValue.OPT_NZ_TS2
+
+        # Unknown option, presumably with specified size.
+        elif not 2 <= option_length <= 40:
+            quirks |= QuirkValue.OPT_BAD
+            break
+
+        i = current_option_end
+
+    return layout, quirks, mss, timestamp, window_scale, eol_padding_length
+
+
+def _load_accelerator() -> Optional[Callable[[bytes, bool], OptionsFields]]:
+    try:
+        from pyp0f.net.layers.tcp import _options  # type: ignore
+    except ImportError:
+        return None
+
+    # The compiled module hardcodes quirk values, don't use it if they went stale
+    if (
+        _options.QUIRK_OPT_ZERO_TS1,
+        _options.QUIRK_OPT_NZ_TS2,
+        _options.QUIRK_OPT_EOL_NZ,
+        _options.QUIRK_OPT_EXWS,
+        _options.QUIRK_OPT_BAD,
+    ) != (
+        QuirkValue.OPT_ZERO_TS1,
+        QuirkValue.OPT_NZ_TS2,
+        QuirkValue.OPT_EOL_NZ,
+        QuirkValue.OPT_EXWS,
+        QuirkValue.OPT_BAD,
+    ):
+        return None
+
+    return _options.parse_options
+
+
+parse_options_accelerated = _load_accelerator()
+"""Compiled TCP options parser (``_options.c``), None if the extension isn't built."""
+
+parse_options_fields: Callable[[bytes, bool], OptionsFields] = (
+    parse_options_accelerated or parse_options_python
+)
+"""Parse TCP options to their fields, using the compiled parser if available."""
@@ -1,18 +1,34 @@
-from dataclasses import dataclass
+from dataclasses import InitVar, dataclass
+from struct import Struct
+
+from scapy.packet import Padding
 
 from pyp0f.exceptions import PacketError
 from pyp0f.net.layers.base import Layer
 from pyp0f.net.layers.ip import IPV4_HEADER_LENGTH, IPV6_HEADER_LENGTH
 from pyp0f.net.layers.tcp import TCPFlag, TCPOptions
-from pyp0f.net.quirks import Quirk
+from pyp0f.net.layers.tcp.flags import TCP_FLAG_NS, TCP_TYPE_FLAGS
+from pyp0f.net.quirks import Quirk, QuirkValue
 from pyp0f.net.scapy import ScapyPacket, ScapyTCP
 
 TCP_HEADER_LENGTH = 20
 
+# source port, destination port, seq, ack, data offset+NS, flags, window, checksum,
+# urgent pointer
+TCP_HEADER = Struct("!HHIIBBHHH")
+
 # Minimum lengths of IPv4/IPv6 + TCP headers
 MIN_TCP4 = IPV4_HEADER_LENGTH + TCP_HEADER_LENGTH
 MIN_TCP6 = IPV6_HEADER_LENGTH + TCP_HEADER_LENGTH
 
+# Plain int flags, as ``int & TCPFlag`` goes through ``enum.Flag`` arithmetic
+_ECN_FLAGS = int(TCPFlag.ECE | TCPFlag.CWR) | TCP_FLAG_NS
+_ACK = int(TCPFlag.ACK)
+_RST = int(TCPFlag.RST)
+_URG = int(TCPFlag.URG)
+_PSH = int(TCPFlag.PSH)
+_SYN = int(TCPFlag.SYN)
+
 
 @dataclass
 class TCP(Layer):
@@ -26,9 +42,15 @@ class TCP(Layer):
     header_length: int
     quirks: Quirk
 
-    def __post_init__(self):
-        self.type &= TCPFlag.SYN | TCPFlag.ACK | TCPFlag.FIN | TCPFlag.RST
-        self.quirks |= self.options.quirks
+    normalized: InitVar[bool] = False
+    """The type is masked and quirks include the options quirks (set by parsing)"""
+
+    def __post_init__(self, normalized: bool):
+        if normalized:
+            return
+
+        self.type &= TCP_TYPE_FLAGS
+        self.quirks = Quirk(self.quirks.value | self.options.quirks.value)
 
     @classmethod
     def from_packet(cls, packet: ScapyPacket):
@@ -36,41 +58,125 @@ class TCP(Layer):
             raise PacketError("Packet doesn't have an TCP layer!")
 
         tcp = packet[ScapyTCP]
-        flags: TCPFlag = TCPFlag(int(tcp.flags))
         header_length: int = tcp.dataofs * 4
-        options_buffer = bytes(tcp)[TCP_HEADER_LENGTH:header_length]
-        options = TCPOptions.parse(options_buffer, is_syn=(flags == TCPFlag.SYN))
+        payload = bytes(tcp.payload)
+        padding = tcp.getlayer(Padding)
+
+        # Scapy splits link-layer padding off at the IP total length,
+        # it isn't payload (like in ``from_buffer``)
+        if padding is not None:
+            payload = payload[: len(payload) - len(bytes(padding))]
+
+        return cls._tcp(
+            flags=int(tcp.flags),
+            src_port=tcp.sport,
+            dst_port=tcp.dport,
+            window=tcp.window,
+            seq=tcp.seq,
+            ack=tcp.ack,
+            urgent_pointer=tcp.urgptr,
+            options_buffer=bytes(tcp)[TCP_HEADER_LENGTH:header_length],
+            payload=payload,
+            header_length=header_length,
+        )
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes, start: int = 0, end: int = -1):
+        """
+        Parse a raw TCP segment, without Scapy.
+
+        Args:
+            buffer: Buffer containing the segment (any bytes-like object)
+            start: Offset of the TCP header in the buffer. Defaults to 0.
+            end: End offset of the segment. Defaults to -1 (end of the buffer).
+
+        Raises:
+            PacketError: The TCP header is truncated
+
+        Returns:
+            TCP layer
+        """
+        if end < 0:
+            end = len(buffer)
+
+        if end - start < TCP_HEADER_LENGTH:
+            raise PacketError("Truncated TCP header")
+
+        (
+            src_port,
+            dst_port,
+            seq,
+            ack,
+            data_offset,
+            flags,
+            window,
+            _,
+            urgent_pointer,
+        ) = TCP_HEADER.unpack_from(buffer, start)
+        header_length = (data_offset >> 4) * 4
+        options_start = start + TCP_HEADER_LENGTH
+        options_end = min(start + max(header_length, TCP_HEADER_LENGTH), end)
+
+        return cls._tcp(
+            flags=(data_offset & 0x01) << 8 | flags,
+            src_port=src_port,
+            dst_port=dst_port,
+            window=window,
+            seq=seq,
+            ack=ack,
+            urgent_pointer=urgent_pointer,
+            options_buffer=bytes(buffer[options_start:options_end]),
+            payload=bytes(buffer[options_end:end]),
+            header_length=header_length,
+        )
 
-        quirks = Quirk(0)
+    @classmethod
+    def _tcp(
+        cls,
+        *,
+        flags: int,
+        src_port: int,
+        dst_port: int,
+        window: int,
+        seq: int,
+        ack: int,
+        urgent_pointer: int,
+        options_buffer: bytes,
+        payload: bytes,
+        header_length: int,
+    ):
+        options = TCPOptions.parse(options_buffer, is_syn=(flags == _SYN))
+        quirks = options.quirks.value
 
-        if tcp.flags.E or tcp.flags.C or tcp.flags.N:
-            quirks |= Quirk.ECN
+        if flags & _ECN_FLAGS:
+            quirks |= QuirkValue.ECN
 
-        if not tcp.seq:
-            quirks |= Quirk.ZERO_SEQ
+        if not seq:
+            quirks |= QuirkValue.ZERO_SEQ
 
-        if tcp.flags.A:
-            if not tcp.ack:
-                quirks |= Quirk.ZERO_ACK
-        elif tcp.ack and not tcp.flags.R:
-            quirks |= Quirk.NZ_ACK
+        if flags & _ACK:
+            if not ack:
+                quirks |= QuirkValue.ZERO_ACK
+        elif ack and not flags & _RST:
+            quirks |= QuirkValue.NZ_ACK
 
-        if tcp.flags.U:
-            quirks |= Quirk.URG
-        elif tcp.urgptr:
-            quirks |= Quirk.NZ_URG
+        if flags & _URG:
+            quirks |= QuirkValue.URG
+        elif urgent_pointer:
+            quirks |= QuirkValue.NZ_URG
 
-        if tcp.flags.P:
-            quirks |= Quirk.PUSH
+        if flags & _PSH:
+            quirks |= QuirkValue.PUSH
 
         return cls(
-            type=flags,
-            src_port=tcp.sport,
-            dst_port=tcp.dport,
-            window=tcp.window,
-            seq=tcp.seq,
+            type=TCPFlag(flags & TCP_TYPE_FLAGS),
+            src_port=src_port,
+            dst_port=dst_port,
+            window=window,
+            seq=seq,
             options=options,
-            payload=bytes(tcp.payload),
+            payload=payload,
             header_length=header_length,
-            quirks=quirks,
+            quirks=Quirk(quirks),
+            normalized=True,
         )
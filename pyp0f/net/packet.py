@@ -1,15 +1,31 @@
 from dataclasses import dataclass
 from enum import Enum, auto
+from struct import Struct
 from typing import Tuple, Union
 
 from pyp0f.exceptions import PacketError
 from pyp0f.net.layers.base import Layer
 from pyp0f.net.layers.ip import IP
 from pyp0f.net.layers.tcp import TCP, TCPFlag
-from pyp0f.net.scapy import ScapyPacket, copy_packet
+from pyp0f.net.scapy import (
+    ScapyIPv4,
+    ScapyIPv6,
+    ScapyPacket,
+    copy_packet,
+    dissected_bytes,
+)
 
 Address = Tuple[str, int]
-PacketLike = Union[ScapyPacket, "Packet"]
+RawPacket = Union[bytes, bytearray, memoryview]
+PacketLike = Union[ScapyPacket, "Packet", RawPacket]
+
+ETHERNET_HEADER_LENGTH = 14
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPES_VLAN = (0x8100, 0x88A8, 0x9100)
+VLAN_TAG_LENGTH = 4
+
+_ETHERTYPE = Struct("!H")
 
 
 class Direction(Enum):
@@ -17,6 +33,27 @@ class Direction(Enum):
     SERVER_TO_CLIENT = auto()
 
 
+# Silly combinations of TCP flags, as plain integers (cheaper than flags operations)
+_SYN_FIN = int(TCPFlag.SYN | TCPFlag.FIN)
+_SYN_RST = int(TCPFlag.SYN | TCPFlag.RST)
+_FIN_RST = int(TCPFlag.FIN | TCPFlag.RST)
+
+
+def should_fingerprint(is_fragment: bool, tcp_type: int) -> bool:
+    """
+    Should a packet be used by p0f, by its fragment bits and TCP type (see
+    ``Packet.should_fingerprint``).
+    """
+    tcp_type = int(tcp_type)
+    return (
+        not is_fragment
+        and tcp_type != 0
+        and tcp_type & _SYN_FIN != _SYN_FIN
+        and tcp_type & _SYN_RST != _SYN_RST
+        and tcp_type & _FIN_RST != _FIN_RST
+    )
+
+
 @dataclass
 class Packet(Layer):
     """
@@ -43,22 +80,102 @@ class Packet(Layer):
         or any traffic with MF or non-zero fragment offset specified.
         We can do enough just fingerprinting the non-fragmented traffic.
         """
-        return (
-            not self.ip.is_fragment
-            and self.tcp.type != 0
-            and (TCPFlag.SYN | TCPFlag.FIN) not in self.tcp.type
-            and (TCPFlag.SYN | TCPFlag.RST) not in self.tcp.type
-            and (TCPFlag.FIN | TCPFlag.RST) not in self.tcp.type
-        )
+        return should_fingerprint(self.ip.is_fragment, self.tcp.type)
 
     @classmethod
     def from_packet(cls, packet: ScapyPacket):
         return cls(IP.from_packet(packet), TCP.from_packet(packet))
 
+    @classmethod
+    def from_buffer(cls, buffer: RawPacket, offset: int = 0) -> "Packet":
+        """
+        Parse a raw IP packet, without Scapy.
+        The buffer is read in place, only the TCP options and payload are copied.
+
+        Args:
+            buffer: Buffer containing the packet
+            offset: Offset of the IP header in the buffer. Defaults to 0.
+
+        Raises:
+            PacketError: The packet is truncated, or is not a TCP/IP packet
+
+        Returns:
+            Parsed packet object
+        """
+        view = memoryview(buffer)[offset:]
+
+        try:
+            ip, end = IP.from_buffer(view)
+            return cls(ip, TCP.from_buffer(view, ip.header_length, end))
+        finally:
+            view.release()
+
+    @classmethod
+    def from_frame(cls, frame: RawPacket) -> "Packet":
+        """
+        Parse a raw Ethernet frame (optionally VLAN tagged), without Scapy.
+
+        Raises:
+            PacketError: The frame is truncated, or is not a TCP/IP packet
+
+        Returns:
+            Parsed packet object
+        """
+        return cls.from_buffer(frame, frame_ip_offset(frame))
+
+
+def frame_ip_offset(frame: RawPacket) -> int:
+    """
+    Get the offset of the IP header in a raw Ethernet frame (optionally VLAN tagged).
+
+    Raises:
+        PacketError: The frame is truncated, or is not an IP frame
+
+    Returns:
+        Offset of the IP header
+    """
+    offset = ETHERNET_HEADER_LENGTH
+
+    if len(frame) < offset:
+        raise PacketError("Truncated Ethernet header")
+
+    (ethertype,) = _ETHERTYPE.unpack_from(frame, offset - 2)
+
+    while ethertype in ETHERTYPES_VLAN and len(frame) >= offset + VLAN_TAG_LENGTH:
+        offset += VLAN_TAG_LENGTH
+        (ethertype,) = _ETHERTYPE.unpack_from(frame, offset - 2)
+
+    if ethertype not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+        raise PacketError(f"Unsupported ethertype {ethertype:#06x}")
+
+    return offset
+
+
+def _from_scapy(packet: ScapyPacket) -> Packet:
+    if ScapyIPv4 in packet:
+        raw = dissected_bytes(packet[ScapyIPv4])
+    elif ScapyIPv6 in packet:
+        raw = dissected_bytes(packet[ScapyIPv6])
+    else:
+        raw = None
+
+    # Dissected packets are decoded from their wire bytes, without assembling
+    # them again. Crafted packets are assembled, so automatic fields are calculated.
+    if raw is not None:
+        try:
+            return Packet.from_buffer(raw)
+        except PacketError:
+            pass  # e.g. IPv6 extension headers, Scapy finds the TCP layer
+
+    return Packet.from_packet(copy_packet(packet, assemble=True))
+
 
 def parse_packet(packet: PacketLike) -> Packet:
     """
-    Parse packet from one of the supported formats: ``Packet``, ``scapy.packet.Packet``
+    Parse packet from one of the supported formats: ``Packet``, ``scapy.packet.Packet``,
+    or a raw IP packet (bytes-like object, see ``Packet.from_buffer``).
+    Scapy packets dissected from raw bytes (e.g. sniffed) are decoded from their
+    wire bytes, crafted or modified packets are assembled first.
 
     Args:
         packet: Packet to parse
@@ -72,6 +189,8 @@ def parse_packet(packet: PacketLike) -> Packet:
     if isinstance(packet, Packet):
         return packet
     elif isinstance(packet, ScapyPacket):
-        return Packet.from_packet(copy_packet(packet, assemble=True))
+        return _from_scapy(packet)
+    elif isinstance(packet, (bytes, bytearray, memoryview)):
+        return Packet.from_buffer(packet)
     else:
         raise PacketError(f"Unsupported packet format {type(packet).__name__}.")
@@ -0,0 +1,279 @@
+"""
+Two-phase lazy packet decoding.
+
+Most captured packets can't be used by any fingerprint (e.g. pure ACKs without
+TCP timestamps), yet a full decode parses TCP options, computes quirks and copies
+the payload before they can be rejected. ``decode_packet`` first peeks at the
+fixed header fields (IP version, fragment bits, TCP flags, options and payload
+lengths), and only fully decodes packets that an enabled fingerprint will consume.
+"""
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import Optional
+
+from scapy.packet import NoPayload, Padding
+
+from pyp0f.exceptions import PacketError
+from pyp0f.net.layers.ip import (
+    IP_FLAG_MF,
+    IP_PROTOCOL_TCP,
+    IPV4,
+    IPV4_HEADER,
+    IPV4_HEADER_LENGTH,
+    IPV6,
+    IPV6_HEADER,
+    IPV6_HEADER_LENGTH,
+)
+from pyp0f.net.layers.tcp import TCP_HEADER_LENGTH, TCPFlag
+from pyp0f.net.layers.tcp.flags import TCP_TYPE_FLAGS
+from pyp0f.net.packet import (
+    Packet,
+    PacketLike,
+    RawPacket,
+    frame_ip_offset,
+    parse_packet,
+    should_fingerprint,
+)
+from pyp0f.net.scapy import ScapyIPv4, ScapyIPv6, ScapyPacket, ScapyTCP
+from pyp0f.utils.slots import add_slots
+
+# Offsets of the TCP data offset and flags bytes
+_TCP_DATA_OFFSET = 12
+_TCP_FLAGS = 13
+
+_SYN = int(TCPFlag.SYN)
+_SYN_ACK = int(TCPFlag.SYN | TCPFlag.ACK)
+_ACK = int(TCPFlag.ACK)
+
+
+class Fingerprints(IntFlag):
+    """
+    Fingerprint types packets are decoded for.
+    """
+
+    MTU = 0x01
+    TCP = 0x02
+    HTTP = 0x04
+    UPTIME = 0x08
+    ALL = MTU | TCP | HTTP | UPTIME
+
+
+# Consumers as plain integers, converted to ``Fingerprints`` once
+_MTU = int(Fingerprints.MTU)
+_TCP = int(Fingerprints.TCP)
+_HTTP = int(Fingerprints.HTTP)
+_UPTIME = int(Fingerprints.UPTIME)
+_NONE = Fingerprints(0)
+
+
+@add_slots
+@dataclass
+class PacketPeek:
+    """
+    Fixed header fields of a packet, read without decoding it.
+    """
+
+    is_fragment: bool
+    tcp_type: int
+    """TCP type flags (see ``TCPFlag``)"""
+
+    options_length: int
+    """TCP options length"""
+
+    payload_length: int
+    """TCP payload length"""
+
+    @classmethod
+    def from_buffer(cls, buffer: RawPacket, offset: int = 0) -> "PacketPeek":
+        """
+        Peek at a raw IP packet.
+
+        Args:
+            buffer: Buffer containing the packet
+            offset: Offset of the IP header in the buffer. Defaults to 0.
+
+        Raises:
+            PacketError: The packet is truncated, or is not a TCP/IP packet
+
+        Returns:
+            Packet peek
+        """
+        length = len(buffer) - offset
+
+        if length <= 0:
+            raise PacketError("Empty packet")
+
+        version = buffer[offset] >> 4
+
+        if version == IPV4:
+            if length < IPV4_HEADER_LENGTH:
+                raise PacketError("Truncated IPv4 header")
+
+            (
+                version_ihl,
+                _,
+                total_length,
+                _,
+                flags_fragment,
+                _,
+                protocol,
+            ) = IPV4_HEADER.unpack_from(buffer, offset)
+            header_length = (version_ihl & 0x0F) * 4
+            is_fragment = bool(
+                flags_fragment >> 13 & IP_FLAG_MF or flags_fragment & 0x1FFF
+            )
+            # Ignore link-layer padding, like ``IP.from_buffer``
+            end = total_length if header_length <= total_length <= length else length
+        elif version == IPV6:
+            if length < IPV6_HEADER_LENGTH:
+                raise PacketError("Truncated IPv6 header")
+
+            _, payload_length, protocol, _ = IPV6_HEADER.unpack_from(buffer, offset)
+            header_length = IPV6_HEADER_LENGTH
+            is_fragment = False
+            end = min(header_length + payload_length, length)
+        else:
+            raise PacketError(f"Unsupported IP version {version}")
+
+        if protocol != IP_PROTOCOL_TCP:
+            raise PacketError("Packet doesn't have an TCP layer!")
+
+        if (
+            end - header_length < TCP_HEADER_LENGTH
+            or header_length < IPV4_HEADER_LENGTH
+        ):
+            raise PacketError("Truncated TCP header")
+
+        tcp_start = offset + header_length
+        tcp_header_length = max(
+            (buffer[tcp_start + _TCP_DATA_OFFSET] >> 4) * 4, TCP_HEADER_LENGTH
+        )
+        tcp_header_length = min(tcp_header_length, end - header_length)
+
+        return cls(
+            is_fragment=is_fragment,
+            tcp_type=buffer[tcp_start + _TCP_FLAGS] & TCP_TYPE_FLAGS,
+            options_length=tcp_header_length - TCP_HEADER_LENGTH,
+            payload_length=end - header_length - tcp_header_length,
+        )
+
+    @classmethod
+    def from_scapy(cls, packet: ScapyPacket) -> "PacketPeek":
+        """
+        Peek at a Scapy packet, without assembling it.
+
+        Raises:
+            PacketError: The packet is not a TCP/IP packet
+        """
+        if ScapyTCP not in packet:
+            raise PacketError("Packet doesn't have an TCP layer!")
+
+        if ScapyIPv4 in packet:
+            ip = packet[ScapyIPv4]
+            is_fragment = bool(int(ip.flags) & IP_FLAG_MF or ip.frag)
+        elif ScapyIPv6 in packet:
+            is_fragment = False
+        else:
+            raise PacketError("Packet doesn't have an IP layer!")
+
+        tcp = packet[ScapyTCP]
+        payload = tcp.payload
+
+        return cls(
+            is_fragment=is_fragment,
+            tcp_type=int(tcp.flags) & TCP_TYPE_FLAGS,
+            # Exact lengths are unknown until assembled, emptiness is enough
+            options_length=1 if tcp.options else 0,
+            payload_length=0 if isinstance(payload, (NoPayload, Padding)) else 1,
+        )
+
+    @classmethod
+    def from_decoded(cls, packet: Packet) -> "PacketPeek":
+        return cls(
+            is_fragment=packet.ip.is_fragment,
+            tcp_type=int(packet.tcp.type),
+            options_length=packet.tcp.header_length - TCP_HEADER_LENGTH,
+            payload_length=len(packet.tcp.payload),
+        )
+
+    def consumers(self, fingerprints: Fingerprints = Fingerprints.ALL) -> Fingerprints:
+        """
+        Get the enabled fingerprint types that would consume the packet.
+        Types needing TCP options (MTU needs MSS, uptime needs timestamps)
+        only consume packets with options.
+        """
+        if not should_fingerprint(self.is_fragment, self.tcp_type):
+            return _NONE
+
+        tcp_type = self.tcp_type
+        consumers = 0
+
+        if tcp_type == _SYN or tcp_type == _SYN_ACK:
+            consumers = _TCP | _MTU | _UPTIME if self.options_length else _TCP
+        elif tcp_type == _ACK and self.options_length:
+            consumers = _UPTIME
+
+        if self.payload_length:
+            consumers |= _HTTP
+
+        if consumers:
+            consumers &= int(fingerprints)
+
+        return Fingerprints(consumers) if consumers else _NONE
+
+
+def peek_packet(packet: PacketLike) -> PacketPeek:
+    """
+    Peek at a packet in one of the supported formats (see ``parse_packet``).
+
+    Raises:
+        PacketError: Unsupported packet format, or not a TCP/IP packet
+    """
+    if isinstance(packet, Packet):
+        return PacketPeek.from_decoded(packet)
+    elif isinstance(packet, ScapyPacket):
+        return PacketPeek.from_scapy(packet)
+    elif isinstance(packet, (bytes, bytearray, memoryview)):
+        return PacketPeek.from_buffer(packet)
+    else:
+        raise PacketError(f"Unsupported packet format {type(packet).__name__}.")
+
+
+def decode_packet(
+    packet: PacketLike, fingerprints: Fingerprints = Fingerprints.ALL
+) -> Optional[Packet]:
+    """
+    Decode a packet only if one of the enabled fingerprint types would consume it.
+
+    Args:
+        packet: Packet to decode (see ``parse_packet``)
+        fingerprints: Enabled fingerprint types. Defaults to Fingerprints.ALL.
+
+    Raises:
+        PacketError: Unsupported packet format, or not a TCP/IP packet
+
+    Returns:
+        Decoded packet, or None if no enabled fingerprint type would consume it
+    """
+    if not peek_packet(packet).consumers(fingerprints):
+        return None
+
+    return parse_packet(packet)
+
+
+def decode_frame(
+    frame: RawPacket, fingerprints: Fingerprints = Fingerprints.ALL
+) -> Optional[Packet]:
+    """
+    Decode a raw Ethernet frame only if one of the enabled fingerprint types
+    would consume it (see ``decode_packet``).
+
+    Raises:
+        PacketError: The frame is truncated, or is not a TCP/IP frame
+    """
+    offset = frame_ip_offset(frame)
+
+    if not PacketPeek.from_buffer(frame, offset).consumers(fingerprints):
+        return None
+
+    return Packet.from_buffer(frame, offset)
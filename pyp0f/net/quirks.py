@@ -26,6 +26,33 @@ class Quirk(Flag):
     OPT_BAD = auto()  # Problem parsing TCP options
 
 
+class QuirkValue:
+    """
+    Plain int values of quirks. Packet parsing accumulates quirks with these
+    and converts them to ``Quirk`` once, as ``enum.Flag`` arithmetic is slow.
+    """
+
+    ECN = Quirk.ECN.value
+    DF = Quirk.DF.value
+    NZ_ID = Quirk.NZ_ID.value
+    ZERO_ID = Quirk.ZERO_ID.value
+    NZ_MBZ = Quirk.NZ_MBZ.value
+    FLOW = Quirk.FLOW.value
+
+    ZERO_SEQ = Quirk.ZERO_SEQ.value
+    NZ_ACK = Quirk.NZ_ACK.value
+    ZERO_ACK = Quirk.ZERO_ACK.value
+    NZ_URG = Quirk.NZ_URG.value
+    URG = Quirk.URG.value
+    PUSH = Quirk.PUSH.value
+
+    OPT_ZERO_TS1 = Quirk.OPT_ZERO_TS1.value
+    OPT_NZ_TS2 = Quirk.OPT_NZ_TS2.value
+    OPT_EOL_NZ = Quirk.OPT_EOL_NZ.value
+    OPT_EXWS = Quirk.OPT_EXWS.value
+    OPT_BAD = Quirk.OPT_BAD.value
+
+
 QUIRK_STRINGS = {
     Quirk.ECN: "ecn",
     Quirk.DF: "df",
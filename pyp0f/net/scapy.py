@@ -1,6 +1,9 @@
+from typing import Optional
+
 from scapy.layers.inet import IP as ScapyIPv4
 from scapy.layers.inet import TCP as ScapyTCP
 from scapy.layers.inet6 import IPv6 as ScapyIPv6
+from scapy.packet import NoPayload
 from scapy.packet import Packet as ScapyPacket
 
 
@@ -18,4 +21,34 @@ def copy_packet(packet: ScapyPacket, *, assemble: bool = False) -> ScapyPacket:
     return packet.__class__(bytes(packet)) if assemble else packet.copy()
 
 
-__all__ = ["ScapyPacket", "ScapyIPv4", "ScapyIPv6", "ScapyTCP", "copy_packet"]
+def dissected_bytes(packet: ScapyPacket) -> Optional[bytes]:
+    """
+    Get the wire bytes of a packet dissected from raw bytes (e.g. sniffed),
+    from the raw bytes cached by Scapy, without assembling it again.
+
+    Args:
+        packet: Packet (or layer) to get the bytes of
+
+    Returns:
+        Wire bytes, or None if the packet was crafted or modified after dissection
+        (its automatic fields, such as lengths and checksums, must be assembled)
+    """
+    layer = packet
+
+    while not isinstance(layer, NoPayload):
+        if layer.raw_packet_cache is None:
+            return None
+
+        layer = layer.payload
+
+    return bytes(packet)
+
+
+__all__ = [
+    "ScapyPacket",
+    "ScapyIPv4",
+    "ScapyIPv6",
+    "ScapyTCP",
+    "copy_packet",
+    "dissected_bytes",
+]
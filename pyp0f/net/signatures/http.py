@@ -1,5 +1,4 @@
-from dataclasses import dataclass, field
-from typing import Set
+from dataclasses import dataclass
 
 from pyp0f.net.layers.http import HTTP
 from pyp0f.net.packet import Packet
@@ -11,11 +10,6 @@ from .base import PacketSignature
 @add_slots
 @dataclass
 class HTTPPacketSignature(PacketSignature, HTTP):
-    header_names: Set[bytes] = field(init=False)
-
-    def __post_init__(self):
-        self.header_names = {header.lower_name for header in self.headers}
-
     @classmethod
     def from_packet(cls, packet: Packet):
         return cls.from_buffer(packet.tcp.payload)
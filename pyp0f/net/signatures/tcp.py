@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from pyp0f.database.parse.wildcard import WILDCARD
@@ -11,9 +12,12 @@ from pyp0f.utils.time import get_unix_time_ms
 
 from .base import PacketSignature
 
+# Maximum number of window multiplier computations kept in the process-wide cache
+WINDOW_MULTIPLIER_CACHE_SIZE = 4096
+
 
 @add_slots
-@dataclass
+@dataclass(frozen=True)
 class WindowMultiplier:
     value: int
     is_mtu: bool
@@ -34,7 +38,11 @@ class TCPPacketSignature(PacketSignature):
     quirks: Quirk
     syn_mss: int
 
-    # Cached window multiplier
+    quirks_value: int = field(init=False)
+    """Quirks as a plain int, for fast matching."""
+
+    # Cached window multiplier. Computing it is idempotent, so concurrent
+    # readers of the same signature may at worst compute it twice.
     _window_multiplier: Optional[WindowMultiplier] = field(init=False)
 
     received: int = field(default_factory=get_unix_time_ms)
@@ -46,6 +54,7 @@ class TCPPacketSignature(PacketSignature):
         # Since dataclass with slots and field(default=None) don't work,
         # initialize the value here
         self._window_multiplier = None
+        self.quirks_value = self.quirks.value
 
     @classmethod
     def from_packet(cls, packet: Packet, syn_mss: int = 0):
@@ -57,7 +66,7 @@ class TCPPacketSignature(PacketSignature):
             options=packet.tcp.options,
             headers_length=packet.ip.header_length + packet.tcp.header_length,
             has_payload=bool(packet.tcp.payload),
-            quirks=packet.ip.quirks | packet.tcp.quirks,
+            quirks=Quirk(packet.ip.quirks.value | packet.tcp.quirks.value),
             # If we got SYN MSS value but it is not on SYN+ACK, ignore
             syn_mss=syn_mss if packet.tcp.type == TCPFlag.SYN | TCPFlag.ACK else 0,
         )
@@ -74,42 +83,68 @@ class TCPPacketSignature(PacketSignature):
         return self._window_multiplier
 
     def calculate_window_multiplier(self) -> WindowMultiplier:
-        if not self.window_size or self.options.mss < 100:
-            return WindowMultiplier(WILDCARD, is_mtu=False)
+        return calculate_window_multiplier(
+            self.window_size,
+            self.options.mss,
+            bool(self.options.timestamp),
+            self.ip_version,
+            self.headers_length,
+            self.syn_mss,
+        )
 
-        divs: List[Tuple[int, bool]] = []
 
-        def add_div(div: int, use_mtu: bool = False):
-            divs.append((div, use_mtu))
+@lru_cache(maxsize=WINDOW_MULTIPLIER_CACHE_SIZE)
+def calculate_window_multiplier(
+    window_size: int,
+    mss: int,
+    has_timestamp: bool,
+    ip_version: int,
+    headers_length: int,
+    syn_mss: int,
+) -> WindowMultiplier:
+    """
+    Figure out if window size is a multiplier of MSS or MTU.
 
-        add_div(self.options.mss)
+    The result only depends on a handful of packet values that take few distinct
+    values in practice, so it is memoized process-wide (bounded LRU).
+    The returned object is shared between callers and must not be modified.
+    """
+    if not window_size or mss < 100:
+        return WindowMultiplier(WILDCARD, is_mtu=False)
 
-        # Some systems will sometimes subtract 12 bytes when timestamps are in use.
-        if self.options.timestamp:
-            add_div(self.options.mss - 12)
+    divs: List[Tuple[int, bool]] = []
 
-        # Some systems use MTU on the wrong interface
-        add_div(1500 - MIN_TCP4)
-        add_div(1500 - MIN_TCP4 - 12)
+    def add_div(div: int, use_mtu: bool = False):
+        divs.append((div, use_mtu))
 
-        if self.ip_version == IPV6:
-            add_div(1500 - MIN_TCP6)
-            add_div(1500 - MIN_TCP6 - 12)
+    add_div(mss)
 
-        # Some systems use MTU instead of MSS:
-        add_div(self.options.mss + MIN_TCP4, use_mtu=True)
-        add_div(self.options.mss + self.headers_length, use_mtu=True)
-        if self.ip_version == IPV6:
-            add_div(self.options.mss + MIN_TCP6, use_mtu=True)
-        add_div(1500, use_mtu=True)
+    # Some systems will sometimes subtract 12 bytes when timestamps are in use.
+    if has_timestamp:
+        add_div(mss - 12)
 
-        # On SYN+ACKs, some systems use of the peer:
-        if self.syn_mss:
-            add_div(self.syn_mss)  # peer MSS
-            add_div(self.syn_mss - 12)  # peer MSS - 12
+    # Some systems use MTU on the wrong interface
+    add_div(1500 - MIN_TCP4)
+    add_div(1500 - MIN_TCP4 - 12)
 
-        for div, use_mtu in divs:
-            if div and not self.window_size % div:
-                return WindowMultiplier(self.window_size // div, use_mtu)
+    if ip_version == IPV6:
+        add_div(1500 - MIN_TCP6)
+        add_div(1500 - MIN_TCP6 - 12)
 
-        return WindowMultiplier(WILDCARD, is_mtu=False)
+    # Some systems use MTU instead of MSS:
+    add_div(mss + MIN_TCP4, use_mtu=True)
+    add_div(mss + headers_length, use_mtu=True)
+    if ip_version == IPV6:
+        add_div(mss + MIN_TCP6, use_mtu=True)
+    add_div(1500, use_mtu=True)
+
+    # On SYN+ACKs, some systems use of the peer:
+    if syn_mss:
+        add_div(syn_mss)  # peer MSS
+        add_div(syn_mss - 12)  # peer MSS - 12
+
+    for div, use_mtu in divs:
+        if div and not window_size % div:
+            return WindowMultiplier(window_size // div, use_mtu)
+
+    return WindowMultiplier(WILDCARD, is_mtu=False)
@@ -1,7 +1,36 @@
 from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Optional, Sequence
 
 from pyp0f.database import DATABASE, Database
 
+if TYPE_CHECKING:
+    from pyp0f.fingerprint.observer import ResultsObserver
+    from pyp0f.fingerprint.profile import MatchProfiler
+
+
+class TCPEngine(Enum):
+    """
+    Strategies for selecting the TCP records compared with a packet signature.
+    All of them select the same match.
+    """
+
+    LINEAR = "linear"
+    """Compare with all records."""
+
+    PREFILTER = "prefilter"
+    """
+    Compare only with records whose fixed parameters (layout, payload class,
+    MSS, window scale...) accept the signature, found in a tree of records.
+    """
+
+    BITSET = "bitset"
+    """
+    Compare only with records accepted by every parameter (layout, payload class,
+    MSS, window scale, window size, TTL, quirks...), found by intersecting
+    precomputed bitsets of records.
+    """
+
 
 @dataclass
 class Options:
@@ -11,6 +40,21 @@ class Options:
     max_dist: int = 35
     """Maximum TTL distance for non-fuzzy signature matching."""
 
+    observers: Sequence["ResultsObserver"] = ()
+    """Observers of every fingerprint result (e.g. statistics aggregators)."""
+
+    profiler: Optional["MatchProfiler"] = None
+    """Per-record matching statistics collector, for database profiling."""
+
+    tcp_engine: TCPEngine = TCPEngine.BITSET
+    """Strategy for selecting the TCP records compared with packet signatures."""
+
+    http_cache_size: int = 4096
+    """
+    Maximum number of HTTP payload shapes (direction, version, header names and checked
+    header values) whose match is cached. 0 disables the cache.
+    """
+
     special_mss: int = 1331
     """Special MSS used by p0f-sendsyn, and detected by p0f."""
     special_window: int = 1337
@@ -0,0 +1,42 @@
+"""
+Shared memory helpers. ``multiprocessing.shared_memory`` requires Python 3.8,
+so it is only imported when shared memory is used.
+"""
+import sys
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+
+def create_shared_memory(size: int, name: Optional[str] = None) -> "SharedMemory":
+    """
+    Create a new shared memory block.
+
+    Raises:
+        ImportError: Shared memory is not supported (Python 3.7)
+    """
+    return _shared_memory_cls()(name, create=True, size=size)
+
+
+def attach_shared_memory(name: str) -> "SharedMemory":
+    """
+    Attach to an existing shared memory block. Before Python 3.13, the block is
+    tracked (and unlinked on exit) by the resource tracker of the attaching process.
+
+    Raises:
+        ImportError: Shared memory is not supported (Python 3.7)
+    """
+    if sys.version_info >= (3, 13):
+        return _shared_memory_cls()(name, track=False)
+
+    return _shared_memory_cls()(name)
+
+
+def _shared_memory_cls():
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError as e:
+        raise ImportError("Shared memory requires Python 3.8 or newer") from e
+
+    return SharedMemory
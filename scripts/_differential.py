@@ -0,0 +1,509 @@
+"""
+Differential testing of the signature matching engines.
+
+Random packet signatures are generated from database records (so most of them
+match a record, exactly or fuzzily, and the rest exercise the near misses), and every
+engine must select the same record and match type as the reference matcher:
+a linear scan over the records, written as plainly as possible.
+"""
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from scapy.layers.l2 import Dot1Q, Ether
+
+from pyp0f.database import Database
+from pyp0f.database.parse.wildcard import WILDCARD
+from pyp0f.database.records import HTTPRecord, MTURecord, TCPRecord
+from pyp0f.database.signatures import TCPSignature, WindowType
+from pyp0f.fingerprint.http import find_cached_http_match, find_http_match
+from pyp0f.fingerprint.mtu import find_mtu_match
+from pyp0f.fingerprint.results import TCPMatch, TCPMatchType
+from pyp0f.fingerprint.tcp import find_tcp_match
+from pyp0f.image import DatabaseImage
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.layers.http import PacketHeader
+from pyp0f.net.layers.ip import IPV4, IPV6
+from pyp0f.net.layers.tcp import TCPOption, TCPOptions
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.quirks import Quirk
+from pyp0f.net.scapy import ScapyIPv4, ScapyIPv6, ScapyTCP
+from pyp0f.net.signatures import (
+    HTTPPacketSignature,
+    MTUPacketSignature,
+    TCPPacketSignature,
+)
+from pyp0f.options import Options, TCPEngine
+from pyp0f.utils.cache import LRUCache
+
+S = TypeVar("S")
+
+# (packet signature, direction)
+Case = Tuple[S, Direction]
+Engine = Callable[[S, Direction], Any]
+
+DIRECTIONS = (Direction.CLIENT_TO_SERVER, Direction.SERVER_TO_CLIENT)
+
+_FUZZY_QUIRKS = (Quirk.DF, Quirk.NZ_ID, Quirk.ZERO_ID, Quirk.ECN)
+_EXTRA_HEADERS = (b"Cookie", b"X-Requested-With", b"DNT", b"Referer", b"Via")
+
+
+def reference_tcp_signatures_match(
+    signature: TCPSignature, packet_signature: TCPPacketSignature, max_dist: int
+) -> Optional[TCPMatchType]:
+    """
+    p0f's TCP signatures matching, without any precomputation.
+    """
+    match_type = TCPMatchType.EXACT
+
+    if signature.options.layout != packet_signature.options.layout:
+        return None
+
+    signature_quirks = signature.quirks
+
+    if signature.ip_version == WILDCARD:
+        signature_quirks &= (
+            ~(Quirk.FLOW)
+            if packet_signature.ip_version == IPV4
+            else ~(Quirk.DF | Quirk.NZ_ID | Quirk.ZERO_ID | Quirk.NZ_MBZ)
+        )
+
+    if signature_quirks != packet_signature.quirks:
+        deleted = (signature_quirks ^ packet_signature.quirks) & signature_quirks
+        added = (signature_quirks ^ packet_signature.quirks) & packet_signature.quirks
+
+        if deleted & ~(Quirk.DF | Quirk.NZ_ID) or added & ~(Quirk.ZERO_ID | Quirk.ECN):
+            return None
+
+        match_type = TCPMatchType.FUZZY_QUIRKS
+
+    if (
+        signature.options.eol_padding_length
+        != packet_signature.options.eol_padding_length
+        or signature.ip_options_length != packet_signature.ip_options_length
+    ):
+        return None
+
+    if signature.is_bad_ttl:
+        if signature.ttl < packet_signature.ttl:
+            return None
+    elif (
+        signature.ttl < packet_signature.ttl
+        or signature.ttl - packet_signature.ttl > max_dist
+    ):
+        match_type = TCPMatchType.FUZZY_TTL
+
+    if (
+        signature.options.mss != WILDCARD
+        and signature.options.mss != packet_signature.options.mss
+        or signature.window.scale != WILDCARD
+        and signature.window.scale != packet_signature.options.window_scale
+        or signature.payload_class != WILDCARD
+        and signature.payload_class != packet_signature.has_payload
+    ):
+        return None
+
+    multiplier = packet_signature.calculate_window_multiplier()
+
+    if (
+        signature.window.type == WindowType.NORMAL
+        and signature.window.size != packet_signature.window_size
+        or signature.window.type == WindowType.MOD
+        and packet_signature.window_size % signature.window.size
+        or signature.window.type == WindowType.MSS
+        and (multiplier.is_mtu or signature.window.size != multiplier.value)
+        or signature.window.type == WindowType.MTU
+        and (not multiplier.is_mtu or signature.window.size != multiplier.value)
+    ):
+        return None
+
+    return match_type
+
+
+def reference_find_tcp_match(
+    packet_signature: TCPPacketSignature,
+    direction: Direction,
+    database: Database,
+    max_dist: int = Options.max_dist,
+) -> Optional[TCPMatch]:
+    """
+    p0f's TCP record selection: first exact non-generic match, else first exact
+    generic match, else first fuzzy match (unless it's a userland tool).
+    """
+    exact: List[TCPMatch] = []
+    fuzzy: List[TCPMatch] = []
+
+    for record in database.iter_values(TCPRecord, direction):
+        match_type = reference_tcp_signatures_match(
+            record.signature, packet_signature, max_dist
+        )
+
+        if match_type == TCPMatchType.EXACT:
+            exact.append(TCPMatch(match_type, record))
+        elif match_type is not None:
+            fuzzy.append(TCPMatch(match_type, record))
+
+    for match in exact:
+        if not match.record.is_generic:
+            return match
+
+    if exact:
+        return exact[0]
+
+    if fuzzy and not fuzzy[0].record.label.is_user_app:
+        return fuzzy[0]
+
+    return None
+
+
+def reference_find_mtu_match(
+    packet_signature: MTUPacketSignature, database: Database
+) -> Optional[MTURecord]:
+    """
+    p0f's MTU record selection: first record with the same MTU.
+    """
+    for record in database.iter_values(MTURecord):
+        if record.signature.mtu == packet_signature.mtu:
+            return record
+
+    return None
+
+
+def tcp_engines(database: Database) -> Dict[str, Engine[TCPPacketSignature]]:
+    """
+    TCP matching engines, the reference first.
+    """
+    engines: Dict[str, Engine[TCPPacketSignature]] = {
+        "reference": lambda signature, direction: reference_find_tcp_match(
+            signature, direction, database
+        )
+    }
+
+    for name, options in (
+        ("linear", Options(database=database, tcp_engine=TCPEngine.LINEAR)),
+        ("prefilter", Options(database=database, tcp_engine=TCPEngine.PREFILTER)),
+        ("bitset", Options(database=database, tcp_engine=TCPEngine.BITSET)),
+    ):
+        engines[name] = lambda signature, direction, options=options: find_tcp_match(
+            signature, direction, options
+        )
+
+    image = DatabaseImage.from_database(database)
+
+    def image_engine(
+        signature: TCPPacketSignature, direction: Direction
+    ) -> Optional[TCPMatch]:
+        match = image.find_tcp_match(signature, direction)
+        return (
+            None
+            if match is None
+            else TCPMatch(match.type, database.get_record(match.record_id))
+        )
+
+    engines["image"] = image_engine
+    return engines
+
+
+def http_engines(database: Database) -> Dict[str, Engine[HTTPPacketSignature]]:
+    """
+    HTTP matching engines, the reference first.
+    """
+    cache: LRUCache = LRUCache(4096)
+    image = DatabaseImage.from_database(database)
+
+    def image_engine(
+        signature: HTTPPacketSignature, direction: Direction
+    ) -> Optional[HTTPRecord]:
+        match = image.find_http_match(signature, direction)
+        return None if match is None else database.get_record(match.record_id)
+
+    return {
+        "reference": lambda signature, direction: find_http_match(
+            signature, direction, database
+        ),
+        "cached": lambda signature, direction: find_cached_http_match(
+            signature, direction, database, cache
+        ),
+        "image": image_engine,
+    }
+
+
+def mtu_engines(database: Database) -> Dict[str, Engine[MTUPacketSignature]]:
+    """
+    MTU matching engines, the reference first.
+    """
+    image = DatabaseImage.from_database(database)
+
+    def image_engine(
+        signature: MTUPacketSignature, direction: Direction
+    ) -> Optional[MTURecord]:
+        match = image.find_mtu_match(signature)
+        return None if match is None else database.get_record(match.record_id)
+
+    return {
+        "reference": lambda signature, _: reference_find_mtu_match(signature, database),
+        "database": lambda signature, _: find_mtu_match(signature, database),
+        "image": image_engine,
+    }
+
+
+def decoder_engines() -> Dict[str, Engine[bytes]]:
+    """
+    Packet decoding paths of Ethernet frames, the assembled Scapy path first.
+    """
+    return {
+        "scapy": lambda frame, _: Packet.from_packet(Ether(frame)),
+        "dissected": lambda frame, _: parse_packet(Ether(frame)),
+        "frame": lambda frame, _: Packet.from_frame(frame),
+    }
+
+
+def random_tcp_signature(rng: random.Random, record: TCPRecord) -> TCPPacketSignature:
+    """
+    Generate a TCP packet signature from a record, with random mutations.
+    """
+    signature = record.signature
+
+    ip_version = (
+        rng.choice((IPV4, IPV6))
+        if signature.ip_version == WILDCARD or rng.random() < 0.05
+        else signature.ip_version
+    )
+    ttl = max(1, min(255, signature.ttl - rng.randrange(-5, 60)))
+    ip_options_length = (
+        signature.ip_options_length if rng.random() < 0.95 else rng.randrange(4)
+    )
+
+    layout = list(signature.options.layout)
+    if rng.random() < 0.05:
+        layout = rng.sample([*TCPOption], rng.randrange(len(TCPOption)))
+
+    mss = (
+        rng.choice((536, 1360, 1440, 1460, 8961, 16344, rng.randrange(65536)))
+        if signature.options.mss == WILDCARD or rng.random() < 0.05
+        else signature.options.mss
+    )
+    window_scale = (
+        rng.randrange(16)
+        if signature.window.scale == WILDCARD or rng.random() < 0.05
+        else signature.window.scale
+    )
+    has_payload = (
+        rng.random() < 0.5
+        if signature.payload_class == WILDCARD or rng.random() < 0.05
+        else bool(signature.payload_class)
+    )
+    headers_length = 40 if ip_version == IPV4 else 60
+
+    size = signature.window.size
+    window_size = {
+        WindowType.NORMAL: size,
+        WindowType.MOD: size * rng.randrange(1, 8),
+        WindowType.MSS: mss * size,
+        WindowType.MTU: (mss + headers_length) * size,
+    }.get(signature.window.type, rng.randrange(65536))
+
+    if rng.random() < 0.05:
+        window_size = rng.randrange(65536)
+
+    # IP version specific quirks of packets of the other version
+    quirks = signature.quirks & ~(
+        Quirk.FLOW
+        if ip_version == IPV4
+        else Quirk.DF | Quirk.NZ_ID | Quirk.ZERO_ID | Quirk.NZ_MBZ
+    )
+    for quirk in _FUZZY_QUIRKS:
+        if rng.random() < 0.1:
+            quirks ^= quirk
+    if rng.random() < 0.05:
+        quirks ^= rng.choice([*Quirk])
+
+    options = TCPOptions(
+        layout=layout,
+        quirks=Quirk(0),
+        mss=mss,
+        timestamp=rng.randrange(1 << 32) if TCPOption.TS in layout else 0,
+        window_scale=window_scale,
+        eol_padding_length=signature.options.eol_padding_length,
+    )
+
+    return TCPPacketSignature(
+        ip_version=ip_version,
+        ip_options_length=ip_options_length,
+        ttl=ttl,
+        window_size=window_size,
+        options=options,
+        headers_length=headers_length,
+        has_payload=has_payload,
+        quirks=quirks,
+        syn_mss=rng.choice((0, 0, 1460, mss)),
+    )
+
+
+def random_http_signature(
+    rng: random.Random, record: HTTPRecord
+) -> HTTPPacketSignature:
+    """
+    Generate an HTTP packet signature from a record, with random mutations.
+    """
+    signature = record.signature
+    headers: List[PacketHeader] = []
+
+    for header in signature.headers:
+        if header.is_optional and rng.random() < 0.5:
+            continue
+
+        if header.value is None or rng.random() < 0.05:
+            value = b"value%d" % rng.randrange(10)
+        else:
+            value = rng.choice((b"", b"prefix ")) + header.value
+
+        name = header.name.upper() if rng.random() < 0.1 else header.name
+        headers.append(PacketHeader(name=name, value=value))
+
+    for name in (*_EXTRA_HEADERS, *signature.absent_headers):
+        if rng.random() < 0.05:
+            headers.insert(
+                rng.randrange(len(headers) + 1), PacketHeader(name=name, value=b"1")
+            )
+
+    if rng.random() < 0.05:
+        rng.shuffle(headers)
+
+    version = (
+        rng.randrange(2)
+        if signature.version == WILDCARD or rng.random() < 0.05
+        else signature.version
+    )
+    return HTTPPacketSignature(version=version, headers=headers)
+
+
+def tcp_cases(
+    rng: random.Random, database: Database, count: int
+) -> List[Case[TCPPacketSignature]]:
+    records = {
+        direction: list(database.iter_values(TCPRecord, direction))
+        for direction in DIRECTIONS
+    }
+    cases: List[Case[TCPPacketSignature]] = []
+
+    for _ in range(count):
+        direction = rng.choice(DIRECTIONS)
+        record = rng.choice(records[direction])
+        cases.append((random_tcp_signature(rng, record), direction))
+
+    return cases
+
+
+def http_cases(
+    rng: random.Random, database: Database, count: int
+) -> List[Case[HTTPPacketSignature]]:
+    records = {
+        direction: list(database.iter_values(HTTPRecord, direction))
+        for direction in DIRECTIONS
+    }
+    cases: List[Case[HTTPPacketSignature]] = []
+
+    for _ in range(count):
+        direction = rng.choice(DIRECTIONS)
+        record = rng.choice(records[direction])
+        cases.append((random_http_signature(rng, record), direction))
+
+    return cases
+
+
+def mtu_cases(
+    rng: random.Random, database: Database, count: int
+) -> List[Case[MTUPacketSignature]]:
+    """
+    MTUs of records, their neighbours (near misses) and random MTUs.
+    Direction is not part of MTU matching.
+    """
+    mtus = [record.signature.mtu for record in database.iter_values(MTURecord)]
+    cases: List[Case[MTUPacketSignature]] = []
+
+    for _ in range(count):
+        mtu = rng.choice(mtus) + rng.choice((0, 0, 0, -1, 1))
+
+        if rng.random() < 0.1:
+            mtu = rng.randrange(65536)
+
+        cases.append((MTUPacketSignature(mtu), Direction.CLIENT_TO_SERVER))
+
+    return cases
+
+
+def frame_cases(
+    rng: random.Random, database: Database, count: int
+) -> List[Case[bytes]]:
+    """
+    Ethernet frames of packets impersonating records, optionally VLAN tagged,
+    with link-layer padding (e.g. up to the minimum Ethernet frame length).
+    """
+    records = {
+        direction: [
+            record
+            for record in database.iter_values(TCPRecord, direction)
+            # eol+n is not implemented by impersonation
+            if "eol+" not in record.raw_signature
+        ]
+        for direction in DIRECTIONS
+    }
+    cases: List[Case[bytes]] = []
+
+    for _ in range(count):
+        direction = rng.choice(DIRECTIONS)
+        record = rng.choice(records[direction])
+        ip = ScapyIPv6() if record.signature.ip_version == IPV6 else ScapyIPv4()
+        packet = ip / ScapyTCP(
+            flags="S" if direction == Direction.CLIENT_TO_SERVER else "SA"
+        )
+
+        if record.signature.payload_class == 1 or (
+            record.signature.payload_class == WILDCARD and rng.random() < 0.5
+        ):
+            packet /= b"payload"
+
+        packet = impersonate_tcp(packet, raw_signature=record.raw_signature)
+        link = Ether() / Dot1Q() if rng.random() < 0.2 else Ether()
+        padding = bytes(rng.choice((0, 2, 6, 18)))
+        cases.append((bytes(link / packet) + padding, direction))
+
+    return cases
+
+
+def run_differential(
+    engines: Dict[str, Engine[S]], cases: Sequence[Case[S]]
+) -> Dict[str, float]:
+    """
+    Run all engines on all cases and compare their results with the first
+    (reference) engine.
+
+    Raises:
+        AssertionError: An engine selected a different match than the reference
+
+    Returns:
+        Throughput of each engine (signatures per second)
+    """
+    throughputs: Dict[str, float] = {}
+    results: Dict[str, List[Any]] = {}
+
+    for name, engine in engines.items():
+        start = time.perf_counter()
+        results[name] = [engine(signature, direction) for signature, direction in cases]
+        throughputs[name] = len(cases) / max(time.perf_counter() - start, 1e-9)
+
+    reference_name, *engine_names = engines
+
+    for name in engine_names:
+        for (signature, direction), expected, result in zip(
+            cases, results[reference_name], results[name]
+        ):
+            assert result == expected, (
+                f"{name} engine diverged from {reference_name} ({direction.name}):\n"
+                f"  signature: {signature}\n"
+                f"  expected:  {expected}\n"
+                f"  got:       {result}"
+            )
+
+    return throughputs
@@ -33,7 +33,10 @@ from pyp0f.database import DATABASE
 from pyp0f.database.records import MTURecord, TCPRecord
 from pyp0f.fingerprint import fingerprint_http, fingerprint_mtu, fingerprint_tcp
 from pyp0f.impersonate import impersonate_mtu, impersonate_tcp
-from pyp0f.net.packet import Direction
+from pyp0f.net.layers.ip import IP
+from pyp0f.net.layers.tcp import TCP
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.peek import decode_packet
 from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
 from tests._packets import HTTP_PACKETS
 
@@ -147,6 +150,78 @@ def measure_tcp_fingerprint():
     )
 
 
+def measure_layers_parsing():
+    # Dissect the packets from bytes beforehand, so only pyp0f's parsing of the
+    # dissected fields (flags, quirks, TCP options) is measured.
+    all_packets = [
+        ScapyIPv4(
+            bytes(impersonate_tcp(ScapyIPv4() / ScapyTCP(), raw_signature=raw_sig))
+        )
+        for raw_sig in (
+            tcp_record.raw_signature
+            for tcp_record in DATABASE.iter_values(
+                TCPRecord, Direction.CLIENT_TO_SERVER
+            )
+            if "eol+" not in tcp_record.raw_signature
+        )
+    ]
+
+    def parse():
+        for packet in all_packets:
+            IP.from_packet(packet)
+            TCP.from_packet(packet)
+
+    measure_performance(
+        parse, title=f"IP/TCP Layers Parsing ({len(all_packets)} Packets)"
+    )
+
+
+def measure_scapy_parsing():
+    crafted_packets = [
+        impersonate_tcp(
+            ScapyIPv4() / ScapyTCP(), raw_signature=tcp_record.raw_signature
+        )
+        for tcp_record in DATABASE.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+        if "eol+" not in tcp_record.raw_signature
+    ]
+    # Dissected from raw bytes, like sniffed packets
+    sniffed_packets = [ScapyIPv4(bytes(packet)) for packet in crafted_packets]
+
+    def parse_crafted():
+        for packet in crafted_packets:
+            parse_packet(packet)
+
+    def parse_sniffed():
+        for packet in sniffed_packets:
+            parse_packet(packet)
+
+    measure_performance(
+        parse_crafted, title=f"Parse Crafted Packets ({len(crafted_packets)} Packets)"
+    )
+    measure_performance(
+        parse_sniffed, title=f"Parse Sniffed Packets ({len(sniffed_packets)} Packets)"
+    )
+
+
+def measure_lazy_decoding():
+    # Pure ACKs without timestamps, which no fingerprint consumes
+    all_packets = [
+        bytes(ScapyIPv4() / ScapyTCP(sport=1024 + port, flags="A"))
+        for port in range(1000)
+    ]
+
+    def decode():
+        for packet in all_packets:
+            Packet.from_buffer(packet)
+
+    def lazy_decode():
+        for packet in all_packets:
+            decode_packet(packet)
+
+    measure_performance(decode, title=f"Full Decoding ({len(all_packets)} ACKs)")
+    measure_performance(lazy_decode, title=f"Lazy Decoding ({len(all_packets)} ACKs)")
+
+
 def measure_http_fingerprint():
     def fingerprint():
         for test_packet in HTTP_PACKETS:
@@ -214,6 +289,9 @@ def measure_tcp_impersonation():
 measure_load_database()
 measure_mtu_fingerprint()
 measure_tcp_fingerprint()
+measure_layers_parsing()
+measure_scapy_parsing()
+measure_lazy_decoding()
 measure_http_fingerprint()
 measure_mtu_impersonation()
 measure_tcp_impersonation()
@@ -0,0 +1,176 @@
+"""
+This file benchmarks the private memory of pre-forked worker processes that
+fingerprint with a database loaded by their parent: with and without ``prefork``,
+and with a shared-memory database image attached by each worker (``image``).
+
+Each mode runs in a fresh interpreter: the parent loads the database, then forks
+workers that fingerprint packets and report their private (copied) memory,
+read from /proc/self/smaps_rollup (Linux only).
+It also compares the start time of a worker loading the database with a worker
+attaching to an image.
+
+Usage: python -m scripts.benchmark_fork [workers]
+"""
+import gc
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from pyp0f.database import DATABASE, Database
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint import fingerprint_mtu, fingerprint_tcp
+from pyp0f.image import DatabaseImage, create_shared_image
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
+from pyp0f.net.signatures import MTUPacketSignature, TCPPacketSignature
+
+ITERATIONS = 20
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+
+
+def build_packets() -> List[Packet]:
+    return [
+        parse_packet(
+            impersonate_tcp(
+                ScapyIPv4() / ScapyTCP(), raw_signature=tcp_record.raw_signature
+            )
+        )
+        for tcp_record in DATABASE.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+        if "eol+" not in tcp_record.raw_signature
+    ]
+
+
+def private_memory_kb() -> int:
+    fields: Dict[str, int] = {}
+
+    with open(SMAPS_ROLLUP) as smaps:
+        for line in smaps:
+            name, _, value = line.partition(":")
+            fields[name] = int(value.split()[0]) if value.strip().endswith("kB") else 0
+
+    return fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def fingerprint(packet: Packet) -> None:
+    fingerprint_tcp(packet)
+    fingerprint_mtu(packet)
+
+
+def worker(
+    packets: List[Packet], write_fd: int, shm_name: Optional[str] = None
+) -> None:
+    baseline = private_memory_kb()
+    match: Callable[[Packet], None] = fingerprint
+
+    if shm_name is not None:
+        image = DatabaseImage.attach(shm_name)
+
+        def image_match(packet: Packet) -> None:
+            image.find_tcp_match(
+                TCPPacketSignature.from_packet(packet), Direction.CLIENT_TO_SERVER
+            )
+            image.find_mtu_match(MTUPacketSignature.from_packet(packet))
+
+        match = image_match
+
+    for _ in range(ITERATIONS):
+        for packet in packets:
+            match(packet)
+
+    # Automatic collections may not have run yet, a long-running worker's will.
+    gc.collect()
+    os.write(write_fd, f"{private_memory_kb() - baseline}\n".encode())
+
+
+def run_workers(mode: str, worker_count: int) -> List[int]:
+    DATABASE.load()
+    packets = build_packets()
+    DATABASE.load(prefork=mode == "prefork")
+    shm = None
+
+    if mode == "image":
+        shm = create_shared_image(DATABASE)
+        # Workers never touch the parsed database (nor the parent's other objects)
+        gc.collect()
+        gc.freeze()
+
+    read_fd, write_fd = os.pipe()
+    pids = []
+
+    for _ in range(worker_count):
+        pid = os.fork()
+
+        if pid == 0:
+            os.close(read_fd)
+            worker(packets, write_fd, None if shm is None else shm.name)
+            os._exit(0)
+
+        pids.append(pid)
+
+    os.close(write_fd)
+
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+
+    with os.fdopen(read_fd) as results:
+        return [int(line) for line in results]
+
+
+def measure_start() -> None:
+    start = time.perf_counter()
+    Database().load()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    shm = create_shared_image(DATABASE)
+
+    try:
+        start = time.perf_counter()
+        DatabaseImage.attach(shm.name).close()
+        attach_ms = (time.perf_counter() - start) * 1000
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print("-----------------------------------")
+    print("Worker start")
+    print(f"{'load':>10}: {load_ms:>8.2f} ms")
+    print(f"{'attach':>10}: {attach_ms:>8.2f} ms (image of {len(DATABASE)} records)")
+
+
+def main() -> None:
+    if not os.path.exists(SMAPS_ROLLUP):
+        sys.exit(f"{SMAPS_ROLLUP} is not available, this benchmark requires Linux")
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        worker_count = int(sys.argv[3])
+        print(sum(run_workers(sys.argv[2], worker_count)) // worker_count)
+        return
+
+    worker_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    print("-----------------------------------")
+    print(f"Private memory per forked worker ({worker_count} workers)")
+
+    for mode in ("default", "prefork", "image"):
+        output = subprocess.run(
+            [sys.executable, "-m", "scripts.benchmark_fork", "--mode", mode]
+            + [str(worker_count)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        print(f"{mode:>10}: {int(output):>8} kB copied")
+
+    DATABASE.load()
+    measure_start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+This file benchmarks handing captured frames from one process to fingerprint workers:
+through a shared-memory ``FrameRing`` (workers decode raw frames in place), and
+through a ``multiprocessing.Queue`` of parsed ``Packet`` objects (pickled),
+with 1, 2, 4 and 8 consumers.
+
+Usage: python -m scripts.benchmark_ring [frames]
+"""
+import multiprocessing
+import sys
+import time
+from typing import List
+
+from scapy.layers.l2 import Ether
+
+from pyp0f.capture import FrameRing
+from pyp0f.database import DATABASE
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint import fingerprint_mtu, fingerprint_tcp
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
+
+CONSUMER_COUNTS = (1, 2, 4, 8)
+
+DATABASE.load()
+
+
+def build_frames() -> List[bytes]:
+    return [
+        bytes(
+            Ether()
+            / impersonate_tcp(
+                ScapyIPv4() / ScapyTCP(), raw_signature=tcp_record.raw_signature
+            )
+        )
+        for tcp_record in DATABASE.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+        if "eol+" not in tcp_record.raw_signature
+    ]
+
+
+def fingerprint(packet: Packet) -> None:
+    fingerprint_tcp(packet)
+    fingerprint_mtu(packet)
+
+
+def ring_consumer(ring: FrameRing) -> None:
+    while True:
+        frame = ring.get()
+
+        if frame is None:
+            break
+
+        with frame:
+            packet = Packet.from_frame(frame.data)
+
+        fingerprint(packet)
+
+    ring.close()
+
+
+def queue_consumer(queue: multiprocessing.Queue) -> None:
+    while True:
+        packet = queue.get()
+
+        if packet is None:
+            break
+
+        fingerprint(packet)
+
+
+def measure_ring(frames: List[bytes], count: int, consumer_count: int) -> float:
+    ring = FrameRing()
+    consumers = [
+        multiprocessing.Process(target=ring_consumer, args=(ring,))
+        for _ in range(consumer_count)
+    ]
+
+    for consumer in consumers:
+        consumer.start()
+
+    start = time.perf_counter()
+
+    for i in range(count):
+        frame = frames[i % len(frames)]
+
+        while not ring.put(frame, time.time()):
+            time.sleep(0)
+
+    ring.finish(consumer_count)
+
+    for consumer in consumers:
+        consumer.join()
+
+    elapsed = time.perf_counter() - start
+    ring.close()
+    return count / elapsed
+
+
+def measure_queue(frames: List[bytes], count: int, consumer_count: int) -> float:
+    # Capture processes usually parse with Scapy, parsing isn't measured here
+    packets = [parse_packet(Ether(frame)) for frame in frames]
+    queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=4096)
+    consumers = [
+        multiprocessing.Process(target=queue_consumer, args=(queue,))
+        for _ in range(consumer_count)
+    ]
+
+    for consumer in consumers:
+        consumer.start()
+
+    start = time.perf_counter()
+
+    for i in range(count):
+        queue.put(packets[i % len(packets)])
+
+    for _ in consumers:
+        queue.put(None)
+
+    for consumer in consumers:
+        consumer.join()
+
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    frames = build_frames()
+
+    print("-----------------------------------")
+    print(f"Frames handoff throughput ({count} frames)")
+
+    for consumer_count in CONSUMER_COUNTS:
+        ring_rate = measure_ring(frames, count, consumer_count)
+        queue_rate = measure_queue(frames, count, consumer_count)
+        print(
+            f"{consumer_count:>2} consumers: ring {ring_rate:>9.0f} frames/s, "
+            f"queue {queue_rate:>9.0f} frames/s ({ring_rate / queue_rate:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
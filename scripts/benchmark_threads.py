@@ -0,0 +1,89 @@
+"""
+This file benchmarks TCP fingerprinting throughput with a shared, frozen database
+across a growing number of threads.
+
+On a GIL build threads are not expected to scale (the fingerprinting is pure Python),
+but on a free-threaded build (e.g. ``python3.13t``) the throughput should grow
+with the thread count, since a frozen database is never written to.
+No reference results are published, they depend on the build and the core count.
+"""
+import sys
+import threading
+import time
+from typing import List
+
+from pyp0f.database import DATABASE
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint import fingerprint_tcp
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
+from pyp0f.options import Options
+
+THREAD_COUNTS = (1, 2, 4, 8)
+ITERATIONS_PER_THREAD = 20
+
+DATABASE.load()
+OPTIONS = Options(database=DATABASE.freeze())
+
+
+def build_packets() -> List[Packet]:
+    raw_signatures = [
+        tcp_record.raw_signature
+        for tcp_record in DATABASE.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+        if not tcp_record.label.is_generic and "eol+" not in tcp_record.raw_signature
+    ]
+
+    return [
+        parse_packet(impersonate_tcp(ScapyIPv4() / ScapyTCP(), raw_signature=raw_sig))
+        for raw_sig in raw_signatures
+    ]
+
+
+def worker(packets: List[Packet], barrier: threading.Barrier) -> None:
+    barrier.wait()
+
+    for _ in range(ITERATIONS_PER_THREAD):
+        for packet in packets:
+            fingerprint_tcp(packet, options=OPTIONS)
+
+
+def measure_threads(packets: List[Packet], thread_count: int) -> float:
+    barrier = threading.Barrier(thread_count + 1)
+    threads = [
+        threading.Thread(target=worker, args=(packets, barrier))
+        for _ in range(thread_count)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    return thread_count * ITERATIONS_PER_THREAD * len(packets) / elapsed
+
+
+def main() -> None:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    packets = build_packets()
+
+    print(f"Python {sys.version.split()[0]}, GIL enabled: {is_gil_enabled}")
+    print(f"Fingerprinting {len(packets)} packets per iteration")
+
+    baseline = None
+
+    for thread_count in THREAD_COUNTS:
+        rate = measure_threads(packets, thread_count)
+        baseline = baseline or rate
+        print(
+            f"{thread_count} thread(s): {rate:,.0f} packets/s "
+            f"(x{rate / baseline:.2f} vs 1 thread)"
+        )
+
+
+main()
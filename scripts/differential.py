@@ -0,0 +1,58 @@
+"""
+This file runs the differential matching harness (see ``scripts/_differential.py``)
+on many random signatures: every matching engine must select the same records as
+the reference matcher. It fails on the first divergence, and otherwise prints the
+throughput of every engine side by side.
+
+Usage: python -m scripts.differential [cases] [seed]
+"""
+import random
+import sys
+from typing import Dict
+
+from pyp0f.database import DATABASE
+from scripts._differential import (
+    http_cases,
+    http_engines,
+    mtu_cases,
+    mtu_engines,
+    run_differential,
+    tcp_cases,
+    tcp_engines,
+)
+
+DATABASE.load()
+
+
+def print_throughputs(title: str, throughputs: Dict[str, float]) -> None:
+    reference = next(iter(throughputs.values()))
+
+    print("-----------------------------------")
+    print(f"Differential matching: {title}")
+
+    for name, throughput in throughputs.items():
+        print(
+            f"{name:>12}: {throughput:>10.0f} signatures/s ({throughput / reference:.2f}x)"
+        )
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+
+    print_throughputs(
+        f"TCP ({count} signatures)",
+        run_differential(tcp_engines(DATABASE), tcp_cases(rng, DATABASE, count)),
+    )
+    print_throughputs(
+        f"HTTP ({count} signatures)",
+        run_differential(http_engines(DATABASE), http_cases(rng, DATABASE, count)),
+    )
+    print_throughputs(
+        f"MTU ({count} signatures)",
+        run_differential(mtu_engines(DATABASE), mtu_cases(rng, DATABASE, count)),
+    )
+
+
+main()
@@ -0,0 +1,13 @@
+from setuptools import Extension, setup
+
+# Project metadata is in pyproject.toml. The TCP options parsing accelerator is
+# optional: if it fails to build, pyp0f falls back to the pure Python parser.
+setup(
+    ext_modules=[
+        Extension(
+            "pyp0f.net.layers.tcp._options",
+            sources=["pyp0f/net/layers/tcp/_options.c"],
+            optional=True,
+        )
+    ]
+)
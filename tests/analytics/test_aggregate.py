@@ -0,0 +1,173 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pyp0f.analytics import AggregateSnapshot, CountMinSketch, TrafficAggregator
+from pyp0f.database import Database
+from pyp0f.fingerprint import fingerprint_http, fingerprint_mtu, fingerprint_tcp
+from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
+from pyp0f.options import Options
+from tests._packets import HTTP_PACKETS, MTU_PACKETS, TCP_PACKETS
+
+_MTU_DATABASE = "[mtu]\nlabel = {label}\nsig = 1500\n"
+_MTU_PACKET = ScapyIPv4() / ScapyTCP(options=[("MSS", 1460)])
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+def _fingerprint_tcp(aggregator: TrafficAggregator) -> None:
+    options = Options(observers=[aggregator])
+    for test_packet in TCP_PACKETS:
+        fingerprint_tcp(test_packet.packet, options=options)
+
+
+class TestTrafficAggregator:
+    def test_counts(self, clock: Clock):
+        aggregator = TrafficAggregator(clock=clock)
+        options = Options(observers=[aggregator])
+
+        results = [
+            fingerprint_tcp(test_packet.packet, options=options)
+            for test_packet in TCP_PACKETS
+        ]
+        for test_packet in MTU_PACKETS:
+            fingerprint_mtu(test_packet.packet, options=options)
+        fingerprint_http(HTTP_PACKETS[0].payload, options=options)
+
+        snapshot = aggregator.snapshot()
+        assert sum(snapshot.tcp_labels.values()) == len(TCP_PACKETS)
+        assert sum(snapshot.tcp_match_types.values()) == len(TCP_PACKETS)
+        assert sum(snapshot.tcp_distances.values()) == len(TCP_PACKETS)
+        assert sum(snapshot.mtu_labels.values()) == len(MTU_PACKETS)
+        assert snapshot.http_labels == {HTTP_PACKETS[0].expected_label: 1}
+
+        for test_packet in TCP_PACKETS:
+            assert snapshot.tcp_labels[test_packet.expected_label] >= 1
+            assert (
+                snapshot.tcp_match_types[test_packet.expected_match_type.name.lower()]
+                >= 1
+            )
+
+        assert "0" in snapshot.tcp_distances or any(
+            result.distance > 0 for result in results
+        )
+
+    def test_tumbling(self, clock: Clock):
+        windows: List[AggregateSnapshot] = []
+        aggregator = TrafficAggregator(window=10, clock=clock, on_window=windows.append)
+
+        _fingerprint_tcp(aggregator)
+        clock.now += 10
+        assert aggregator.snapshot() == AggregateSnapshot(start=1010, end=1020)
+
+        _fingerprint_tcp(aggregator)
+        assert len(windows) == 1
+        assert windows[0].start == 1000
+        assert sum(windows[0].tcp_labels.values()) == len(TCP_PACKETS)
+        assert sum(aggregator.snapshot().tcp_labels.values()) == len(TCP_PACKETS)
+
+    def test_sliding(self, clock: Clock):
+        aggregator = TrafficAggregator(window=10, slide=5, clock=clock)
+
+        _fingerprint_tcp(aggregator)
+        clock.now += 5
+        _fingerprint_tcp(aggregator)
+        assert sum(aggregator.snapshot().tcp_labels.values()) == 2 * len(TCP_PACKETS)
+
+        clock.now += 5
+        assert sum(aggregator.snapshot().tcp_labels.values()) == len(TCP_PACKETS)
+
+        clock.now += 5
+        assert aggregator.snapshot().tcp_labels == {}
+
+    def test_estimate_src(self, clock: Clock):
+        aggregator = TrafficAggregator(clock=clock, sketch_width=256)
+        result = fingerprint_tcp(
+            TCP_PACKETS[0].packet, options=Options(observers=[aggregator])
+        )
+
+        label = result.record.label.dump()  # type: ignore
+        src_ip = result.packet.src_address[0]
+        assert aggregator.estimate_src(label, src_ip) >= 1
+        assert aggregator.estimate_src(None, src_ip) == 0
+
+        with pytest.raises(ValueError):
+            TrafficAggregator(clock=clock).estimate_src(label, src_ip)
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            TrafficAggregator(window=10, slide=20)
+
+        with pytest.raises(ValueError):
+            TrafficAggregator(window=10, slide=3)
+
+        TrafficAggregator(window=1, slide=0.1)
+
+    def test_created_before_load(self, clock: Clock, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        path.write_text(_MTU_DATABASE.format(label="Link"))
+
+        database = Database()
+        aggregator = TrafficAggregator(clock=clock)
+        options = Options(database=database, observers=[aggregator])
+
+        database.load(path)
+        fingerprint_mtu(_MTU_PACKET, options=options)
+        assert aggregator.snapshot().mtu_labels == {"Link": 1}
+
+    def test_reload_changes_labels(self, clock: Clock, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        path.write_text(_MTU_DATABASE.format(label="Old"))
+
+        database = Database()
+        database.load(path)
+        aggregator = TrafficAggregator(clock=clock)
+        options = Options(database=database, observers=[aggregator])
+        fingerprint_mtu(_MTU_PACKET, options=options)
+
+        # The same label id now names another label
+        path.write_text(_MTU_DATABASE.format(label="New"))
+        database.reload(path)
+        fingerprint_mtu(_MTU_PACKET, options=options)
+
+        assert aggregator.snapshot().mtu_labels == {"Old": 1, "New": 1}
+
+    def test_on_window_snapshot(self, clock: Clock):
+        windows: List[AggregateSnapshot] = []
+
+        def on_window(window: AggregateSnapshot) -> None:
+            windows.append(window)
+            aggregator.snapshot()  # Must not deadlock
+
+        aggregator = TrafficAggregator(window=10, clock=clock, on_window=on_window)
+
+        _fingerprint_tcp(aggregator)
+        clock.now += 10
+        _fingerprint_tcp(aggregator)
+        assert len(windows) == 1
+
+
+def test_count_min_sketch():
+    sketch = CountMinSketch(width=64, depth=4)
+
+    for i in range(100):
+        sketch.add(b"heavy")
+        sketch.add(str(i).encode())
+
+    assert sketch.estimate(b"heavy") >= 100
+    assert sketch.estimate(b"missing") < 100
+
+    sketch.clear()
+    assert sketch.estimate(b"heavy") == 0
@@ -0,0 +1,84 @@
+import pickle
+
+import pytest
+
+from pyp0f.analytics import DistinctHostsTracker, HyperLogLog
+from pyp0f.fingerprint import fingerprint_http, fingerprint_tcp
+from pyp0f.options import Options
+from tests._packets import HTTP_PACKETS, TCP_PACKETS
+
+
+class TestHyperLogLog:
+    @pytest.mark.parametrize("cardinality", [10, 1000, 50000])
+    def test_count(self, cardinality: int):
+        sketch = HyperLogLog(12)
+
+        for i in range(cardinality):
+            sketch.add(i.to_bytes(4, "little"))
+            sketch.add(i.to_bytes(4, "little"))  # Duplicates aren't counted
+
+        assert sketch.count() == pytest.approx(cardinality, rel=0.05)
+
+    def test_merge(self):
+        first, second = HyperLogLog(12), HyperLogLog(12)
+
+        for i in range(2000):
+            first.add(i.to_bytes(4, "little"))
+            second.add((i + 1000).to_bytes(4, "little"))
+
+        first.merge(second)
+        assert first.count() == pytest.approx(3000, rel=0.05)
+
+        with pytest.raises(ValueError):
+            first.merge(HyperLogLog(10))
+
+    def test_serialize(self):
+        sketch = HyperLogLog(8)
+        sketch.add(b"host")
+
+        loaded = HyperLogLog.from_bytes(sketch.to_bytes())
+        assert loaded.registers == sketch.registers
+
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(sketch.to_bytes()[:-1])
+
+    def test_invalid_precision(self):
+        with pytest.raises(ValueError):
+            HyperLogLog(2)
+
+
+class TestDistinctHostsTracker:
+    def test_observe(self):
+        tracker = DistinctHostsTracker(precision=10)
+        options = Options(observers=[tracker])
+
+        for _ in range(3):
+            fingerprint_tcp(TCP_PACKETS[0].packet, options=options)
+
+        assert tracker.counts("tcp") == {TCP_PACKETS[0].expected_label: 1}
+        assert tracker.counts("mtu") == {}
+
+    def test_http(self):
+        tracker = DistinctHostsTracker(precision=10)
+        result = fingerprint_http(HTTP_PACKETS[0].payload)
+
+        for ip in ("1.1.1.1", "1.1.1.2", "1.1.1.1"):
+            tracker.add(result, ip)
+
+        assert tracker.counts("http") == {HTTP_PACKETS[0].expected_label: 2}
+
+    def test_merge(self):
+        result = fingerprint_tcp(TCP_PACKETS[0].packet)
+        shards = [DistinctHostsTracker(precision=10) for _ in range(2)]
+
+        for i, shard in enumerate(shards):
+            for host in range(100):
+                shard.add(result, f"10.0.{i}.{host}")
+
+        # Shards are usually combined in another process
+        merged = pickle.loads(pickle.dumps(shards[0]))
+        merged.merge(shards[1])
+
+        assert merged.counts()[TCP_PACKETS[0].expected_label] == pytest.approx(
+            200, rel=0.05
+        )
@@ -0,0 +1,174 @@
+import csv
+import io
+from pathlib import Path
+
+import pytest
+
+from pyp0f.analytics import CSVWriter, ResultsSink
+from pyp0f.analytics.sink import pack_ip, unpack_ip
+from pyp0f.database import Database
+from pyp0f.database.database import DEFAULT_DATABASE_PATH
+from pyp0f.fingerprint import (
+    fingerprint_http,
+    fingerprint_mtu,
+    fingerprint_tcp,
+    fingerprint_uptime,
+)
+from pyp0f.net.signatures import TCPPacketSignature
+from pyp0f.options import Options
+from tests._packets import HTTP_PACKETS, MTU_PACKETS, TCP_PACKETS
+
+
+def _fill(sink: ResultsSink) -> None:
+    for test_packet in TCP_PACKETS:
+        sink.add(fingerprint_tcp(test_packet.packet))
+
+    for test_packet in MTU_PACKETS:
+        sink.add(fingerprint_mtu(test_packet.packet))
+
+    sink.add(
+        fingerprint_http(HTTP_PACKETS[0].payload),
+        src=("1.1.1.1", 1234),
+        dst=("2.2.2.2", 80),
+    )
+
+    packet = TCP_PACKETS[0].packet
+    sink.add(fingerprint_uptime(packet, TCPPacketSignature.from_packet(packet)))
+
+
+def test_pack_ip():
+    for ip in ("1.2.3.4", "2001:db8::1"):
+        assert len(pack_ip(ip)) == 16
+        assert unpack_ip(pack_ip(ip)) == ip
+
+
+class TestResultsSink:
+    def test_rows(self):
+        sink = ResultsSink(chunk_size=4)
+        _fill(sink)
+
+        assert len(sink) == len(TCP_PACKETS) + len(MTU_PACKETS) + 2
+
+        rows = list(sink.iter_rows())
+        assert len(rows) == len(sink)
+
+        tcp_row = rows[0]
+        tcp_result = fingerprint_tcp(TCP_PACKETS[0].packet)
+        assert tcp_row["kind"] == "tcp"
+        assert tcp_row["label"] == TCP_PACKETS[0].expected_label
+        assert tcp_row["match_type"] == TCP_PACKETS[0].expected_match_type.name.lower()
+        assert tcp_row["distance"] == tcp_result.distance
+        assert (tcp_row["src_ip"], tcp_row["src_port"]) == tcp_result.packet.src_address
+        assert tcp_row["mtu"] is None
+
+        mtu_row = rows[len(TCP_PACKETS)]
+        assert mtu_row["kind"] == "mtu"
+        assert mtu_row["label"] == MTU_PACKETS[0].expected_label
+        assert mtu_row["mtu"] is not None
+
+        http_row = rows[-2]
+        assert http_row["kind"] == "http"
+        assert http_row["label"] == HTTP_PACKETS[0].expected_label
+        assert (http_row["src_ip"], http_row["src_port"]) == ("1.1.1.1", 1234)
+
+    def test_memory(self):
+        sink = ResultsSink(chunk_size=1000)
+        _fill(sink)
+
+        assert sink.nbytes < 1000 * 64
+
+    def test_chunk_view(self):
+        sink = ResultsSink(chunk_size=1000)
+        _fill(sink)
+        chunk = next(sink.iter_chunks())
+
+        for name in ("src_ip", "distance", "uptime_minutes"):
+            view = chunk.view(name)
+            assert view.tobytes() == bytes(chunk.column(name))
+            assert view.obj is getattr(chunk, name)
+
+    def test_csv_streaming(self):
+        file = io.StringIO()
+
+        with ResultsSink(chunk_size=4, writer=CSVWriter(file)) as sink:
+            _fill(sink)
+            assert not sink.chunks
+
+        expected_rows = list(_in_memory_rows())
+        rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+
+        assert len(rows) == len(expected_rows)
+        assert [row["label"] for row in rows] == [
+            row["label"] or "" for row in expected_rows
+        ]
+
+    @pytest.mark.parametrize("format", ["ipc", "parquet"])
+    def test_arrow(self, tmp_path: Path, format: str):
+        pyarrow = pytest.importorskip("pyarrow")
+        from pyp0f.analytics import ArrowWriter
+
+        path = str(tmp_path / f"results.{format}")
+
+        with ResultsSink(chunk_size=4, writer=ArrowWriter(path, format=format)) as sink:
+            _fill(sink)
+
+        if format == "parquet":
+            import pyarrow.parquet
+
+            table = pyarrow.parquet.read_table(path)
+        else:
+            import pyarrow.ipc
+
+            table = pyarrow.ipc.open_file(path).read_all()
+
+        expected_rows = list(_in_memory_rows())
+        assert table.num_rows == len(expected_rows)
+        assert table.column("label").to_pylist() == [
+            row["label"] for row in expected_rows
+        ]
+        src_ips = [
+            None if ip is None else unpack_ip(ip)
+            for ip in table.column("src_ip").to_pylist()
+        ]
+        assert src_ips == [row["src_ip"] for row in expected_rows]
+
+        # Missing values are nulls, like in rows
+        for name in ("src_port", "dst_port", "distance", "mtu", "uptime_minutes"):
+            assert table.column(name).to_pylist() == [
+                row[name] for row in expected_rows
+            ], name
+
+        assert [value is None for value in table.column("match_type").to_pylist()] == [
+            row["match_type"] is None for row in expected_rows
+        ]
+
+    def test_labels_recorded_before_reload(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        path.write_text(DEFAULT_DATABASE_PATH.read_text(encoding="utf-8"))
+        database = Database()
+        database.load(path)
+        options = Options(database=database)
+        packet = TCP_PACKETS[0].packet
+        expected_label = TCP_PACKETS[0].expected_label
+
+        sink = ResultsSink(database=database)
+        sink.add(fingerprint_tcp(packet, options=options))
+
+        path.write_text(
+            DEFAULT_DATABASE_PATH.read_text(encoding="utf-8").replace(
+                f"label = {expected_label}\n", "label = s:unix:Renamed:1.x\n"
+            )
+        )
+        database.reload(path)
+        sink.add(fingerprint_tcp(packet, options=options))
+
+        assert [row["label"] for row in sink.iter_rows()] == [
+            expected_label,
+            "s:unix:Renamed:1.x",
+        ]
+
+
+def _in_memory_rows():
+    sink = ResultsSink()
+    _fill(sink)
+    return sink.iter_rows()
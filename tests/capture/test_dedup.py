@@ -0,0 +1,94 @@
+import pytest
+from scapy.layers.inet import IP, TCP
+
+from pyp0f.capture import Repeat, SynDeduplicator
+from pyp0f.net.packet import parse_packet
+
+
+def _syn(seq: int = 1, timestamp: int = 100, flags: str = "S", sport: int = 1234):
+    return parse_packet(
+        IP(src="10.0.0.1", dst="10.0.0.2")
+        / TCP(
+            sport=sport,
+            dport=80,
+            seq=seq,
+            flags=flags,
+            options=[("Timestamp", (timestamp, 0))],
+        )
+    )
+
+
+def test_repeats():
+    dedup = SynDeduplicator(window=3)
+
+    assert dedup.check(_syn(), 0) is Repeat.NEW
+    assert dedup.check(_syn(), 0.001) is Repeat.DUPLICATE
+    assert dedup.check(_syn(timestamp=1100), 1) is Repeat.RETRANSMISSION
+    # Other flows, sequence numbers and types are distinct
+    assert dedup.check(_syn(seq=2), 1) is Repeat.NEW
+    assert dedup.check(_syn(sport=4321), 1) is Repeat.NEW
+    assert dedup.check(_syn(flags="SA"), 1) is Repeat.NEW
+
+    assert dedup.counts() == {"new": 4, "retransmission": 1, "duplicate": 1}
+
+
+def test_window_expiry():
+    dedup = SynDeduplicator(window=3)
+
+    assert dedup.check(_syn(), 0) is Repeat.NEW
+    # Exponential backoff, each retransmission refreshes the entry
+    assert dedup.check(_syn(timestamp=200), 2) is Repeat.RETRANSMISSION
+    assert dedup.check(_syn(timestamp=300), 4.5) is Repeat.RETRANSMISSION
+    assert dedup.check(_syn(timestamp=400), 10) is Repeat.NEW
+
+
+@pytest.mark.parametrize(
+    "times",
+    [
+        (0, 1, 3, 7, 15, 31, 63),  # Linux: 1 s initial RTO, 6 SYN retries
+        (0, 3, 9),  # Windows: 3 s initial RTO, 2 SYN retries
+    ],
+)
+def test_default_window_covers_backoff(times):
+    dedup = SynDeduplicator()
+
+    assert dedup.check(_syn(timestamp=0), times[0]) is Repeat.NEW
+
+    for time in times[1:]:
+        # The TCP timestamp clock runs at 1 kHz
+        repeat = dedup.check(_syn(timestamp=time * 1000), time)
+        assert repeat is Repeat.RETRANSMISSION
+
+
+def test_other_packets_not_remembered():
+    dedup = SynDeduplicator()
+    ack = _syn(flags="A")
+
+    assert dedup.check(ack) is Repeat.NEW
+    assert dedup.check(ack) is Repeat.NEW
+    assert dedup.counts()["new"] == 0
+
+
+def test_bounded_memory():
+    dedup = SynDeduplicator(window=60, slots=4)
+
+    for port in range(1000):
+        dedup.check(_syn(sport=port), 0)
+
+    assert len(dedup._keys) == len(dedup._seen) == len(dedup._timestamps) == 4
+    # The most recent SYN is still remembered
+    assert dedup.check(_syn(sport=999), 1) is Repeat.DUPLICATE
+
+
+def test_clock():
+    now = [0.0]
+    dedup = SynDeduplicator(window=1, clock=lambda: now[0])
+
+    assert dedup.check(_syn()) is Repeat.NEW
+    now[0] = 2
+    assert dedup.check(_syn()) is Repeat.NEW
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        SynDeduplicator(window=0)
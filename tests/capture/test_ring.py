@@ -0,0 +1,92 @@
+import multiprocessing
+from typing import List
+
+import pytest
+
+from pyp0f.capture import FrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(slots=2, snaplen=8)
+    yield ring
+    ring.close()
+
+
+def test_put_get(ring: FrameRing):
+    assert ring.put(b"0123456789", 1.5)
+
+    with ring.get(timeout=0) as frame:
+        assert frame.timestamp == 1.5
+        assert frame.data == b"01234567"  # Truncated to the snaplen
+
+    assert ring.get(timeout=0) is None
+
+
+def test_full(ring: FrameRing):
+    assert ring.put(b"a")
+    assert ring.put(b"b")
+    assert not ring.put(b"c")
+    assert ring.dropped == 1
+
+    frame = ring.get(timeout=0)
+    assert frame is not None and frame.data == b"a"
+
+    # Released slots are reused, frames stay in order
+    frame.release()
+    assert ring.put(b"d")
+
+    for expected in (b"b", b"d"):
+        with ring.get(timeout=0) as frame:
+            assert frame.data == expected
+
+
+def test_finish(ring: FrameRing):
+    ring.put(b"a")
+    ring.finish(consumers=1)
+
+    with ring.get() as frame:
+        assert frame.data == b"a"
+
+    assert ring.get() is None
+
+
+def _consume(ring: FrameRing, results: "multiprocessing.Queue[List[bytes]]") -> None:
+    frames: List[bytes] = []
+
+    frame = ring.get()
+
+    while frame is not None:
+        with frame:
+            frames.append(bytes(frame.data))
+
+        frame = ring.get()
+
+    results.put(frames)
+    ring.close()
+
+
+def test_consumers():
+    ring = FrameRing(slots=16, snaplen=8)
+    results: "multiprocessing.Queue[List[bytes]]" = multiprocessing.Queue()
+    consumers = [
+        multiprocessing.Process(target=_consume, args=(ring, results)) for _ in range(3)
+    ]
+
+    for consumer in consumers:
+        consumer.start()
+
+    expected = [i.to_bytes(4, "little") for i in range(1000)]
+
+    for frame in expected:
+        while not ring.put(frame):
+            pass
+
+    ring.finish(len(consumers))
+    received = [frame for _ in consumers for frame in results.get(timeout=30)]
+
+    for consumer in consumers:
+        consumer.join()
+
+    ring.close()
+    assert sorted(received) == sorted(expected)
@@ -0,0 +1,112 @@
+import subprocess
+import sys
+
+import pytest
+from scapy.layers.inet import IP, TCP
+from scapy.layers.inet6 import IPv6
+from scapy.layers.l2 import Dot1Q, Ether
+
+from pyp0f.capture import FlowSampler, buffer_flow_key, packet_flow_key
+from pyp0f.exceptions import PacketError
+from pyp0f.net.packet import parse_packet
+
+
+def _flows(count: int):
+    for port in range(count):
+        yield IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1024 + port, dport=80)
+
+
+@pytest.mark.parametrize(
+    "packet",
+    [
+        IP(src="10.0.0.1", dst="10.0.0.2", options=[]) / TCP(sport=1234, dport=80),
+        IPv6(src="::1", dst="2001:db8::2") / TCP(sport=1234, dport=443),
+    ],
+)
+def test_flow_key(packet):
+    reply = packet.copy()
+    reply.src, reply.dst = packet.dst, packet.src
+    reply[TCP].sport, reply[TCP].dport = packet[TCP].dport, packet[TCP].sport
+
+    key = buffer_flow_key(bytes(packet))
+
+    # Same key in both directions, for raw and parsed packets
+    assert buffer_flow_key(bytes(reply)) == key
+    assert packet_flow_key(parse_packet(packet)) == key
+    assert packet_flow_key(parse_packet(reply)) == key
+
+
+def test_flow_key_invalid():
+    with pytest.raises(PacketError):
+        buffer_flow_key(b"")
+
+    with pytest.raises(PacketError):
+        buffer_flow_key(bytes(IP() / TCP())[:21])
+
+    with pytest.raises(PacketError):
+        buffer_flow_key(bytes(IP(proto=17) / bytes(20)))
+
+
+def test_sample_rate():
+    sampler = FlowSampler(1 / 4)
+    sampled = sum(sampler.sample_buffer(bytes(flow)) for flow in _flows(4000))
+
+    assert 800 < sampled < 1200
+    assert FlowSampler(0).sample_buffer(bytes(IP() / TCP())) is False
+    assert FlowSampler(1).sample_buffer(bytes(IP() / TCP())) is True
+
+
+def test_sample_consistency():
+    sampler = FlowSampler(1 / 2, seed=b"seed")
+
+    for flow in _flows(50):
+        decision = sampler.sample_buffer(bytes(flow))
+        frame = bytes(Ether() / Dot1Q() / flow)
+
+        assert sampler.sample_frame(frame) is decision
+        assert sampler.sample(parse_packet(flow)) is decision
+
+
+def test_runtime_rate_nested():
+    sampler = FlowSampler(1 / 2)
+    keys = [buffer_flow_key(bytes(flow)) for flow in _flows(500)]
+    wide = {key for key in keys if sampler.sample_key(key)}
+
+    sampler.rate = 1 / 8
+    assert sampler.rate == pytest.approx(1 / 8)
+    narrow = {key for key in keys if sampler.sample_key(key)}
+
+    assert narrow < wide
+
+    with pytest.raises(ValueError):
+        sampler.rate = 2
+
+
+def test_seed():
+    keys = [buffer_flow_key(bytes(flow)) for flow in _flows(200)]
+    decisions = [
+        [FlowSampler(1 / 2, seed=seed).sample_key(key) for key in keys]
+        for seed in (b"a", b"b")
+    ]
+    assert decisions[0] != decisions[1]
+
+
+def test_same_decisions_across_processes():
+    keys = [buffer_flow_key(bytes(flow)) for flow in _flows(100)]
+    code = (
+        "import sys\n"
+        "from pyp0f.capture import FlowSampler\n"
+        "sampler = FlowSampler(1 / 3, seed=b'seed')\n"
+        "keys = [bytes.fromhex(key) for key in sys.stdin.read().split()]\n"
+        "print(''.join(str(int(sampler.sample_key(key))) for key in keys))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        input=" ".join(key.hex() for key in keys),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+    sampler = FlowSampler(1 / 3, seed=b"seed")
+    assert output == "".join(str(int(sampler.sample_key(key))) for key in keys)
@@ -0,0 +1,183 @@
+from typing import List
+
+import pytest
+from scapy.layers.inet import IP, TCP
+
+from pyp0f.capture import (
+    FrameRing,
+    OverloadController,
+    SheddingTier,
+    Stage,
+    packet_stages,
+)
+from pyp0f.net.packet import parse_packet
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def controller(clock: FakeClock) -> OverloadController:
+    return OverloadController(
+        max_queue_depth=100,
+        latency_budgets={Stage.HTTP: 0.01},
+        escalate_interval=1,
+        recover_interval=5,
+        latency_smoothing=1,
+        clock=clock,
+    )
+
+
+def admitted(controller: OverloadController, stage: Stage, count: int) -> int:
+    return sum(controller.admit(stage) for _ in range(count))
+
+
+@pytest.mark.parametrize(
+    ("flags", "options", "payload", "expected"),
+    [
+        ("S", [], b"", [Stage.SYN]),
+        ("SA", [], b"", [Stage.SYN_ACK]),
+        ("A", [("Timestamp", (1, 1))], b"", [Stage.UPTIME]),
+        ("A", [], b"", []),
+        ("PA", [], b"GET / HTTP/1.1\r\n\r\n", [Stage.HTTP]),
+    ],
+)
+def test_packet_stages(flags: str, options: list, payload: bytes, expected: List):
+    packet = parse_packet(IP() / TCP(flags=flags, options=options) / payload)
+    assert packet_stages(packet) == expected
+
+
+def test_escalation_order(controller: OverloadController, clock: FakeClock):
+    assert controller.update(1000) == 1
+    assert controller.update(1000) == 1  # Too soon after the last change
+
+    levels = []
+
+    for _ in range(3):
+        clock.now += 1
+        levels.append(controller.update(1000))
+
+    assert levels == [2, 3, 3]
+
+    snapshot = controller.snapshot()
+    assert snapshot.level == 3 and snapshot.queue_depth == 1000
+
+
+def test_startup_overload(clock: FakeClock):
+    controller = OverloadController(max_queue_depth=100, clock=clock)
+
+    # Overloaded from the start: no hold-down before the first change
+    assert controller.update(1000) == 1
+
+
+def test_tiers_shedding(controller: OverloadController, clock: FakeClock):
+    expected = [
+        # uptime, HTTP, SYN+ACK, SYN
+        (10, 10, 10, 10),
+        (0, 10, 10, 10),
+        (0, 0, 10, 10),
+        (0, 0, 1, 10),
+    ]
+
+    for level, counts in enumerate(expected):
+        assert controller.level == level
+        assert [admitted(controller, stage, 10) for stage in Stage] == list(counts)
+        clock.now += 1
+        controller.update(1000)
+
+    snapshot = controller.snapshot()
+    assert snapshot.admitted == {"uptime": 10, "http": 20, "syn_ack": 31, "syn": 40}
+    assert snapshot.shed == {"uptime": 30, "http": 20, "syn_ack": 9, "syn": 0}
+
+
+def test_automatic_recovery(controller: OverloadController, clock: FakeClock):
+    for _ in range(2):
+        clock.now += 1
+        controller.update(1000)
+
+    assert controller.level == 2
+
+    # Between the watermarks: neither escalates nor recovers
+    clock.now += 10
+    assert controller.update(80) == 2
+    clock.now += 10
+    assert controller.update(80) == 2
+
+    clock.now += 1
+    assert controller.update(10) == 2
+    clock.now += 5
+    assert controller.update(10) == 1
+    clock.now += 4
+    assert controller.update(10) == 1
+    clock.now += 1
+    assert controller.update(10) == 0
+
+
+def test_latency_budget(controller: OverloadController, clock: FakeClock):
+    controller.record_latency(Stage.HTTP, 0.05)
+    controller.record_latency(Stage.SYN, 1)  # No budget
+
+    clock.now += 1
+    assert controller.update(0) == 1
+    clock.now += 1
+    assert controller.update(0) == 2
+
+    # HTTP is shed, its stale latency doesn't prevent recovery
+    clock.now += 1
+    controller.update(0)
+    clock.now += 5
+    assert controller.update(0) == 1
+
+    assert controller.snapshot().latencies == {"http": 0.05, "syn": 1}
+
+
+def test_timed(controller: OverloadController):
+    with controller.timed(Stage.SYN):
+        pass
+
+    assert 0 <= controller.snapshot().latencies["syn"] < 1
+
+
+def test_custom_tiers(clock: FakeClock):
+    controller = OverloadController(
+        max_queue_depth=1,
+        tiers=[SheddingTier(syn_ack_sample_rate=0.5)],
+        escalate_interval=0,
+        clock=clock,
+    )
+    assert controller.update(2) == 1
+    assert controller.update(2) == 1
+    assert admitted(controller, Stage.SYN_ACK, 10) == 5
+    assert admitted(controller, Stage.UPTIME, 10) == 10
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        OverloadController(max_queue_depth=0)
+
+    with pytest.raises(ValueError):
+        OverloadController(tiers=[SheddingTier(syn_ack_sample_rate=2)])
+
+
+def test_ring_pending():
+    ring = FrameRing(slots=4, snaplen=8)
+
+    try:
+        ring.put(b"a")
+        ring.put(b"b")
+        assert ring.pending == 2
+
+        with ring.get(timeout=0):
+            assert ring.pending == 1
+    finally:
+        ring.close()
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from pyp0f.database.parse.parser import _parse_file
+from pyp0f.database.records import HTTPRecord, TCPRecord
+from pyp0f.exceptions import DatabaseError
+from pyp0f.net.packet import Direction
+
+TCP_SIG = "*:64:0:*:mss*20,10:mss,sok,ts,nop,ws:df,id+:0"
+HTTP_SIG = "*:Host,User-Agent::Firefox/"
+
+
+def test_label_without_sig():
+    database = _parse_file(
+        io.StringIO(
+            "[tcp:request]\n"
+            "label = s:unix:Linux:3.x\n"
+            "label = s:unix:Linux:2.x\n"
+            f"sig = {TCP_SIG}\n"
+        )
+    )
+    (record,) = database.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+
+    assert record.label_id == 0
+    assert database.get_label(record.label_id).dump() == "s:unix:Linux:2.x"
+
+    with pytest.raises(DatabaseError):
+        database.get_label(1)
+
+
+def test_labels_with_different_sys():
+    database = _parse_file(
+        io.StringIO(
+            "[http:request]\n"
+            "label = s:!:Firefox:2.x\n"
+            "sys = Windows\n"
+            f"sig = {HTTP_SIG}\n"
+            "label = s:!:Firefox:2.x\n"
+            "sys = Linux\n"
+            f"sig = {HTTP_SIG}\n"
+            "label = s:!:Firefox:2.x\n"
+            "sys = Windows\n"
+            f"sig = {HTTP_SIG}\n"
+        )
+    )
+    records = list(database.iter_values(HTTPRecord, Direction.CLIENT_TO_SERVER))
+
+    assert [record.label_id for record in records] == [0, 1, 0]
+    assert [database.get_label(i).sys for i in (0, 1)] == [("Windows",), ("Linux",)]
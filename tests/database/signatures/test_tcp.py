@@ -2,6 +2,8 @@ import pytest
 
 from pyp0f.database.parse.wildcard import WILDCARD
 from pyp0f.database.signatures.tcp import (
+    QuirksTolerance,
+    TCPSignature,
     WindowSignature,
     WindowType,
     _parse_options,
@@ -70,3 +72,49 @@ def test_parse_quirks():
 
     with pytest.raises(FieldError):
         _parse_quirks("df,flow", ip_version=4)
+
+
+def _reference_quirks_match(signature_quirks: Quirk, quirks: Quirk) -> bool:
+    deleted = (signature_quirks ^ quirks) & signature_quirks
+    added = (signature_quirks ^ quirks) & quirks
+    return not (
+        deleted & ~(Quirk.DF | Quirk.NZ_ID) or added & ~(Quirk.ZERO_ID | Quirk.ECN)
+    )
+
+
+@pytest.mark.parametrize(
+    "signature_quirks",
+    [
+        Quirk(0),
+        Quirk.DF | Quirk.NZ_ID,
+        Quirk.ECN | Quirk.ZERO_ID,
+        Quirk.DF | Quirk.FLOW,
+    ],
+)
+def test_quirks_tolerance(signature_quirks: Quirk):
+    tolerance = QuirksTolerance.from_quirks(signature_quirks)
+    assert tolerance.exact == signature_quirks.value
+
+    # All combinations of IP quirks, plus an unrelated TCP quirk
+    for value in range(1 << 6):
+        for quirks in (Quirk(value), Quirk(value) | Quirk.PUSH):
+            assert (quirks.value in tolerance.fuzzy) == (
+                quirks != signature_quirks
+                and _reference_quirks_match(signature_quirks, quirks)
+            )
+
+
+def test_signature_quirks_tolerance():
+    signature = TCPSignature.parse("*:64:0:*:mss*20,10:mss,sok,ts,nop,ws:df,id+:0")
+    # IPv4-specific quirks are ignored for IPv6 packets
+    assert signature.ipv4_quirks.exact == (Quirk.DF | Quirk.NZ_ID).value
+    assert signature.ipv6_quirks.exact == 0
+
+    # IPv6-specific quirks are ignored for IPv4 packets
+    signature = TCPSignature.parse("*:64:0:*:mss*20,10:mss,sok,ts,nop,ws:flow:0")
+    assert signature.ipv4_quirks.exact == 0
+    assert signature.ipv6_quirks.exact == Quirk.FLOW.value
+
+    # Quirks of signatures with an IP version are never masked
+    signature = TCPSignature.parse("4:64:0:*:mss*20,10:mss,sok,ts,nop,ws:df:0")
+    assert signature.ipv4_quirks == signature.ipv6_quirks
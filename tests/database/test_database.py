@@ -0,0 +1,203 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from pyp0f.database import DATABASE, Database, DatabaseWatcher
+from pyp0f.database.records import MTURecord, TCPRecord
+from pyp0f.exceptions import DatabaseError
+from pyp0f.fingerprint.http import value_constrained_headers
+from pyp0f.fingerprint.tcp import tcp_prefilter
+from pyp0f.fingerprint.tcp_bitsets import tcp_bitsets
+from pyp0f.net.packet import Direction
+
+_MTU_DATABASE = "[mtu]\nlabel = {label}\nsig = 1500\n"
+
+
+def _write(path: Path, label: str, mtime_ns: int) -> None:
+    path.write_text(_MTU_DATABASE.format(label=label))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _labels(database: Database):
+    return [record.label.name for record in database.iter_values(MTURecord)]
+
+
+def _unexpected_build(database: Database):
+    raise AssertionError("Derived structure was not built in advance")
+
+
+class TestDatabase:
+    def test_reload(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+        assert _labels(database) == ["Old"]
+
+        _write(path, "New", 2)
+        database.reload(path)
+        assert _labels(database) == ["New"]
+
+    def test_reload_error_keeps_records(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+
+        path.write_text("[mtu]\nsig = 1500\n")
+
+        with pytest.raises(DatabaseError):
+            database.reload(path)
+
+        assert _labels(database) == ["Old"]
+
+    def test_reload_rebuilds_derived(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+        assert database.cached("labels", _labels) == ["Old"]
+
+        _write(path, "New", 2)
+        database.reload(path)
+
+        # Built before the records were published
+        assert database.cached("labels", _unexpected_build) == ["New"]
+
+    def test_replaced_during_build(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+
+        def build(records: Database):
+            _write(path, "New", 2)
+            database.reload(path)
+            return _labels(records)
+
+        # Built from the old records, not published with the new ones
+        assert database.cached("labels", build) == ["Old"]
+        assert database.cached("labels", _labels) == ["New"]
+
+
+class TestIds:
+    def test_record_ids(self):
+        records = list(DATABASE.iter_all_values())
+
+        assert sorted(record.id for record in records) == list(range(len(records)))
+
+        for record in records:
+            assert DATABASE.get_record(record.id) is record
+
+    def test_label_ids(self):
+        for record in DATABASE.iter_all_values():
+            assert DATABASE.get_label(record.label_id).dump() == record.label.dump()
+
+        dumps = [
+            (type(label), label.dump(), getattr(label, "sys", ()))
+            for label in DATABASE.labels
+        ]
+        assert len(dumps) == len(set(dumps))
+
+    def test_stable(self):
+        database = Database()
+        database.load()
+
+        assert [
+            (record.id, record.label_id) for record in database.iter_all_values()
+        ] == [(record.id, record.label_id) for record in DATABASE.iter_all_values()]
+
+    def test_invalid_id(self):
+        with pytest.raises(DatabaseError):
+            DATABASE.get_record(-1)
+
+        with pytest.raises(DatabaseError):
+            DATABASE.get_label(len(DATABASE.labels))
+
+
+class TestFrozenDatabase:
+    def test_freeze(self):
+        frozen = DATABASE.freeze()
+
+        assert len(frozen) == len(DATABASE)
+        assert list(frozen.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)) == list(
+            DATABASE.iter_values(TCPRecord, Direction.CLIENT_TO_SERVER)
+        )
+
+    def test_read_only(self):
+        frozen = DATABASE.freeze()
+
+        with pytest.raises(DatabaseError):
+            frozen.load()
+
+        with pytest.raises(DatabaseError):
+            frozen.create(MTURecord)
+
+        with pytest.raises(DatabaseError):
+            frozen.add(next(DATABASE.iter_values(MTURecord)))
+
+    def test_snapshot(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+        frozen = database.freeze()
+
+        _write(path, "New", 2)
+        database.reload(path)
+        assert _labels(frozen) == ["Old"]
+
+    def test_structures_built(self):
+        frozen = DATABASE.freeze()
+
+        # Raise if they weren't built on creation
+        for direction in (Direction.CLIENT_TO_SERVER, Direction.SERVER_TO_CLIENT):
+            tcp_bitsets(direction, frozen)
+            tcp_prefilter(direction, frozen)
+            value_constrained_headers(direction, frozen)
+
+    def test_unknown_structure(self):
+        frozen = DATABASE.freeze()
+
+        # Never built on use, the snapshot is never written to
+        with pytest.raises(DatabaseError):
+            frozen.cached("unknown", _unexpected_build)
+
+
+class TestDatabaseWatcher:
+    def test_check(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+        watcher = DatabaseWatcher(database, path)
+
+        assert not watcher.check()
+
+        _write(path, "New", 2)
+        assert watcher.check()
+        assert _labels(database) == ["New"]
+        assert not watcher.check()
+
+    def test_check_error(self, tmp_path: Path):
+        path = tmp_path / "p0f.fp"
+        _write(path, "Old", 1)
+
+        database = Database()
+        database.load(path)
+        errors = []
+        watcher = DatabaseWatcher(database, path, on_error=errors.append)
+
+        path.write_text("[mtu]\nsig = 1500\n")
+        os.utime(path, ns=(2, 2))
+
+        assert not watcher.check()
+        assert len(errors) == 1
+        assert _labels(database) == ["Old"]
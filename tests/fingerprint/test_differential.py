@@ -0,0 +1,46 @@
+import random
+
+from pyp0f.database import DATABASE
+from scripts._differential import (
+    decoder_engines,
+    frame_cases,
+    http_cases,
+    http_engines,
+    mtu_cases,
+    mtu_engines,
+    run_differential,
+    tcp_cases,
+    tcp_engines,
+)
+
+
+def test_tcp_engines():
+    cases = tcp_cases(random.Random(0), DATABASE, 3000)
+    run_differential(tcp_engines(DATABASE), cases)
+
+
+def test_http_engines():
+    cases = http_cases(random.Random(0), DATABASE, 3000)
+    run_differential(http_engines(DATABASE), cases)
+
+
+def test_mtu_engines():
+    cases = mtu_cases(random.Random(0), DATABASE, 3000)
+    run_differential(mtu_engines(DATABASE), cases)
+
+
+def test_decoders():
+    # Padded frames: Scapy keeps the padding in a layer of its own
+    cases = frame_cases(random.Random(0), DATABASE, 300)
+    run_differential(decoder_engines(), cases)
+
+
+def test_cases_match():
+    # Most generated signatures should match, otherwise the harness only
+    # compares misses.
+    cases = tcp_cases(random.Random(1), DATABASE, 500)
+    reference = tcp_engines(DATABASE)["reference"]
+    matches = sum(
+        reference(signature, direction) is not None for signature, direction in cases
+    )
+    assert matches > len(cases) // 2
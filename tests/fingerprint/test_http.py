@@ -1,10 +1,17 @@
-from typing import Sequence
+from typing import List, Sequence
 
 import pytest
 
+from pyp0f.database import DATABASE, Database
 from pyp0f.database.signatures.http import SignatureHeader
-from pyp0f.fingerprint.http import fingerprint_http, headers_match
+from pyp0f.fingerprint import http
+from pyp0f.fingerprint.http import (
+    fingerprint_http,
+    fingerprint_http_many,
+    headers_match,
+)
 from pyp0f.net.layers.http import PacketHeader
+from pyp0f.options import Options
 from tests._packets import HTTP_PACKETS, HTTPTestPacket
 
 
@@ -116,3 +123,67 @@ def test_fingerprint_http(test_packet: HTTPTestPacket):
     result = fingerprint_http(test_packet.payload)
     assert result.match is not None
     assert result.match.label.dump() == test_packet.expected_label
+
+
+class TestHTTPMatchCache:
+    @pytest.fixture
+    def find_calls(self, monkeypatch: pytest.MonkeyPatch) -> List[tuple]:
+        find_calls: List[tuple] = []
+        find_http_match = http.find_http_match
+
+        def counting_find_http_match(*args):
+            find_calls.append(args)
+            return find_http_match(*args)
+
+        monkeypatch.setattr(http, "find_http_match", counting_find_http_match)
+        return find_calls
+
+    def test_fingerprint_http(self, find_calls: List[tuple]):
+        database = Database()
+        database.load()
+        options = Options(database=database)
+        payload = HTTP_PACKETS[0].payload
+
+        first = fingerprint_http(payload, options=options)
+        second = fingerprint_http(payload, options=options)
+
+        assert len(find_calls) == 1
+        assert first.match is not None
+        assert first.match == second.match
+
+    def test_disabled(self, find_calls: List[tuple]):
+        options = Options(http_cache_size=0)
+        payload = HTTP_PACKETS[0].payload
+
+        fingerprint_http(payload, options=options)
+        fingerprint_http(payload, options=options)
+
+        assert len(find_calls) == 2
+
+    def test_frozen(self, find_calls: List[tuple]):
+        options = Options(database=DATABASE.freeze())
+        payload = HTTP_PACKETS[0].payload
+
+        fingerprint_http(payload, options=options)
+        fingerprint_http(payload, options=options)
+
+        assert len(find_calls) == 2
+
+    def test_fingerprint_http_many(self, find_calls: List[tuple]):
+        options = Options(http_cache_size=0)
+
+        # Same shape as WGET, with a different Host value (not checked by signatures)
+        wget_like = HTTP_PACKETS[0].payload.replace(b"packetlife.net", b"example.com")
+        payloads = [test_packet.payload for test_packet in HTTP_PACKETS] * 3 + [
+            wget_like
+        ]
+
+        results = fingerprint_http_many(payloads, options=options)
+
+        assert len(find_calls) == len(HTTP_PACKETS)
+        assert [result.packet for result in results] == payloads
+
+        for payload, result in zip(payloads, results):
+            expected = fingerprint_http(payload, options=options)
+            assert result.match == expected.match
+            assert result.dishonest == expected.dishonest
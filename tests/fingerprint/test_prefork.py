@@ -0,0 +1,26 @@
+import gc
+
+from pyp0f.database import Database
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint.tcp_bitsets import tcp_bitsets
+from pyp0f.net.packet import Direction
+
+
+def _unexpected_build(database: Database):
+    raise AssertionError("Matching structure was not built by the load")
+
+
+def test_load_prefork():
+    database = Database()
+
+    try:
+        database.load(prefork=True)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+    # Structures were built by the load, not by these calls
+    for direction in (Direction.CLIENT_TO_SERVER, Direction.SERVER_TO_CLIENT):
+        key = (TCPRecord, "bitsets", direction)
+        bitsets = database.cached(key, _unexpected_build)
+        assert bitsets is tcp_bitsets(direction, database)
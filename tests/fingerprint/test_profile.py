@@ -0,0 +1,76 @@
+from pyp0f.database import DATABASE
+from pyp0f.fingerprint import (
+    fingerprint_http,
+    fingerprint_http_many,
+    fingerprint_mtu,
+    fingerprint_tcp,
+)
+from pyp0f.fingerprint.profile import MatchProfiler
+from pyp0f.fingerprint.results import TCPMatchType
+from pyp0f.options import Options
+from tests._packets import HTTP_PACKETS, MTU_PACKETS, TCP_PACKETS
+
+
+class TestMatchProfiler:
+    def test_tcp(self):
+        profiler = MatchProfiler()
+        options = Options(profiler=profiler)
+
+        for test_packet in TCP_PACKETS:
+            result = fingerprint_tcp(test_packet.packet, options=options)
+            assert result.match is not None
+
+            stats = profiler.stats[result.match.record.line_number]
+            assert stats.compared >= 1
+
+            if test_packet.expected_match_type == TCPMatchType.EXACT:
+                assert stats.exact >= 1
+            else:
+                assert stats.fuzzy >= 1
+
+        report = profiler.report()
+        assert len(report) > len(TCP_PACKETS)
+        assert all(
+            first.time_ns >= second.time_ns for first, second in zip(report, report[1:])
+        )
+        assert sum(stats.matched for stats in report) >= len(TCP_PACKETS)
+
+    def test_mtu_http(self):
+        profiler = MatchProfiler()
+        options = Options(profiler=profiler)
+
+        mtu_result = fingerprint_mtu(MTU_PACKETS[0].packet, options=options)
+        assert mtu_result.match is not None
+        assert profiler.stats[mtu_result.match.line_number].exact == 1
+
+        # The HTTP matches cache is bypassed while profiling
+        for _ in range(2):
+            http_result = fingerprint_http(HTTP_PACKETS[0].payload, options=options)
+        fingerprint_http_many([HTTP_PACKETS[0].payload], options=options)
+
+        assert http_result.match is not None
+        assert profiler.stats[http_result.match.line_number].exact == 3
+
+    def test_never_matched(self):
+        profiler = MatchProfiler()
+        result = fingerprint_tcp(
+            TCP_PACKETS[0].packet, options=Options(profiler=profiler)
+        )
+
+        never_matched = list(profiler.never_matched(DATABASE))
+        assert result.match is not None
+        assert result.match.record not in never_matched
+        assert len(never_matched) == len(list(DATABASE.iter_all_values())) - 1
+
+    def test_format_report(self):
+        profiler = MatchProfiler()
+        options = Options(profiler=profiler)
+        for test_packet in TCP_PACKETS:
+            fingerprint_tcp(test_packet.packet, options=options)
+
+        lines = profiler.format_report(limit=3).splitlines()
+        assert len(lines) == 4
+        assert lines[0].split()[0] == "line"
+
+        profiler.clear()
+        assert profiler.report() == []
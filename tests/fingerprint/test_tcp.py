@@ -1,6 +1,15 @@
+import random
+
 import pytest
 
-from pyp0f.fingerprint.tcp import fingerprint_tcp
+from pyp0f.database import DATABASE
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint.tcp import find_tcp_match, fingerprint_tcp
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.packet import Direction
+from pyp0f.net.scapy import ScapyIPv4, ScapyTCP
+from pyp0f.net.signatures import TCPPacketSignature
+from pyp0f.options import Options, TCPEngine
 from tests._packets import TCP_PACKETS, TCPTestPacket
 
 
@@ -14,3 +23,40 @@ def test_fingerprint_tcp(test_packet: TCPTestPacket):
     assert result.match is not None
     assert result.match.type == test_packet.expected_match_type
     assert result.match.record.label.dump() == test_packet.expected_label
+
+
+def test_result_ids():
+    result = fingerprint_tcp(TCP_PACKETS[0].packet)
+    assert result.match is not None
+    assert DATABASE.get_record(result.record_id) is result.match.record
+    assert DATABASE.get_label(result.label_id).dump() == TCP_PACKETS[0].expected_label
+
+
+@pytest.mark.parametrize(
+    ("direction", "flags"),
+    [(Direction.CLIENT_TO_SERVER, "S"), (Direction.SERVER_TO_CLIENT, "SA")],
+)
+@pytest.mark.parametrize("engine", [TCPEngine.PREFILTER, TCPEngine.BITSET])
+def test_engine_matches_linear_scan(
+    direction: Direction, flags: str, engine: TCPEngine
+):
+    random.seed(0)
+    engine_options = Options(tcp_engine=engine)
+    linear_options = Options(tcp_engine=TCPEngine.LINEAR)
+
+    for tcp_record in DATABASE.iter_values(TCPRecord, direction):
+        # eol+n is not implemented by impersonation
+        if "eol+" in tcp_record.raw_signature:
+            continue
+
+        packet = impersonate_tcp(
+            ScapyIPv4() / ScapyTCP(flags=flags, ack=6),
+            raw_signature=tcp_record.raw_signature,
+        )
+        packet_signature = TCPPacketSignature.from_packet(
+            fingerprint_tcp(packet).packet
+        )
+
+        assert find_tcp_match(
+            packet_signature, direction, engine_options
+        ) == find_tcp_match(packet_signature, direction, linear_options)
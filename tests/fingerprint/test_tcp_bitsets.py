@@ -0,0 +1,23 @@
+from pyp0f.database import DATABASE
+from pyp0f.database.records import TCPRecord
+from pyp0f.fingerprint.tcp_bitsets import MAX_TTL, tcp_bitsets
+from pyp0f.net.packet import Direction
+
+
+def test_bitsets_positions():
+    direction = Direction.CLIENT_TO_SERVER
+    bitsets = tcp_bitsets(direction, DATABASE)
+    records = tuple(DATABASE.iter_values(TCPRecord, direction))
+
+    assert bitsets.records == records
+    assert tcp_bitsets(direction, DATABASE) is bitsets
+
+    for position, record in enumerate(records):
+        bit = 1 << position
+        signature = record.signature
+
+        assert bitsets.layouts[tuple(signature.options.layout)] & bit
+        assert bitsets.ttls[signature.ttl] & bit
+        assert bool(bitsets.ttls[MAX_TTL] & bit) != signature.is_bad_ttl
+        assert bitsets.quirks[True, signature.ipv4_quirks.exact] & bit
+        assert bitsets.quirks[False, signature.ipv6_quirks.exact] & bit
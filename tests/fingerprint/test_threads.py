@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pyp0f.database import DATABASE
+from pyp0f.fingerprint import fingerprint_tcp
+from pyp0f.options import Options
+from tests._packets import TCP_PACKETS
+
+
+def test_fingerprint_tcp_threads():
+    options = Options(database=DATABASE.freeze())
+
+    def fingerprint_all():
+        return [
+            fingerprint_tcp(test_packet.packet, options=options).match
+            for test_packet in TCP_PACKETS
+        ]
+
+    expected = fingerprint_all()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(fingerprint_all) for _ in range(32)]
+
+    for future in futures:
+        assert future.result() == expected
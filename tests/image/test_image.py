@@ -0,0 +1,119 @@
+import pytest
+
+from pyp0f.database import DATABASE
+from pyp0f.database.records import MTURecord
+from pyp0f.exceptions import DatabaseError, PacketError
+from pyp0f.fingerprint import fingerprint_http, fingerprint_mtu, fingerprint_tcp
+from pyp0f.image import DatabaseImage, create_shared_image, write_image
+from pyp0f.net.layers.http import read_payload
+from pyp0f.net.layers.tcp import TCPFlag
+from pyp0f.net.packet import Direction
+from pyp0f.net.signatures import (
+    HTTPPacketSignature,
+    MTUPacketSignature,
+    TCPPacketSignature,
+)
+from tests._packets import HTTP_PACKETS, TCP_PACKETS, HTTPTestPacket, TCPTestPacket
+
+
+@pytest.fixture(scope="module")
+def image() -> DatabaseImage:
+    return DatabaseImage.from_database(DATABASE)
+
+
+@pytest.mark.parametrize("test_packet", TCP_PACKETS)
+def test_tcp_match(image: DatabaseImage, test_packet: TCPTestPacket):
+    packet = test_packet.packet
+    direction = (
+        Direction.CLIENT_TO_SERVER
+        if packet.tcp.type == TCPFlag.SYN
+        else Direction.SERVER_TO_CLIENT
+    )
+    match = image.find_tcp_match(TCPPacketSignature.from_packet(packet), direction)
+    assert match is not None
+    assert match.type == test_packet.expected_match_type
+    assert image.get_label(match.label_id).dump() == test_packet.expected_label
+
+
+@pytest.mark.parametrize("test_packet", HTTP_PACKETS)
+def test_http_match(image: DatabaseImage, test_packet: HTTPTestPacket):
+    direction, version, headers = read_payload(test_packet.payload)
+    match = image.find_http_match(HTTPPacketSignature(version, headers), direction)
+    assert match is not None
+    assert image.get_label(match.label_id).dump() == test_packet.expected_label
+
+
+def test_mtu_match(image: DatabaseImage):
+    for mtu_record in DATABASE.iter_values(MTURecord):
+        match = image.find_mtu_match(MTUPacketSignature(mtu_record.signature.mtu))
+        assert match is not None
+        assert DATABASE.get_record(match.record_id).signature == mtu_record.signature
+
+    assert image.find_mtu_match(MTUPacketSignature(1)) is None
+
+
+@pytest.mark.parametrize("test_packet", TCP_PACKETS)
+def test_fingerprint_tcp(image: DatabaseImage, test_packet: TCPTestPacket):
+    result = image.fingerprint_tcp(test_packet.packet)
+    expected = fingerprint_tcp(test_packet.packet)
+    assert result.match is not None and expected.match is not None
+    assert result.match.type == expected.match.type
+    assert result.label == expected.match.record.label
+    assert result.distance == expected.distance
+
+
+@pytest.mark.parametrize("test_packet", TCP_PACKETS)
+def test_fingerprint_mtu(image: DatabaseImage, test_packet: TCPTestPacket):
+    try:
+        expected = fingerprint_mtu(test_packet.packet)
+    except PacketError:
+        with pytest.raises(PacketError):
+            image.fingerprint_mtu(test_packet.packet)
+        return
+
+    result = image.fingerprint_mtu(test_packet.packet)
+    assert result.packet_signature == expected.packet_signature
+    assert result.label == (None if expected.match is None else expected.match.label)
+
+
+@pytest.mark.parametrize("test_packet", HTTP_PACKETS)
+def test_fingerprint_http(image: DatabaseImage, test_packet: HTTPTestPacket):
+    result = image.fingerprint_http(test_packet.payload)
+    assert result.label == fingerprint_http(test_packet.payload).match.label
+    assert result.label.dump() == test_packet.expected_label
+
+
+def test_labels(image: DatabaseImage):
+    assert [
+        image.get_label(label_id) for label_id in range(len(DATABASE.labels))
+    ] == list(DATABASE.labels)
+
+    with pytest.raises(DatabaseError):
+        image.get_label(len(DATABASE.labels))
+
+
+def test_invalid_image():
+    with pytest.raises(DatabaseError):
+        DatabaseImage(b"P0F")
+
+    with pytest.raises(DatabaseError):
+        DatabaseImage(b"\0" * 1024)
+
+
+def test_file_image(tmp_path):
+    path = tmp_path / "p0f.img"
+    write_image(DATABASE, path)
+
+    with DatabaseImage.open(path) as image:
+        assert image.get_label(0) == DATABASE.get_label(0)
+
+
+def test_shared_image():
+    shm = create_shared_image(DATABASE)
+
+    try:
+        with DatabaseImage.attach(shm.name) as image:
+            assert image.get_label(0) == DATABASE.get_label(0)
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from pyp0f.net.layers.http import HTTP, PacketHeader
+
+
+class TestHTTP:
+    def test_header_index(self):
+        http = HTTP(
+            version=1,
+            headers=[
+                PacketHeader(b"Host", b"example.com"),
+                PacketHeader(b"Accept-Language", b"en-US"),
+                PacketHeader(b"accept-language", b"he-IL"),
+            ],
+        )
+
+        assert http.header_names == {b"host", b"accept-language"}
+        assert http.header_values == {
+            b"host": b"example.com",
+            b"accept-language": b"en-US",
+        }
+
+    def test_properties(self):
+        http = HTTP(
+            version=1,
+            headers=[
+                PacketHeader(b"server", b"nginx"),
+                PacketHeader(b"X-Forwarded-For", b"1.1.1.1"),
+                PacketHeader(b"Accept-Language", b"en-US"),
+                PacketHeader(b"Date", b"Tue, 01 Mar 2011 20:45:16 GMT"),
+            ],
+        )
+
+        assert http.software == b"nginx"
+        assert http.via == b"1.1.1.1"
+        assert http.language == b"en-US"
+        assert http.date == datetime(2011, 3, 1, 20, 45, 16, tzinfo=timezone.utc)
+
+    def test_missing_properties(self):
+        http = HTTP(version=1, headers=[PacketHeader(b"Date", b"Not a date")])
+
+        assert http.software is None
+        assert http.via is None
+        assert http.language is None
+        assert http.date is None
@@ -1,9 +1,16 @@
+import random
 from typing import Any, Sequence, Tuple
 
+import pytest
 from scapy.layers.inet import TCPOptionsField
 
 from pyp0f.net.layers.tcp import TCPOption, TCPOptions
-from pyp0f.net.quirks import Quirk
+from pyp0f.net.layers.tcp.options import (
+    OPTION_FORMATS,
+    parse_options_accelerated,
+    parse_options_python,
+)
+from pyp0f.net.quirks import Quirk, QuirkValue
 
 _options = TCPOptionsField("options", None)
 
@@ -79,3 +86,85 @@ class TestTCPOptions:
         assert TCPOptions.parse(bytes([TCPOption.MSS, 3, 1])) == TCPOptions(
             layout=[TCPOption.MSS], quirks=Quirk.OPT_BAD
         )
+
+
+@pytest.mark.parametrize(
+    "parse",
+    [
+        parse_options_python,
+        pytest.param(
+            parse_options_accelerated,
+            marks=pytest.mark.skipif(
+                parse_options_accelerated is None,
+                reason="TCP options accelerator isn't built",
+            ),
+        ),
+    ],
+)
+@pytest.mark.parametrize(
+    ("buffer", "expected_layout"),
+    [
+        # The zero length would point back at the option, parsing stops
+        (bytes([TCPOption.MSS, 0, TCPOption.NOP]), [TCPOption.MSS]),
+        # Parsing resumes at the length byte, read as an option
+        (bytes([TCPOption.MSS, 1]), [TCPOption.MSS, TCPOption.NOP]),
+        (
+            bytes([TCPOption.TS, 1, TCPOption.NOP]),
+            [TCPOption.TS, TCPOption.NOP, TCPOption.NOP],
+        ),
+    ],
+)
+def test_option_shorter_than_header(parse, buffer: bytes, expected_layout: list):
+    for is_syn in (False, True):
+        layout, quirks, *_ = parse(buffer, is_syn)
+        assert layout == expected_layout
+        assert quirks == QuirkValue.OPT_BAD
+
+
+def _random_option(rng: random.Random) -> bytes:
+    number = rng.choice([*TCPOption, 6, 30, 254])
+
+    if number == TCPOption.NOP:
+        return bytes([number])
+
+    if number == TCPOption.EOL:
+        padding = bytes(rng.randrange(4))
+        return bytes([number]) + (padding if rng.random() < 0.8 else b"\x01")
+
+    if number in OPTION_FORMATS:
+        length = 2 + OPTION_FORMATS[number].size
+    elif number == TCPOption.SACK:
+        length = rng.choice([10, 18, 26, 34])
+    else:
+        length = rng.randrange(2, 12)
+
+    # Mostly well-formed options, with a few bad lengths
+    if rng.random() < 0.1:
+        length = rng.randrange(256)
+
+    data = bytes(rng.randrange(256) for _ in range(max(length - 2, 0)))
+    return bytes([number, length]) + data
+
+
+def _random_options(rng: random.Random) -> bytes:
+    if rng.random() < 0.1:
+        return bytes(rng.randrange(256) for _ in range(rng.randrange(41)))
+
+    buffer = b"".join(_random_option(rng) for _ in range(rng.randrange(8)))
+    # Sometimes truncated, as the header length may end mid-option
+    return buffer[: rng.randrange(len(buffer) + 1)] if rng.random() < 0.2 else buffer
+
+
+@pytest.mark.skipif(
+    parse_options_accelerated is None, reason="TCP options accelerator isn't built"
+)
+def test_accelerator_matches_python():
+    rng = random.Random(0)
+
+    for _ in range(20000):
+        buffer = _random_options(rng)
+
+        for is_syn in (False, True):
+            assert parse_options_accelerated(buffer, is_syn) == parse_options_python(
+                buffer, is_syn
+            ), buffer.hex()
@@ -48,3 +48,25 @@ class TestTCP:
             | Quirk.PUSH
             | Quirk.NZ_URG,
         )
+
+    @pytest.mark.parametrize(
+        ("flags", "ack", "urgptr", "expected_quirks"),
+        [
+            ("SN", 0, 0, Quirk.ECN),
+            ("SC", 0, 0, Quirk.ECN),
+            ("SA", 0, 0, Quirk.ZERO_ACK),
+            ("R", 1, 0, Quirk(0)),
+            ("SU", 0, 1, Quirk.URG),
+        ],
+    )
+    def test_flags_quirks(
+        self, flags: str, ack: int, urgptr: int, expected_quirks: Quirk
+    ):
+        layer = TCP.from_packet(
+            create_scapy_layer(
+                ScapyTCP, seq=1, ack=ack, flags=flags, urgptr=urgptr, options=[]
+            )
+        )
+
+        assert layer.quirks == expected_quirks
+        assert isinstance(layer.type, TCPFlag)
@@ -73,3 +73,11 @@ class TestIP:
             is_fragment=False,
             quirks=Quirk.FLOW | Quirk.ECN,
         )
+
+    def test_ipv4_flags(self):
+        ip = IP._from_ipv4(
+            create_scapy_layer(ScapyIPv4, flags="MF+evil", id=0, options=[])
+        )
+
+        assert ip.is_fragment is True
+        assert ip.quirks == Quirk.NZ_MBZ | Quirk.ZERO_ID
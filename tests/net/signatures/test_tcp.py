@@ -0,0 +1,37 @@
+from pyp0f.database.parse.wildcard import WILDCARD
+from pyp0f.net.layers.ip import IPV4, IPV6
+from pyp0f.net.signatures.tcp import WindowMultiplier, calculate_window_multiplier
+
+
+class TestCalculateWindowMultiplier:
+    def test_mss(self):
+        assert calculate_window_multiplier(
+            14600, 1460, False, IPV4, 40, 0
+        ) == WindowMultiplier(10, is_mtu=False)
+
+    def test_mss_with_timestamp(self):
+        assert calculate_window_multiplier(
+            14480, 1460, True, IPV4, 52, 0
+        ) == WindowMultiplier(10, is_mtu=False)
+
+    def test_mtu(self):
+        assert calculate_window_multiplier(
+            15000, 1460, False, IPV6, 60, 0
+        ) == WindowMultiplier(10, is_mtu=True)
+
+    def test_syn_mss(self):
+        assert calculate_window_multiplier(
+            2 * 1337, 1460, False, IPV4, 40, 1337
+        ) == WindowMultiplier(2, is_mtu=False)
+
+    def test_no_multiplier(self):
+        assert calculate_window_multiplier(
+            0, 1460, False, IPV4, 40, 0
+        ) == WindowMultiplier(WILDCARD, is_mtu=False)
+        assert calculate_window_multiplier(
+            8192, 50, False, IPV4, 40, 0
+        ) == WindowMultiplier(WILDCARD, is_mtu=False)
+
+    def test_cached(self):
+        args = (29200, 1460, True, IPV4, 60, 0)
+        assert calculate_window_multiplier(*args) is calculate_window_multiplier(*args)
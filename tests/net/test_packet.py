@@ -0,0 +1,116 @@
+import pytest
+from scapy.layers.inet import ICMP, IPerror, TCPerror
+from scapy.layers.inet6 import IPv6ExtHdrHopByHop
+from scapy.layers.l2 import Dot1Q, Ether
+from scapy.packet import Padding
+
+from pyp0f.database import DATABASE
+from pyp0f.database.records import TCPRecord
+from pyp0f.exceptions import PacketError
+from pyp0f.impersonate import impersonate_tcp
+from pyp0f.net.packet import Direction, Packet, parse_packet
+from pyp0f.net.scapy import (
+    ScapyIPv4,
+    ScapyIPv6,
+    ScapyPacket,
+    ScapyTCP,
+    copy_packet,
+    dissected_bytes,
+)
+
+
+def _scapy_packets():
+    for direction, flags in (
+        (Direction.CLIENT_TO_SERVER, "S"),
+        (Direction.SERVER_TO_CLIENT, "SA"),
+    ):
+        for tcp_record in DATABASE.iter_values(TCPRecord, direction):
+            # eol+n is not implemented by impersonation
+            if "eol+" in tcp_record.raw_signature:
+                continue
+
+            signature = tcp_record.signature
+            ip = ScapyIPv6() if signature.ip_version == 6 else ScapyIPv4()
+            packet = ip / ScapyTCP(flags=flags)
+
+            if signature.payload_class == 1:
+                packet /= b"payload"
+
+            yield impersonate_tcp(packet, raw_signature=tcp_record.raw_signature)
+
+
+def test_from_buffer_matches_scapy():
+    for scapy_packet in _scapy_packets():
+        raw = bytes(scapy_packet)
+        expected = parse_packet(scapy_packet)
+
+        assert Packet.from_buffer(raw) == expected
+        assert parse_packet(raw) == expected
+        # Ethernet padding and VLAN tags
+        frame = bytes(Ether() / Dot1Q() / scapy_packet) + bytes(8)
+        assert Packet.from_frame(frame) == expected
+
+
+@pytest.mark.parametrize(
+    "packet",
+    [
+        ScapyIPv4(proto=17) / bytes(20),
+        ScapyIPv6(nh=17) / bytes(20),
+        ScapyIPv4() / ScapyTCP(),
+    ],
+)
+def test_from_buffer_invalid(packet: ScapyPacket):
+    raw = bytes(packet)
+
+    if ScapyTCP in packet:
+        raw = raw[:30]  # Truncated TCP header
+
+    with pytest.raises(PacketError):
+        Packet.from_buffer(raw)
+
+
+def test_from_frame_invalid():
+    with pytest.raises(PacketError):
+        Packet.from_frame(b"\0" * 10)
+
+    with pytest.raises(PacketError):
+        Packet.from_frame(bytes(Ether(type=0x0806) / bytes(28)))
+
+
+def test_dissected_scapy_packets():
+    for scapy_packet in _scapy_packets():
+        expected = Packet.from_packet(copy_packet(scapy_packet, assemble=True))
+        frame = Ether() / Dot1Q() / scapy_packet / Padding(bytes(8))
+        dissected = Ether(bytes(frame))
+
+        assert (
+            dissected_bytes(
+                dissected[ScapyIPv4 if ScapyIPv4 in dissected else ScapyIPv6]
+            )
+            is not None
+        )
+        assert parse_packet(dissected) == expected
+
+
+def test_modified_dissected_packet():
+    dissected = ScapyIPv4(bytes(ScapyIPv4(ttl=64) / ScapyTCP(flags="S")))
+    assert dissected_bytes(dissected) is not None
+
+    dissected[ScapyTCP].window = 1234
+    assert dissected_bytes(dissected) is None
+    assert dissected_bytes(ScapyIPv4() / ScapyTCP()) is None
+
+    packet = parse_packet(dissected)
+    assert packet.tcp.window == 1234 and packet.ip.ttl == 64
+
+
+def test_dissected_extension_headers():
+    crafted = ScapyIPv6() / IPv6ExtHdrHopByHop() / ScapyTCP(flags="S")
+    assert parse_packet(ScapyIPv6(bytes(crafted))) == parse_packet(crafted)
+
+
+def test_dissected_not_tcp():
+    raw = bytes(ScapyIPv4() / ICMP(type=3) / IPerror() / TCPerror(flags="S"))
+
+    with pytest.raises(PacketError):
+        parse_packet(ScapyIPv4(raw))
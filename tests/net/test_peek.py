@@ -0,0 +1,96 @@
+import pytest
+from scapy.layers.l2 import Ether
+
+from pyp0f.exceptions import PacketError
+from pyp0f.fingerprint.mtu import valid_for_mtu_fingerprint
+from pyp0f.fingerprint.tcp import valid_for_tcp_fingerprint
+from pyp0f.net.packet import parse_packet
+from pyp0f.net.peek import (
+    Fingerprints,
+    PacketPeek,
+    decode_frame,
+    decode_packet,
+    peek_packet,
+)
+from pyp0f.net.scapy import ScapyIPv4, ScapyIPv6, ScapyPacket, ScapyTCP
+
+TIMESTAMP = [("Timestamp", (1, 0))]
+
+PACKETS = [
+    ScapyIPv4() / ScapyTCP(flags="S", options=[("MSS", 1460)] + TIMESTAMP),
+    ScapyIPv6() / ScapyTCP(flags="SA", options=[("MSS", 1440)]),
+    ScapyIPv4() / ScapyTCP(flags="S"),
+    ScapyIPv4() / ScapyTCP(flags="A"),
+    ScapyIPv4() / ScapyTCP(flags="A", options=TIMESTAMP),
+    ScapyIPv4() / ScapyTCP(flags="PA") / b"GET / HTTP/1.1\r\n\r\n",
+    ScapyIPv4(flags="MF") / ScapyTCP(flags="S"),
+    ScapyIPv4() / ScapyTCP(flags="SF"),
+    ScapyIPv4() / ScapyTCP(flags="R"),
+]
+
+CONSUMERS = [
+    Fingerprints.ALL & ~Fingerprints.HTTP,
+    Fingerprints.TCP | Fingerprints.MTU | Fingerprints.UPTIME,
+    Fingerprints.TCP,
+    Fingerprints(0),
+    Fingerprints.UPTIME,
+    Fingerprints.HTTP,
+    Fingerprints(0),
+    Fingerprints(0),
+    Fingerprints(0),
+]
+
+
+@pytest.mark.parametrize(("packet", "expected"), list(zip(PACKETS, CONSUMERS)))
+def test_consumers(packet: ScapyPacket, expected: Fingerprints):
+    raw = bytes(packet)
+    decoded = parse_packet(packet)
+
+    assert PacketPeek.from_buffer(raw).consumers() == expected
+    assert PacketPeek.from_scapy(packet).consumers() == expected
+    assert PacketPeek.from_decoded(decoded).consumers() == expected
+    # Ethernet padding is not a payload
+    frame = bytes(Ether() / packet) + bytes(8)
+    assert PacketPeek.from_buffer(frame, 14).consumers() == expected
+
+    # Peeking never rejects packets the fingerprints accept
+    if valid_for_tcp_fingerprint(decoded):
+        assert Fingerprints.TCP in expected
+
+    if valid_for_mtu_fingerprint(decoded):
+        assert Fingerprints.MTU in expected
+
+
+@pytest.mark.parametrize("packet", PACKETS)
+def test_decode(packet: ScapyPacket):
+    raw = bytes(packet)
+    consumed = bool(peek_packet(raw).consumers(Fingerprints.TCP | Fingerprints.HTTP))
+    expected = parse_packet(packet) if consumed else None
+
+    assert decode_packet(raw, Fingerprints.TCP | Fingerprints.HTTP) == expected
+    assert decode_packet(packet, Fingerprints.TCP | Fingerprints.HTTP) == expected
+    assert (
+        decode_frame(bytes(Ether() / packet), Fingerprints.TCP | Fingerprints.HTTP)
+        == expected
+    )
+
+
+def test_decode_disabled():
+    syn = ScapyIPv4() / ScapyTCP(flags="S", options=[("MSS", 1460)])
+
+    assert decode_packet(bytes(syn), Fingerprints.HTTP) is None
+    assert decode_packet(parse_packet(syn), Fingerprints.MTU) is not None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        bytes(ScapyIPv4(proto=17) / bytes(20)),
+        bytes(ScapyIPv6(nh=17) / bytes(20)),
+        bytes(ScapyIPv4() / ScapyTCP())[:30],
+    ],
+)
+def test_peek_invalid(raw: bytes):
+    with pytest.raises(PacketError):
+        PacketPeek.from_buffer(raw)
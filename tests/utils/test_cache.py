@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from pyp0f.utils.cache import LRUCache
+
+
+class TestLRUCache:
+    def test_get(self):
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache["a"] = 1
+
+        assert cache.get("a", None) == 1
+        assert cache.get("b", None) is None
+
+    def test_evict(self):
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a", None)
+        cache["c"] = 3
+
+        assert len(cache) == 2
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            LRUCache(0)
+
+    def test_threads(self):
+        cache: LRUCache[int, int] = LRUCache(8)
+
+        def write(offset: int) -> None:
+            for i in range(2000):
+                cache[offset + i] = i
+
+        def read() -> None:
+            for i in range(2000):
+                assert len(cache) <= 8
+                i in cache
+
+        threads = [threading.Thread(target=write, args=(n * 2000,)) for n in range(2)]
+        threads += [threading.Thread(target=read) for _ in range(2)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache) == 8